@@ -0,0 +1,207 @@
+"""
+NetMap - Scan Agent
+Runs on a host inside a network segment, leases segment scans from a
+coordinating NetMap web app and streams the hosts back as they are found
+"""
+
+import argparse
+import queue
+import socket
+import threading
+
+import requests
+
+from coordinator import HEARTBEAT_INTERVAL, encode_results
+
+_DONE = object()
+
+
+class TaskAborted(Exception):
+    """Raised inside a task's scan thread once its upload has failed"""
+
+
+class ScanAgent:
+    """Polls the coordinator for tasks and runs each with a local NetworkScanner"""
+
+    def __init__(self, coordinator_url, scanner_factory, name=None, poll_interval=2.0, timeout=30):
+        """
+        Args:
+            coordinator_url: Base URL of the web app, e.g. http://netmap:5000
+            scanner_factory: Callable taking NetworkScanner keyword options
+                (ports, discovery, detect_services) and returning a scanner
+            name: Name shown on the coordinator (hostname if None)
+            poll_interval: Seconds between lease requests while idle
+            timeout: Seconds allowed for each request to the coordinator
+        """
+        self.url = coordinator_url.rstrip('/')
+        self.scanner_factory = scanner_factory
+        self.name = name or socket.gethostname()
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.agent_id = None
+        self.tasks_done = 0
+        self.session = requests.Session()
+        self._stop = threading.Event()
+
+    def networks(self):
+        """CIDRs this agent can ARP, as reported by a scanner"""
+        return [network['subnet'] for network in self.scanner_factory().get_interface_networks()]
+
+    def register(self):
+        """
+        Announce the agent and the networks it reaches
+        Returns:
+            str agent ID
+        """
+        response = self.session.post(
+            f"{self.url}/api/agents",
+            json={'name': self.name, 'networks': self.networks(), 'agent_id': self.agent_id},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        self.agent_id = response.json()['agent_id']
+        print(f"[+] Registered with {self.url} as {self.agent_id}")
+        return self.agent_id
+
+    def lease(self):
+        """
+        Returns:
+            task dict, or None if the coordinator has no work for this agent
+        """
+        response = self.session.post(f"{self.url}/api/agents/{self.agent_id}/lease", timeout=self.timeout)
+        if response.status_code == 404:
+            # The coordinator restarted and forgot us
+            self.register()
+            return None
+        response.raise_for_status()
+        return response.json().get('task')
+
+    def run_task(self, task):
+        """
+        Scan one segment, streaming every host to the coordinator as soon as
+        it is gathered
+        Args:
+            task: Task dict from lease()
+        Returns:
+            dict: The coordinator's view of the task after the upload
+        """
+        options = task['options']
+        print(f"[*] Task {task['task_id']}: scanning {task['subnet']}")
+        scanner = self.scanner_factory(
+            ports=options.get('ports'),
+            discovery=options.get('discovery') or ['arp'],
+            detect_services=bool(options.get('services'))
+        )
+        feed = queue.Queue()
+        failure = []
+        aborted = threading.Event()
+
+        def deliver(host):
+            if aborted.is_set():
+                raise TaskAborted(f"Task {task['task_id']} upload failed")
+            feed.put(host)
+
+        def scan():
+            try:
+                scanner.scan_network(subnets=task.get('targets') or [task['subnet']], on_host=deliver)
+            except TaskAborted:
+                pass
+            except Exception as e:
+                failure.append(str(e))
+            finally:
+                feed.put(_DONE)
+
+        def hosts():
+            while True:
+                try:
+                    host = feed.get(timeout=HEARTBEAT_INTERVAL)
+                except queue.Empty:
+                    # Still discovering: keep the lease alive
+                    yield None
+                    continue
+                if host is _DONE:
+                    return
+                yield host
+
+        worker = threading.Thread(target=scan, name=f"netmap-task-{task['task_id']}", daemon=True)
+        worker.start()
+        try:
+            # A generator body is sent with chunked transfer encoding, line by line
+            response = self.session.post(
+                f"{self.url}/api/agents/{self.agent_id}/tasks/{task['task_id']}",
+                data=encode_results(scanner.fieldnames, hosts(), lambda: failure[0] if failure else None),
+                headers={'Content-Type': 'application/x-ndjson'},
+                timeout=None
+            )
+        finally:
+            # If the upload broke off, the scan stops at its next host
+            aborted.set()
+            worker.join()
+        response.raise_for_status()
+        result = response.json()['task']
+        self.tasks_done += 1
+        print(f"[+] Task {task['task_id']}: {result['hosts']} hosts, {result['state']}")
+        return result
+
+    def run(self, max_tasks=None):
+        """
+        Lease and run tasks until stopped
+        Args:
+            max_tasks: Stop after this many tasks (run forever if None)
+        """
+        self.register()
+        while not self._stop.is_set() and (max_tasks is None or self.tasks_done < max_tasks):
+            try:
+                task = self.lease()
+            except requests.RequestException as e:
+                print(f"[!] Coordinator unreachable ({e}), retrying")
+                task = None
+            if task is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            try:
+                self.run_task(task)
+            except requests.RequestException as e:
+                # The lease expires on the coordinator and the task is retried
+                print(f"[!] Could not report task {task['task_id']} ({e})")
+
+    def stop(self):
+        self._stop.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='NetMap - Scan Agent')
+    parser.add_argument('--coordinator', required=True, help='URL of the NetMap web app, e.g. http://netmap:5000')
+    parser.add_argument('--name', default=None, help='Agent name (default: hostname)')
+    parser.add_argument('--poll-interval', type=float, default=2.0,
+                        help='Seconds between polls while idle (default: 2)')
+    parser.add_argument('--simulate', metavar='SUBNET', default=None,
+                        help='Attach to a simulated segment instead of the real network (for testing)')
+    parser.add_argument('--simulate-hosts', type=int, default=50,
+                        help='Live hosts on the simulated segment (default: 50)')
+    parser.add_argument('--max-tasks', type=int, default=None, help='Exit after this many tasks')
+    args = parser.parse_args()
+
+    if args.simulate:
+        from benchmark import SimulatedNetwork, SimulatedScanner
+        network = SimulatedNetwork(args.simulate, hosts=args.simulate_hosts, latency=0.001)
+
+        def scanner_factory(**options):
+            return SimulatedScanner(network, **options)
+    else:
+        from lookup_cache import LookupCache
+        from network_scanner import NetworkScanner
+        cache = LookupCache()
+
+        def scanner_factory(**options):
+            return NetworkScanner(cache=cache, **options)
+
+    agent = ScanAgent(args.coordinator, scanner_factory, name=args.name, poll_interval=args.poll_interval)
+    try:
+        agent.run(max_tasks=args.max_tasks)
+    except KeyboardInterrupt:
+        print("\n[!] Agent stopped")
+
+
+if __name__ == '__main__':
+    main()
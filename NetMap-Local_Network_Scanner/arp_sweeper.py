@@ -0,0 +1,319 @@
+"""
+NetMap - ARP Sweep Engine
+Sends pre-built ARP requests over a raw AF_PACKET socket with rate limiting,
+retransmits only to hosts that have not answered and stops as soon as
+replies stop arriving
+"""
+
+import ipaddress
+import select
+import socket
+import struct
+import time
+from collections import deque
+
+ETH_P_ARP = 0x0806
+
+BROADCAST_MAC = b'\xff' * 6
+
+# Offsets into a 42-byte Ethernet + ARP frame
+TARGET_IP_OFFSET = 38
+FRAME_LENGTH = 42
+
+PCAP_HEADER = struct.Struct('<IHHiIII')
+PCAP_RECORD = struct.Struct('<IIII')
+PCAP_MAGIC = 0xa1b2c3d4
+LINKTYPE_ETHERNET = 1
+
+
+def mac_to_bytes(mac_address):
+    """Convert 'aa:bb:cc:dd:ee:ff' to 6 raw bytes"""
+    return bytes.fromhex(mac_address.replace(':', '').replace('-', ''))
+
+
+def bytes_to_mac(raw):
+    """Convert 6 raw bytes to 'aa:bb:cc:dd:ee:ff'"""
+    return ':'.join(f'{b:02x}' for b in raw)
+
+
+def build_arp_request(src_mac, src_ip):
+    """
+    Build a reusable ARP who-has frame; the target IP is patched in per send
+    Args:
+        src_mac: Sender MAC address string
+        src_ip: Sender IPv4 address string
+    Returns:
+        bytearray frame with an all-zero target IP
+    """
+    sender_mac = mac_to_bytes(src_mac)
+    frame = bytearray(FRAME_LENGTH)
+    frame[0:14] = BROADCAST_MAC + sender_mac + struct.pack('!H', ETH_P_ARP)
+    frame[14:22] = struct.pack('!HHBBH', 1, 0x0800, 6, 4, 1)
+    frame[22:28] = sender_mac
+    frame[28:32] = socket.inet_aton(src_ip)
+    return frame
+
+
+def build_arp_reply(ip, mac, dst_mac='00:00:00:00:00:00', dst_ip='0.0.0.0'):
+    """
+    Build an ARP is-at frame, used to record and replay test traffic
+    Args:
+        ip: Replying host IPv4 address
+        mac: Replying host MAC address
+        dst_mac: MAC of the host that asked
+        dst_ip: IP of the host that asked
+    Returns:
+        bytes frame
+    """
+    sender_mac = mac_to_bytes(mac)
+    target_mac = mac_to_bytes(dst_mac)
+    return (
+        target_mac + sender_mac + struct.pack('!H', ETH_P_ARP) +
+        struct.pack('!HHBBH', 1, 0x0800, 6, 4, 2) +
+        sender_mac + socket.inet_aton(ip) +
+        target_mac + socket.inet_aton(dst_ip)
+    )
+
+
+def parse_arp_reply(frame):
+    """
+    Extract the sender of an ARP reply
+    Args:
+        frame: Raw Ethernet frame
+    Returns:
+        tuple (ip, mac) or None if the frame is not an ARP reply
+    """
+    if len(frame) < FRAME_LENGTH or frame[12:14] != b'\x08\x06' or frame[20:22] != b'\x00\x02':
+        return None
+    return socket.inet_ntoa(frame[28:32]), bytes_to_mac(frame[22:28])
+
+
+def read_pcap(filepath):
+    """
+    Read the frames of a little-endian Ethernet pcap file
+    Args:
+        filepath: Path to the pcap file
+    Returns:
+        list of raw frames
+    """
+    frames = []
+    with open(filepath, 'rb') as f:
+        header = f.read(PCAP_HEADER.size)
+        if len(header) < PCAP_HEADER.size or PCAP_HEADER.unpack(header)[0] != PCAP_MAGIC:
+            raise ValueError(f"Unsupported pcap file: {filepath}")
+        while True:
+            record = f.read(PCAP_RECORD.size)
+            if len(record) < PCAP_RECORD.size:
+                break
+            _, _, captured, _ = PCAP_RECORD.unpack(record)
+            frames.append(f.read(captured))
+    return frames
+
+
+def write_pcap(filepath, frames):
+    """
+    Write frames to a pcap file readable by Wireshark and read_pcap
+    Args:
+        filepath: Output path
+        frames: Iterable of raw frames
+    """
+    with open(filepath, 'wb') as f:
+        f.write(PCAP_HEADER.pack(PCAP_MAGIC, 2, 4, 0, 0, 65535, LINKTYPE_ETHERNET))
+        now = time.time()
+        for frame in frames:
+            f.write(PCAP_RECORD.pack(int(now), int(now % 1 * 1e6), len(frame), len(frame)))
+            f.write(frame)
+
+
+class RawSocketTransport:
+    """Sends and receives ARP frames on one interface (Linux, requires root)"""
+
+    def __init__(self, interface):
+        self.sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ARP))
+        self.sock.bind((interface, 0))
+        self.sock.setblocking(False)
+
+    def send(self, frame):
+        self.sock.send(frame)
+
+    def recv(self, timeout):
+        """
+        Wait up to timeout seconds for frames
+        Returns:
+            list of raw frames (empty if none arrived)
+        """
+        readable, _, _ = select.select([self.sock], [], [], timeout)
+        frames = []
+        while readable:
+            try:
+                frames.append(self.sock.recv(2048))
+            except BlockingIOError:
+                break
+        return frames
+
+    def close(self):
+        self.sock.close()
+
+
+class ReplayTransport:
+    """
+    Answers ARP requests from recorded reply frames so sweeps can be tested
+    without a live LAN
+    """
+
+    def __init__(self, replies, drop=None, latency=0.0):
+        """
+        Args:
+            replies: Iterable of recorded ARP reply frames
+            drop: dict of ip -> number of requests to ignore before answering
+            latency: Seconds before a reply becomes visible
+        """
+        self.replies = {}
+        for frame in replies:
+            parsed = parse_arp_reply(frame)
+            if parsed:
+                self.replies[parsed[0]] = bytes(frame)
+        self.drop = dict(drop or {})
+        self.latency = latency
+        self.sent = []
+        self._queue = deque()
+
+    @classmethod
+    def from_pcap(cls, filepath, **kwargs):
+        return cls(read_pcap(filepath), **kwargs)
+
+    def send(self, frame):
+        ip = socket.inet_ntoa(bytes(frame[TARGET_IP_OFFSET:TARGET_IP_OFFSET + 4]))
+        self.sent.append(ip)
+        if ip not in self.replies:
+            return
+        if self.drop.get(ip, 0) > 0:
+            self.drop[ip] -= 1
+            return
+        self._queue.append((time.monotonic() + self.latency, self.replies[ip]))
+
+    def recv(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            now = time.monotonic()
+            frames = []
+            while self._queue and self._queue[0][0] <= now:
+                frames.append(self._queue.popleft()[1])
+            if frames or now >= deadline:
+                return frames
+            wake = self._queue[0][0] if self._queue else deadline
+            time.sleep(max(0.0, min(wake, deadline) - now))
+
+    def close(self):
+        pass
+
+
+class ArpSweeper:
+    """Rate-limited ARP sweep with retransmits to non-responders only"""
+
+    def __init__(self, transport, src_mac, src_ip, rate=500, retries=2,
+                 quiet_period=0.25, timeout=2.0, rate_controller=None):
+        """
+        Args:
+            transport: Object with send(frame), recv(timeout) and close()
+            src_mac: MAC address of the sending interface
+            src_ip: IPv4 address of the sending interface
+            rate: Maximum requests per second
+            retries: Extra rounds sent to hosts that did not answer
+            quiet_period: Stop waiting once no reply arrived for this long
+                (doubled on every retry round)
+            timeout: Upper bound on the wait after each round
+            rate_controller: RateController that slows the pacing below rate
+                when replies go missing (fixed rate if None)
+        """
+        self.transport = transport
+        self.frame = build_arp_request(src_mac, src_ip)
+        self.rate = rate
+        self.retries = retries
+        self.quiet_period = quiet_period
+        self.timeout = timeout
+        self.rate_controller = rate_controller
+        self.sent = 0
+        self._sent_at = {}
+        self._attempt = 0
+
+    def _collect(self, found, wanted, timeout):
+        """Receive frames for up to timeout seconds; return True if any reply was new"""
+        new_reply = False
+        for frame in self.transport.recv(timeout):
+            parsed = parse_arp_reply(frame)
+            if parsed and parsed[0] in wanted and parsed[0] not in found:
+                found[parsed[0]] = parsed[1]
+                new_reply = True
+                if self.rate_controller is not None:
+                    self.rate_controller.on_response(time.monotonic() - self._sent_at[parsed[0]])
+                    # A host first heard on a retry lost an earlier request or reply
+                    if self._attempt > 0:
+                        self.rate_controller.on_loss()
+        return new_reply
+
+    def _interval(self):
+        interval = 1.0 / self.rate if self.rate else 0.0
+        if self.rate_controller is not None:
+            interval = max(interval, self.rate_controller.interval)
+        return interval
+
+    def sweep(self, targets):
+        """
+        Resolve the MAC address of every live target
+        Args:
+            targets: Iterable of IPv4 address strings
+        Returns:
+            list of dicts with 'ip' and 'mac' keys, in target order
+        """
+        targets = list(dict.fromkeys(str(ip) for ip in targets))
+        packed = {ip: socket.inet_aton(ip) for ip in targets}
+        wanted = set(targets)
+        found = {}
+        self._sent_at = {}
+
+        for attempt in range(self.retries + 1):
+            pending = [ip for ip in targets if ip not in found]
+            if not pending:
+                break
+            self._attempt = attempt
+
+            # Send this round, draining replies while pacing between frames
+            next_send = time.monotonic()
+            for ip in pending:
+                self.frame[TARGET_IP_OFFSET:TARGET_IP_OFFSET + 4] = packed[ip]
+                self.transport.send(self.frame)
+                self._sent_at[ip] = time.monotonic()
+                self.sent += 1
+                next_send += self._interval()
+                self._collect(found, wanted, max(0.0, next_send - time.monotonic()))
+
+            # Wait until replies stop arriving or the round times out
+            quiet = self.quiet_period * (2 ** attempt)
+            last_reply = time.monotonic()
+            deadline = last_reply + self.timeout
+            while len(found) < len(targets):
+                wait = min(deadline, last_reply + quiet) - time.monotonic()
+                if wait <= 0:
+                    break
+                if self._collect(found, wanted, wait):
+                    last_reply = time.monotonic()
+
+        return [{'ip': ip, 'mac': found[ip]} for ip in targets if ip in found]
+
+    def close(self):
+        self.transport.close()
+
+
+def subnet_targets(subnet):
+    """
+    List the host addresses of a subnet
+    Args:
+        subnet: CIDR string such as '192.168.1.0/24'
+    Returns:
+        list of IPv4 address strings
+    """
+    network = ipaddress.IPv4Network(subnet, strict=False)
+    if network.num_addresses == 1:
+        return [str(network.network_address)]
+    return [str(ip) for ip in network.hosts()]
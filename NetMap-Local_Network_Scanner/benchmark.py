@@ -0,0 +1,385 @@
+"""
+NetMap - Benchmark Harness
+Runs the full NetworkScanner pipeline against a simulated network (ARP,
+TCP connects and name lookups answered in-process with configurable latency,
+loss and open ports) and reports throughput, per-host latency and memory
+"""
+
+import argparse
+import asyncio
+import contextlib
+import heapq
+import io
+import ipaddress
+import json
+import math
+import random
+import sys
+import time
+import tracemalloc
+
+from arp_sweeper import ArpSweeper, TARGET_IP_OFFSET, build_arp_reply, subnet_targets
+from metrics import timed
+from network_scanner import NetworkScanner
+from port_prober import AsyncPortProber
+
+# Share of hosts with each port open
+DEFAULT_OPEN_PORTS = {22: 0.3, 80: 0.5, 443: 0.4}
+
+# Relative regressions beyond this fail a --compare run
+DEFAULT_TOLERANCE = 0.2
+
+SIMULATED_INTERFACE = 'sim0'
+
+
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile
+    Args:
+        values: Sorted list of numbers
+        fraction: Percentile as a fraction (0.99 for p99)
+    Returns:
+        The percentile value, or 0.0 for an empty list
+    """
+    if not values:
+        return 0.0
+    rank = min(len(values), max(1, math.ceil(fraction * len(values))))
+    return values[rank - 1]
+
+
+class SimulatedNetwork:
+    """Random hosts on one subnet, each with a MAC, a hostname and open ports"""
+
+    def __init__(self, subnet='10.200.0.0/20', hosts=1000, latency=0.002, jitter=0.001, loss=0.0,
+                 open_ports=None, seed=1):
+        """
+        Args:
+            subnet: Subnet the hosts live on
+            hosts: Number of live hosts
+            latency: Mean round-trip time in seconds
+            jitter: Random extra round-trip time, up to this many seconds
+            loss: Probability that a request or its answer is lost
+            open_ports: dict mapping port to the share of hosts with it open
+            seed: Random seed, so runs are comparable
+        """
+        self.subnet = str(ipaddress.IPv4Network(subnet, strict=False))
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.open_ports = DEFAULT_OPEN_PORTS if open_ports is None else open_ports
+        self.random = random.Random(seed)
+
+        addresses = subnet_targets(self.subnet)
+        if hosts > len(addresses) - 1:
+            raise ValueError(f"{self.subnet} has room for {len(addresses) - 1} hosts")
+        # The first address belongs to the scanning host
+        self.local_ip = addresses[0]
+        self.hosts = {}
+        for ip in self.random.sample(addresses[1:], hosts):
+            mac = '02:' + ':'.join(f'{self.random.randrange(256):02x}' for _ in range(5))
+            hostname = f"host-{ip.replace('.', '-')}.sim" if self.random.random() < 0.5 else None
+            ports = {port for port, share in self.open_ports.items() if self.random.random() < share}
+            self.hosts[ip] = (mac, hostname, ports)
+
+    def rtt(self):
+        return self.latency + self.random.random() * self.jitter
+
+    def lost(self):
+        return self.loss > 0 and self.random.random() < self.loss
+
+
+class SimulatedArpTransport:
+    """ArpSweeper transport answering from the simulated network after one round trip"""
+
+    def __init__(self, network):
+        self.network = network
+        self.sent = 0
+        self._due = []
+        self._seq = 0
+
+    def send(self, frame):
+        self.sent += 1
+        ip = '.'.join(str(b) for b in frame[TARGET_IP_OFFSET:TARGET_IP_OFFSET + 4])
+        host = self.network.hosts.get(ip)
+        if host is None or self.network.lost():
+            return
+        self._seq += 1
+        heapq.heappush(self._due, (time.monotonic() + self.network.rtt(), self._seq, build_arp_reply(ip, host[0])))
+
+    def recv(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            now = time.monotonic()
+            frames = []
+            while self._due and self._due[0][0] <= now:
+                frames.append(heapq.heappop(self._due)[2])
+            if frames or now >= deadline:
+                return frames
+            wake = self._due[0][0] if self._due else deadline
+            time.sleep(max(0.0, min(wake, deadline) - now))
+
+    def close(self):
+        pass
+
+
+class SimulatedProber(AsyncPortProber):
+    """Port prober whose connections are answered by the simulated network"""
+
+    def __init__(self, network, **kwargs):
+        super().__init__(**kwargs)
+        self.network = network
+        self.connects = 0
+        # ip -> [first probe sent, last probe answered]
+        self.host_times = {}
+
+    async def _connect(self, ip, port):
+        controller = self.rate_controller
+        timeout = controller.timeout if controller is not None else self.timeout
+        started = time.monotonic()
+        self.connects += 1
+        self.stats['sent'] += 1
+        times = self.host_times.setdefault(ip, [started, started])
+
+        host = self.network.hosts.get(ip)
+        if host is None or self.network.lost():
+            # No SYN/ACK or RST: the attempt times out
+            await asyncio.sleep(timeout)
+            self.stats['timeout'] += 1
+            if controller is not None and ip in self._responsive:
+                controller.on_loss()
+            times[1] = time.monotonic()
+            return False
+
+        rtt = self.network.rtt()
+        await asyncio.sleep(rtt)
+        self._answered(ip, rtt)
+        times[1] = time.monotonic()
+        is_open = port in host[2]
+        self.stats['open' if is_open else 'refused'] += 1
+        return is_open
+
+
+class SimulatedResolver:
+    """NameResolver stand-in: every batch costs one round trip"""
+
+    def __init__(self, network):
+        self.network = network
+
+    def resolve(self, ips):
+        ips = list(ips)
+        time.sleep(self.network.rtt())
+        return {ip: self.network.hosts[ip][1] if ip in self.network.hosts else None for ip in ips}
+
+
+class SimulatedScanner(NetworkScanner):
+    """NetworkScanner wired to a SimulatedNetwork instead of interfaces and sockets"""
+
+    def __init__(self, network, **kwargs):
+        """
+        Args:
+            network: SimulatedNetwork to scan
+            **kwargs: NetworkScanner options (ports, max_probes, adaptive, ...)
+        """
+        kwargs.setdefault('online_vendor_lookup', False)
+        super().__init__(**kwargs)
+        self.network = network
+        self.prober = SimulatedProber(
+            network,
+            timeout=self.prober.timeout,
+            max_concurrency=self.prober.max_concurrency,
+            per_host_limit=self.prober.per_host_limit,
+            rate_controller=self.probe_control
+        )
+        self.resolver = SimulatedResolver(network)
+        self.arp_transport = None
+
+    def get_local_network_info(self):
+        self.interface = SIMULATED_INTERFACE
+        self.local_ip = self.network.local_ip
+        self.subnet = self.network.subnet
+        return self.local_ip, self.subnet
+
+    def get_interface_networks(self):
+        return [{'interface': SIMULATED_INTERFACE, 'ip': self.network.local_ip, 'subnet': self.network.subnet}]
+
+    @timed('arp')
+    def perform_arp_scan(self, subnet=None, interface=None):
+        subnets = [subnet] if isinstance(subnet, str) else list(subnet or [self.subnet])
+        return self.sweep_arp(subnets, interface)
+
+    def sweep_arp(self, subnets, interface=None):
+        self.arp_transport = SimulatedArpTransport(self.network)
+        sweeper = ArpSweeper(
+            self.arp_transport,
+            '02:00:00:00:00:01',
+            self.network.local_ip,
+            rate=self.arp_rate,
+            retries=self.arp_retries,
+            quiet_period=max(0.05, self.network.latency * 10),
+            rate_controller=self.arp_control
+        )
+        targets = [ip for subnet in subnets for ip in subnet_targets(subnet)]
+        return sweeper.sweep(targets)
+
+
+def run_benchmark(hosts=1000, subnet='10.200.0.0/20', latency=0.002, jitter=0.001, loss=0.0,
+                  ports=None, open_ports=None, workers=10, adaptive=True, arp_rate=20000,
+                  max_probes=512, seed=1, trace_memory=True, verbose=False):
+    """
+    Scan a simulated network once and measure it
+    Args:
+        hosts: Number of live hosts
+        subnet: Simulated subnet
+        latency: Mean round-trip time in seconds
+        jitter: Random extra round-trip time in seconds
+        loss: Probability that a request or answer is lost
+        ports: Ports to probe (the keys of open_ports if None)
+        open_ports: dict mapping port to the share of hosts with it open
+        workers: Threads gathering host information
+        adaptive: Use the adaptive rate controllers
+        arp_rate: ARP requests per second
+        max_probes: Maximum connections in flight
+        seed: Random seed of the simulated network
+        trace_memory: Measure peak memory with tracemalloc (slows the scan down)
+        verbose: Show the scanner's own output
+    Returns:
+        dict of measurements
+    """
+    network = SimulatedNetwork(subnet, hosts, latency, jitter, loss, open_ports, seed)
+    if ports is None:
+        ports = sorted(network.open_ports)
+    scanner = SimulatedScanner(
+        network, ports=ports, adaptive=adaptive, arp_rate=arp_rate, max_probes=max_probes
+    )
+
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        with output:
+            results = scanner.scan_network(max_workers=workers)
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+
+    latencies = sorted(last - first for first, last in scanner.prober.host_times.values())
+    probe_time = (
+        max(last for _, last in scanner.prober.host_times.values())
+        - min(first for first, _ in scanner.prober.host_times.values())
+    ) if latencies else 0.0
+
+    return {
+        'hosts': hosts,
+        'found': len(results),
+        'ports': len(scanner.ports),
+        'elapsed_s': round(elapsed, 3),
+        'hosts_per_s': round(len(results) / elapsed, 1) if elapsed else 0.0,
+        'probes': scanner.prober.connects,
+        'probes_per_s': round(scanner.prober.connects / probe_time, 1) if probe_time else 0.0,
+        'arp_requests': scanner.arp_transport.sent if scanner.arp_transport else 0,
+        'host_latency_p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'host_latency_p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'peak_memory_kb': peak // 1024 if peak is not None else None
+    }
+
+
+def compare(result, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Find regressions against a baseline run
+    Args:
+        result: Measurements of this run
+        baseline: Measurements of the baseline run
+        tolerance: Allowed relative change
+    Returns:
+        list of regression messages (empty if none)
+    """
+    regressions = []
+    # Higher is better for throughput, lower for latency and memory
+    for key, higher_is_better in (
+        ('hosts_per_s', True), ('probes_per_s', True), ('host_latency_p50_ms', False),
+        ('host_latency_p99_ms', False), ('peak_memory_kb', False)
+    ):
+        old, new = baseline.get(key), result.get(key)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        if (change < -tolerance) if higher_is_better else (change > tolerance):
+            regressions.append(f"{key}: {old} -> {new} ({change:+.0%})")
+    if result['found'] < baseline.get('found', 0):
+        regressions.append(f"found: {baseline['found']} -> {result['found']}")
+    return regressions
+
+
+def print_report(result):
+    print(f"[+] Found {result['found']}/{result['hosts']} hosts in {result['elapsed_s']} s")
+    print(f"    Hosts/s:          {result['hosts_per_s']}")
+    print(f"    Probes/s:         {result['probes_per_s']} ({result['probes']} probes, "
+          f"{result['ports']} ports per host)")
+    print(f"    ARP requests:     {result['arp_requests']}")
+    print(f"    Host latency p50: {result['host_latency_p50_ms']} ms")
+    print(f"    Host latency p99: {result['host_latency_p99_ms']} ms")
+    if result['peak_memory_kb'] is not None:
+        print(f"    Peak memory:      {result['peak_memory_kb']} KB")
+
+
+def main():
+    from port_profiles import parse_ports
+
+    parser = argparse.ArgumentParser(description='NetMap - Benchmark against a simulated network')
+    parser.add_argument('--hosts', type=int, default=1000, help='Live hosts (default: 1000)')
+    parser.add_argument('--subnet', default='10.200.0.0/20', help='Simulated subnet (default: 10.200.0.0/20)')
+    parser.add_argument('--latency', type=float, default=2.0, help='Mean round-trip time in ms (default: 2)')
+    parser.add_argument('--jitter', type=float, default=1.0, help='Random extra round-trip time in ms (default: 1)')
+    parser.add_argument('--loss', type=float, default=0.0, help='Packet loss probability (default: 0)')
+    parser.add_argument('--ports', default=None, help='Ports to probe (default: 22,80,443)')
+    parser.add_argument('--open-share', type=float, default=None,
+                        help='Share of hosts with each probed port open (default: per-port presets)')
+    parser.add_argument('--workers', type=int, default=10, help='Info gathering threads (default: 10)')
+    parser.add_argument('--no-adaptive', action='store_true', help='Use fixed probe limits')
+    parser.add_argument('--no-memory', action='store_true', help='Skip tracemalloc (faster, no memory figure)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed (default: 1)')
+    parser.add_argument('--json', metavar='FILE', help='Write the measurements to a JSON file')
+    parser.add_argument('--compare', metavar='FILE', help='Baseline JSON; exit 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Allowed relative regression (default: 0.2)')
+    parser.add_argument('--verbose', action='store_true', help="Show the scanner's output")
+    args = parser.parse_args()
+
+    ports = parse_ports(args.ports) if args.ports else None
+    open_ports = None
+    if args.open_share is not None:
+        open_ports = {port: args.open_share for port in ports or DEFAULT_OPEN_PORTS}
+    elif ports is not None:
+        open_ports = {port: DEFAULT_OPEN_PORTS.get(port, 0.05) for port in ports}
+
+    print(f"[*] Scanning {args.hosts} simulated hosts on {args.subnet} "
+          f"({args.latency} ms RTT, {args.loss:.1%} loss)...")
+    result = run_benchmark(
+        hosts=args.hosts, subnet=args.subnet, latency=args.latency / 1000, jitter=args.jitter / 1000,
+        loss=args.loss, ports=ports, open_ports=open_ports, workers=args.workers,
+        adaptive=not args.no_adaptive, seed=args.seed, trace_memory=not args.no_memory,
+        verbose=args.verbose
+    )
+    print_report(result)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"[+] Measurements written to {args.json}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        if regressions:
+            print("[-] Regressions against the baseline:")
+            for regression in regressions:
+                print(f"    {regression}")
+            sys.exit(1)
+        print("[+] No regressions against the baseline")
+
+
+if __name__ == '__main__':
+    main()
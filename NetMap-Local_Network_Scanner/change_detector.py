@@ -0,0 +1,195 @@
+"""
+NetMap - Incremental Rescan and Change Detection
+Persists the previous host table so rescans only re-probe new or changed
+hosts, and reports hosts that were added, removed or changed
+"""
+
+import ipaddress
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from discovery import NO_MAC
+
+DEFAULT_STATE_PATH = os.path.join(os.path.dirname(__file__), 'cache', 'netmap_state.db')
+
+# Values bound per IN (...) query
+IN_CHUNK = 500
+
+ADDED = 'added'
+REMOVED = 'removed'
+CHANGED = 'changed'
+
+
+class ChangeDetector:
+    """Plans incremental rescans against the last known host table"""
+
+    def __init__(self, path=DEFAULT_STATE_PATH, reprobe_ttl=3600, removed_after=2):
+        """
+        Args:
+            path: SQLite file holding the host table (':memory:' for tests)
+            reprobe_ttl: Seconds after which an unchanged host is probed again
+            removed_after: Consecutive missed sweeps before a host counts as removed
+        """
+        self.reprobe_ttl = reprobe_ttl
+        self.removed_after = removed_after
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS hosts ('
+                '  ip TEXT PRIMARY KEY,'
+                '  mac TEXT NOT NULL,'
+                '  record TEXT NOT NULL,'
+                '  probed REAL NOT NULL,'
+                '  misses INTEGER NOT NULL DEFAULT 0,'
+                '  ip_int INTEGER)'
+            )
+            columns = {row[1] for row in self._conn.execute('PRAGMA table_info(hosts)')}
+            if 'ip_int' not in columns:
+                # State files from before the integer column
+                self._conn.execute('ALTER TABLE hosts ADD COLUMN ip_int INTEGER')
+                self._conn.executemany(
+                    'UPDATE hosts SET ip_int = ? WHERE ip = ?',
+                    [(int(ipaddress.IPv4Address(ip)), ip)
+                     for (ip,) in self._conn.execute('SELECT ip FROM hosts').fetchall()]
+                )
+            # A slice's rows are read by address range and moved devices by MAC
+            self._conn.execute('CREATE INDEX IF NOT EXISTS hosts_ip_int ON hosts (ip_int)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS hosts_mac ON hosts (lower(mac))')
+
+    def _select(self, where='', params=()):
+        """Return {ip: (mac, record, probed, misses)} for the matching hosts"""
+        rows = self._conn.execute(
+            f'SELECT ip, mac, record, probed, misses FROM hosts {where}', params
+        ).fetchall()
+        return {ip: (mac, json.loads(record), probed, misses) for ip, mac, record, probed, misses in rows}
+
+    def _select_in(self, column, values):
+        """Hosts whose column is one of values, queried in chunks below SQLite's variable limit"""
+        values = list(values)
+        found = {}
+        for start in range(0, len(values), IN_CHUNK):
+            chunk = values[start:start + IN_CHUNK]
+            found.update(self._select(f"WHERE {column} IN ({','.join('?' * len(chunk))})", chunk))
+        return found
+
+    def _select_networks(self, networks):
+        """Hosts inside any of the networks, read through the integer address index"""
+        found = {}
+        for network in networks:
+            found.update(self._select(
+                'WHERE ip_int BETWEEN ? AND ?',
+                (int(network.network_address), int(network.broadcast_address))
+            ))
+        return found
+
+    def plan(self, devices, fieldnames=None):
+        """
+        Split discovered devices into those to probe and those to reuse
+        Args:
+            devices: list of dicts with 'ip' and 'mac' keys from the ARP sweep
+            fieldnames: Result columns of this scan; records with other columns
+                (e.g. from a scan of different ports) are probed again
+        Returns:
+            tuple (devices to probe, previous host records to reuse)
+        """
+        now = time.time()
+        with self._lock:
+            previous = self._select_in('ip', {device['ip'] for device in devices})
+
+        to_probe = []
+        reused = []
+        for device in devices:
+            known = previous.get(device['ip'])
+            if (known is None or known[0].lower() != device['mac'].lower()
+                    or now - known[2] > self.reprobe_ttl
+                    or (fieldnames and list(known[1]) != list(fieldnames))):
+                to_probe.append(device)
+            else:
+                reused.append(known[1])
+        return to_probe, reused
+
+    def commit(self, hosts, probed_ips, subnets=None):
+        """
+        Store the new host table and report what changed
+        Args:
+            hosts: Complete list of host dicts from this scan
+            probed_ips: IPs that were re-probed in this scan
+            subnets: Subnets covered by the scan; hosts outside them are left alone
+        Returns:
+            list of change events (dicts with 'event', 'ip', 'mac' and 'changes')
+        """
+        now = time.time()
+        probed_ips = set(probed_ips)
+        networks = [ipaddress.IPv4Network(subnet, strict=False) for subnet in subnets or []]
+        current = {host['IP Address']: host for host in hosts}
+        events = []
+
+        with self._lock, self._conn:
+            # Only the rows this scan can affect: its hosts, the hosts it covered
+            # and earlier addresses of its MACs
+            covered = self._select_networks(networks) if networks else self._select()
+            macs = {host['MAC Address'].lower() for host in hosts if host['MAC Address'] != NO_MAC}
+            previous = self._select_in('lower(mac)', macs)
+            previous.update(covered)
+            previous.update(self._select_in('ip', current))
+            # Routed hosts have no MAC to follow across addresses
+            previous_by_mac = {
+                mac.lower(): ip for ip, (mac, _, _, _) in previous.items()
+                if ip not in current and mac != NO_MAC
+            }
+            moved_from = set()
+
+            for ip, host in current.items():
+                known = previous.get(ip)
+                mac = host['MAC Address']
+                old_ip = previous_by_mac.get(mac.lower()) if mac != NO_MAC else None
+                if known is None and old_ip:
+                    # Same device at a new address (e.g. a new DHCP lease)
+                    moved_from.add(old_ip)
+                    self._conn.execute('DELETE FROM hosts WHERE ip = ?', (old_ip,))
+                    events.append({
+                        'event': CHANGED, 'ip': ip, 'mac': mac,
+                        'changes': {'IP Address': [old_ip, ip]}
+                    })
+                elif known is None:
+                    events.append({'event': ADDED, 'ip': ip, 'mac': mac, 'changes': {}})
+                elif ip in probed_ips:
+                    changes = {
+                        field: [known[1].get(field), value]
+                        for field, value in host.items()
+                        if known[1].get(field) != value
+                    }
+                    if changes:
+                        events.append({'event': CHANGED, 'ip': ip, 'mac': mac, 'changes': changes})
+
+                probed = now if ip in probed_ips or known is None else known[2]
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO hosts (ip, mac, record, probed, misses, ip_int) '
+                    'VALUES (?, ?, ?, ?, 0, ?)',
+                    (ip, mac, json.dumps(dict(host)), probed, int(ipaddress.IPv4Address(ip)))
+                )
+
+            for ip, (mac, record, probed, misses) in covered.items():
+                if ip in current or ip in moved_from:
+                    continue
+                # Tolerate a missed ARP reply before declaring the host gone
+                if misses + 1 >= self.removed_after:
+                    self._conn.execute('DELETE FROM hosts WHERE ip = ?', (ip,))
+                    events.append({'event': REMOVED, 'ip': ip, 'mac': mac, 'changes': {}})
+                else:
+                    self._conn.execute('UPDATE hosts SET misses = misses + 1 WHERE ip = ?', (ip,))
+
+        return events
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
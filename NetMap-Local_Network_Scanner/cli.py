@@ -4,8 +4,16 @@ Simple command-line interface for quick scans
 """
 
 import argparse
+import os
 from network_scanner import NetworkScanner
-from utils import export_to_csv
+from utils import validate_subnet
+from exporters import EXPORT_FORMATS, EXPORTS_DIR, export_filename, open_exporter
+from metrics import print_profile
+from port_profiles import PORT_PROFILES, parse_ports
+from lookup_cache import LookupCache
+from change_detector import ChangeDetector
+from history_store import HistoryStore
+from discovery import DEFAULT_DISCOVERY, DISCOVERY_METHODS
 
 
 def main():
@@ -16,29 +24,75 @@ def main():
 Examples:
   python cli.py                    # Scan local network
   python cli.py --export           # Scan and export to CSV
+  python cli.py --export --format jsonl --gzip  # Stream results to a gzipped JSON Lines file
+  python cli.py --profile          # Show where the scan spent its time
   python cli.py --subnet 192.168.1.0/24  # Scan specific subnet
+  python cli.py --subnet 10.0.1.0/24 10.0.2.0/24  # Scan several subnets in parallel
+  python cli.py --interface eth0 eth1    # Scan the networks of several interfaces
   python cli.py --workers 20       # Use 20 concurrent threads
+  python cli.py --ports 22,80,8000-8100  # Probe a custom port list
+  python cli.py --ports extended   # Probe a named port profile (1000 ports)
+  python cli.py --services         # Identify services (SSH banner, HTTP server, TLS CN)
+  python cli.py --diff             # Re-probe only new/changed hosts, report changes
+  python cli.py --subnet 10.20.0.0/16 --discovery icmp tcp  # Discover hosts on a routed range
         """
     )
     
     parser.add_argument(
         '--subnet',
-        help='Subnet to scan (e.g., 192.168.1.0/24). Auto-detected if not specified.',
+        help='Subnets to scan (e.g., 192.168.1.0/24), space or comma separated. '
+             'Auto-detected if not specified.',
+        nargs='+',
         default=None
     )
     
+    parser.add_argument(
+        '--interface',
+        help='Interfaces whose networks to scan, one ARP worker per interface',
+        nargs='+',
+        default=None
+    )
+    
+    parser.add_argument(
+        '--all-interfaces',
+        help='Scan the networks of every non-loopback interface',
+        action='store_true'
+    )
+    
+    parser.add_argument(
+        '--discovery',
+        help='Host discovery methods: arp (local subnets), icmp and tcp (also routed '
+             'subnets). Default: arp',
+        nargs='+',
+        choices=DISCOVERY_METHODS,
+        default=list(DEFAULT_DISCOVERY)
+    )
+    
     parser.add_argument(
         '--export',
-        help='Export results to CSV',
+        help='Export results to a file, written host by host as the scan runs',
         action='store_true'
     )
     
     parser.add_argument(
         '--output',
-        help='Output CSV filename',
+        help='Output filename',
         default=None
     )
     
+    parser.add_argument(
+        '--format',
+        help='Export format (default: csv; parquet needs pyarrow)',
+        choices=EXPORT_FORMATS,
+        default='csv'
+    )
+    
+    parser.add_argument(
+        '--gzip',
+        help='Compress the CSV or JSON Lines export with gzip',
+        action='store_true'
+    )
+    
     parser.add_argument(
         '--workers',
         help='Number of concurrent threads (default: 10)',
@@ -46,43 +100,172 @@ Examples:
         default=10
     )
     
+    parser.add_argument(
+        '--ports',
+        help=f"Ports to probe: numbers, ranges and profiles ({', '.join(PORT_PROFILES)}). "
+             "Default: 22,80,443",
+        default=None
+    )
+    
+    parser.add_argument(
+        '--services',
+        help='Identify the service on every open port (SSH/FTP/SMTP banner, '
+             'HTTP Server header, TLS certificate CN)',
+        action='store_true'
+    )
+    
+    parser.add_argument(
+        '--no-adaptive',
+        help='Probe with fixed concurrency and timeouts instead of adapting to '
+             'measured round trips and loss',
+        action='store_true'
+    )
+    
+    parser.add_argument(
+        '--offline',
+        help='Never query the online vendor API (use only the local OUI database)',
+        action='store_true'
+    )
+    
+    parser.add_argument(
+        '--no-cache',
+        help='Do not use the persistent vendor/hostname cache',
+        action='store_true'
+    )
+    
+    parser.add_argument(
+        '--cache-ttl',
+        help='Seconds cached vendor/hostname lookups stay valid (default: 86400)',
+        type=int,
+        default=86400
+    )
+    
+    parser.add_argument(
+        '--diff',
+        help='Incremental scan: re-probe only new, changed or stale hosts and report changes',
+        action='store_true'
+    )
+    
+    parser.add_argument(
+        '--reprobe-ttl',
+        help='Seconds before an unchanged host is probed again in --diff mode (default: 3600)',
+        type=int,
+        default=3600
+    )
+    
+    parser.add_argument(
+        '--profile',
+        help='Print time spent per scan stage and probe/cache counters',
+        action='store_true'
+    )
+    
+    parser.add_argument(
+        '--no-history',
+        help='Do not record this scan in the scan history store',
+        action='store_true'
+    )
+    
     args = parser.parse_args()
     
+    try:
+        ports = parse_ports(args.ports)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    subnets = None
+    if args.subnet:
+        subnets = [subnet for item in args.subnet for subnet in item.split(',') if subnet]
+        invalid = [subnet for subnet in subnets if not validate_subnet(subnet)]
+        if invalid:
+            parser.error(f"Invalid subnet: {invalid[0]}")
+    
     # Banner
     print("\n" + "="*60)
     print("  NetMap - Local Network Scanner v1.0")
     print("="*60 + "\n")
     
     # Initialize scanner
-    scanner = NetworkScanner()
+    cache = None if args.no_cache else LookupCache(ttl=args.cache_ttl)
+    change_detector = ChangeDetector(reprobe_ttl=args.reprobe_ttl) if args.diff else None
+    scanner = NetworkScanner(
+        ports=ports,
+        online_vendor_lookup=not args.offline,
+        cache=cache,
+        change_detector=change_detector,
+        discovery=args.discovery,
+        detect_services=args.services,
+        adaptive=not args.no_adaptive
+    )
+    if scanner.oui_db is None:
+        print("[!] No offline OUI database found, run 'python oui_db.py --download' to build one\n")
     
-    # If subnet is specified, set it manually
-    if args.subnet:
-        scanner.subnet = args.subnet
-        print(f"[*] Using specified subnet: {args.subnet}\n")
+    # If subnets or interfaces are specified, use them instead of the detected network
+    interfaces = args.interface
+    if args.all_interfaces:
+        interfaces = [n['interface'] for n in scanner.get_interface_networks()]
+    if subnets:
+        print(f"[*] Using specified subnets: {', '.join(subnets)}\n")
+    if interfaces:
+        print(f"[*] Using interfaces: {', '.join(dict.fromkeys(interfaces))}\n")
+    
+    # Open the export first so hosts are written as soon as they are gathered
+    exporter = None
+    if args.export:
+        os.makedirs(EXPORTS_DIR, exist_ok=True)
+        filepath = os.path.join(EXPORTS_DIR, export_filename(args.output, args.format, args.gzip))
+        try:
+            exporter = open_exporter(filepath, scanner.fieldnames, args.format, args.gzip)
+        except RuntimeError as e:
+            parser.error(str(e))
     
     # Perform scan
     try:
-        results = scanner.scan_network(max_workers=args.workers)
+        results = scanner.scan_network(
+            max_workers=args.workers,
+            subnets=subnets,
+            interfaces=interfaces,
+            on_host=exporter.write if exporter else None
+        )
+        
+        if exporter:
+            exporter.close()
+            exporter = None
+            if not results:
+                os.remove(filepath)
+        
+        if not args.no_history:
+            # The subnets actually swept, including those of --interface
+            HistoryStore().record_scan(results, [subnet for _, subnet in scanner.targets], source='cli')
         
         if results:
             # Print results
             scanner.print_results()
             
-            # Export if requested
             if args.export:
-                print("\n[*] Exporting results to CSV...")
-                filepath = export_to_csv(results, args.output)
-                print(f"[+] Results exported to: {filepath}")
+                print(f"\n[+] Results exported to: {filepath}")
         else:
             print("\n[-] No devices found on the network")
             print("[!] Make sure you're running with administrator/root privileges")
+        
+        # Reported even for an empty result: every known host may have gone
+        if args.diff:
+            counts = {event: 0 for event in ('added', 'removed', 'changed')}
+            for change in scanner.changes:
+                counts[change['event']] += 1
+            print(f"\n[+] Changes: {counts['added']} added, "
+                  f"{counts['removed']} removed, {counts['changed']} changed")
     
     except KeyboardInterrupt:
         print("\n\n[!] Scan interrupted by user")
     except Exception as e:
         print(f"\n[!] Error: {e}")
         print("[!] Make sure you're running with administrator/root privileges")
+    finally:
+        if exporter:
+            exporter.close()
+    
+    if args.profile:
+        print_profile(scanner.metrics)
     
     print("\n" + "="*60 + "\n")
 
@@ -0,0 +1,433 @@
+"""
+NetMap - Distributed Scan Coordinator
+Splits the subnets of a scan into segment tasks, leases them to agents that
+can reach each segment and collects the hosts the agents stream back
+"""
+
+import ipaddress
+import json
+import threading
+import time
+import uuid
+
+from discovery import NO_MAC
+from host_table import ip_key, mac_to_bytes
+
+PROTOCOL_VERSION = 1
+
+# Columns every host row must carry
+REQUIRED_COLUMNS = ('IP Address', 'MAC Address')
+
+# Seconds an agent may go without sending a host before it sends a heartbeat
+# line instead; well inside the coordinator's lease timeout
+HEARTBEAT_INTERVAL = 15
+
+# Largest segment handed to one agent; bigger subnets are split
+DEFAULT_PARTITION_PREFIX = 24
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+
+def encode_results(columns, hosts, error=None):
+    """
+    Encode a task's results in the agent protocol: JSON Lines with a header
+    naming the columns, one JSON array of values per host and a final
+    status line. A None from hosts is sent as a 'null' heartbeat line, which
+    renews the task's lease while discovery has nothing to report yet.
+    Args:
+        columns: Result column names
+        hosts: Iterable of host dicts or None (consumed lazily, so it can be a live feed)
+        error: Callable returning an error message once hosts is exhausted (optional)
+    Yields:
+        bytes lines
+    """
+    yield (json.dumps({'v': PROTOCOL_VERSION, 'columns': columns}) + '\n').encode()
+    count = 0
+    for host in hosts:
+        if host is None:
+            yield b'null\n'
+            continue
+        yield (json.dumps([host.get(column) for column in columns]) + '\n').encode()
+        count += 1
+    message = error() if error is not None else None
+    status = {'error': message} if message else {'done': count}
+    yield (json.dumps(status) + '\n').encode()
+
+
+def decode_host(columns, record):
+    """
+    Turn one host row of a result stream into a host dict
+    Args:
+        columns: Column names from the stream header
+        record: Decoded JSON array of values
+    Returns:
+        dict mapping column name to value
+    Raises:
+        ValueError: If the row does not match the header or its IP or MAC is malformed
+    """
+    if len(record) != len(columns):
+        raise ValueError(f'Host row has {len(record)} values for {len(columns)} columns')
+    host = dict(zip(columns, record))
+    ip_key(host['IP Address'])
+    if host['MAC Address'] != NO_MAC:
+        mac_to_bytes(host['MAC Address'])
+    return host
+
+
+def partition_subnets(subnets, prefix=DEFAULT_PARTITION_PREFIX):
+    """
+    Split subnets into segments of at most /prefix. The network and
+    broadcast addresses of inner segments are real hosts of the parent
+    subnet, so they are added to the segment's targets as /32s.
+    Args:
+        subnets: List of CIDR strings
+        prefix: Largest segment prefix length
+    Returns:
+        dict mapping segment CIDR to the list of CIDRs its agent scans
+    """
+    segments = {}
+    for subnet in subnets:
+        network = ipaddress.IPv4Network(subnet, strict=False)
+        if network.prefixlen >= prefix:
+            segments.setdefault(str(network), [str(network)])
+            continue
+        parent_hosts = (network.network_address, network.broadcast_address)
+        for segment in network.subnets(new_prefix=prefix):
+            targets = segments.setdefault(str(segment), [str(segment)])
+            for edge in (segment.network_address, segment.broadcast_address):
+                if edge not in parent_hosts and f'{edge}/32' not in targets:
+                    targets.append(f'{edge}/32')
+    return segments
+
+
+class ScanTask:
+    """One segment of a distributed scan"""
+
+    def __init__(self, job_id, subnet, options, targets=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.job_id = job_id
+        self.subnet = subnet
+        self.targets = targets or [subnet]
+        self.network = ipaddress.IPv4Network(subnet)
+        self.options = options
+        self.state = PENDING
+        self.agent_id = None
+        self.attempts = 0
+        self.hosts = 0
+        self.error = None
+        self.active = None
+        self.waiting_since = None
+
+    def to_dict(self):
+        return {
+            'task_id': self.id,
+            'job_id': self.job_id,
+            'subnet': self.subnet,
+            'targets': self.targets,
+            'state': self.state,
+            'agent_id': self.agent_id,
+            'attempts': self.attempts,
+            'hosts': self.hosts,
+            'error': self.error
+        }
+
+
+class Coordinator:
+    """Task table shared by the web app's job workers and the agent endpoints"""
+
+    def __init__(self, partition_prefix=DEFAULT_PARTITION_PREFIX, lease_timeout=120, max_attempts=3,
+                 assign_timeout=300):
+        """
+        Args:
+            partition_prefix: Largest segment handed to one agent
+            lease_timeout: Seconds without word from an agent before its task is
+                handed to another agent (and before the agent counts as gone)
+            max_attempts: Leases per task before it is marked failed
+            assign_timeout: Seconds a task may wait with no live agent able to
+                reach it before it is marked failed
+        """
+        self.partition_prefix = partition_prefix
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        self.assign_timeout = assign_timeout
+        self._lock = threading.Lock()
+        self._agents = {}
+        self._tasks = {}
+        self._jobs = {}
+
+    def register(self, name, networks, agent_id=None):
+        """
+        Register (or re-register) an agent
+        Args:
+            name: Display name, e.g. the agent's hostname
+            networks: CIDRs on the agent's interfaces (reachable by ARP)
+            agent_id: ID from an earlier registration (new ID if None)
+        Returns:
+            str agent ID
+        Raises:
+            ValueError: If a network is not a valid CIDR
+        """
+        parsed = [ipaddress.IPv4Network(network, strict=False) for network in networks]
+        agent_id = agent_id or uuid.uuid4().hex[:12]
+        with self._lock:
+            agent = self._agents.setdefault(agent_id, {'tasks_done': 0, 'hosts': 0})
+            agent.update({'name': name, 'networks': parsed, 'last_seen': time.time()})
+        return agent_id
+
+    def _live(self, now):
+        return [
+            (agent_id, agent) for agent_id, agent in self._agents.items()
+            if now - agent['last_seen'] <= self.lease_timeout
+        ]
+
+    def _eligible(self, task, agent, live):
+        """ARP needs a local segment; ICMP and TCP ping can run from any agent nobody local covers"""
+        if any(task.network.overlaps(network) for network in agent['networks']):
+            return True
+        if not set(task.options.get('discovery') or ['arp']) - {'arp'}:
+            return False
+        return not any(
+            task.network.overlaps(network) for _, other in live for network in other['networks']
+        )
+
+    def agents(self):
+        """
+        Returns:
+            list of agent status dicts
+        """
+        now = time.time()
+        with self._lock:
+            leased = {task.agent_id: task.id for task in self._tasks.values() if task.state == LEASED}
+            return [
+                {
+                    'agent_id': agent_id,
+                    'name': agent['name'],
+                    'networks': [str(network) for network in agent['networks']],
+                    'last_seen': agent['last_seen'],
+                    'online': now - agent['last_seen'] <= self.lease_timeout,
+                    'task_id': leased.get(agent_id),
+                    'tasks_done': agent['tasks_done'],
+                    'hosts': agent['hosts']
+                }
+                for agent_id, agent in self._agents.items()
+            ]
+
+    def submit(self, job_id, subnets, options, on_host=None, on_task=None):
+        """
+        Partition a scan into segment tasks for the agents
+        Args:
+            job_id: ID of the scan job
+            subnets: Subnets to scan
+            options: Scan options passed to the agents (ports, discovery, services)
+            on_host: Callable receiving every host dict an agent reports
+            on_task: Callable receiving a task dict whenever a task finishes
+        Returns:
+            list of task dicts
+        """
+        tasks = [ScanTask(job_id, segment, options, targets)
+                 for segment, targets in partition_subnets(subnets, self.partition_prefix).items()]
+        with self._lock:
+            for task in tasks:
+                self._tasks[task.id] = task
+            self._jobs[job_id] = {
+                'tasks': [task.id for task in tasks],
+                'on_host': on_host,
+                'on_task': on_task,
+                'finished': threading.Event()
+            }
+            if not tasks:
+                self._jobs[job_id]['finished'].set()
+        return [task.to_dict() for task in tasks]
+
+    def _reap(self, now):
+        """Requeue tasks of silent agents and fail tasks nobody can reach; returns finished tasks"""
+        finished = []
+        live = self._live(now)
+        for task in self._tasks.values():
+            if task.state == LEASED and now - task.active > self.lease_timeout:
+                task.agent_id = None
+                if task.attempts >= self.max_attempts:
+                    task.state = FAILED
+                    task.error = f'No result after {task.attempts} attempts'
+                    finished.append(task)
+                else:
+                    task.state = PENDING
+            if task.state == PENDING:
+                if any(self._eligible(task, agent, live) for _, agent in live):
+                    task.waiting_since = None
+                elif task.waiting_since is None:
+                    task.waiting_since = now
+                elif now - task.waiting_since > self.assign_timeout:
+                    task.state = FAILED
+                    task.error = 'No agent can reach this segment'
+                    finished.append(task)
+        return finished
+
+    def _finish(self, tasks):
+        """Run task callbacks and wake waiters once every task of a job has finished"""
+        for task in tasks:
+            job = self._jobs.get(task.job_id)
+            if job is None:
+                continue
+            if job['on_task'] is not None:
+                job['on_task'](task.to_dict())
+            with self._lock:
+                states = [self._tasks[task_id].state for task_id in job['tasks']]
+            if all(state in (DONE, FAILED) for state in states):
+                job['finished'].set()
+
+    def lease(self, agent_id):
+        """
+        Hand the next task this agent can reach to it
+        Args:
+            agent_id: Registered agent ID
+        Returns:
+            task dict with scan options, or None if there is no work
+        Raises:
+            KeyError: If the agent is not registered
+        """
+        now = time.time()
+        with self._lock:
+            agent = self._agents[agent_id]
+            agent['last_seen'] = now
+            finished = self._reap(now)
+            live = self._live(now)
+            task = next(
+                (task for task in self._tasks.values()
+                 if task.state == PENDING and self._eligible(task, agent, live)),
+                None
+            )
+            if task is not None:
+                task.state = LEASED
+                task.agent_id = agent_id
+                task.attempts += 1
+                task.active = now
+        self._finish(finished)
+        if task is None:
+            return None
+        return dict(task.to_dict(), options=task.options)
+
+    def report(self, agent_id, task_id, lines):
+        """
+        Consume a task's result stream as it arrives
+        Args:
+            agent_id: Agent holding the lease
+            task_id: Leased task
+            lines: Iterable of protocol lines (bytes or str)
+        Returns:
+            task dict after the report
+        Raises:
+            KeyError: If the agent or task is unknown
+            PermissionError: If the task is not leased to this agent
+            ValueError: If the stream breaks the protocol
+        """
+        with self._lock:
+            task = self._tasks[task_id]
+            if task.state != LEASED or task.agent_id != agent_id:
+                raise PermissionError(f'Task {task_id} is not leased to agent {agent_id}')
+            job = self._jobs[task.job_id]
+
+        columns = None
+        status = None
+        try:
+            for line in lines:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                with self._lock:
+                    task.active = time.time()
+                    self._agents[agent_id]['last_seen'] = task.active
+                if record is None:
+                    # Heartbeat: the agent is still discovering hosts
+                    continue
+                if columns is None:
+                    if not isinstance(record, dict) or record.get('v') != PROTOCOL_VERSION:
+                        raise ValueError('Result stream must start with a protocol header')
+                    columns = record.get('columns')
+                    if not isinstance(columns, list) or not all(isinstance(name, str) for name in columns):
+                        raise ValueError('Protocol header needs a list of column names')
+                    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+                    if missing:
+                        raise ValueError(f"Protocol header lacks columns: {', '.join(missing)}")
+                elif isinstance(record, list):
+                    host = decode_host(columns, record)
+                    task.hosts += 1
+                    if job['on_host'] is not None:
+                        job['on_host'](host)
+                else:
+                    status = record
+                    break
+        except ValueError:
+            with self._lock:
+                if task.state == LEASED and task.agent_id == agent_id:
+                    # Hand the task to the next lease instead of waiting out this one
+                    task.active = 0
+            raise
+
+        with self._lock:
+            if task.state != LEASED or task.agent_id != agent_id:
+                # The lease expired while the stream was running
+                return task.to_dict()
+            if status is None:
+                # Stream cut off: let the lease expire and retry elsewhere
+                task.active = 0
+                return task.to_dict()
+            if 'error' in status:
+                task.state = FAILED
+                task.error = status['error']
+            else:
+                task.state = DONE
+                self._agents[agent_id]['tasks_done'] += 1
+                self._agents[agent_id]['hosts'] += task.hosts
+        self._finish([task])
+        return task.to_dict()
+
+    def job_status(self, job_id):
+        """
+        Returns:
+            dict of task counts by state and hosts reported, or None for an unknown job
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            tasks = [self._tasks[task_id] for task_id in job['tasks']]
+            counts = {state: 0 for state in (PENDING, LEASED, DONE, FAILED)}
+            for task in tasks:
+                counts[task.state] += 1
+            return dict(counts, total=len(tasks), hosts=sum(task.hosts for task in tasks))
+
+    def tasks(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id, {'tasks': []})
+            return [self._tasks[task_id].to_dict() for task_id in job['tasks']]
+
+    def wait(self, job_id, poll=1.0, cancelled=None):
+        """
+        Block until every task of a job is done or failed
+        Args:
+            job_id: Job ID
+            poll: Seconds between checks for expired leases
+            cancelled: Callable returning True to stop waiting early (optional)
+        Returns:
+            dict from job_status
+        """
+        finished_event = self._jobs[job_id]['finished']
+        while not finished_event.wait(poll):
+            if cancelled is not None and cancelled():
+                break
+            with self._lock:
+                finished = self._reap(time.time())
+            self._finish(finished)
+        return self.job_status(job_id)
+
+    def forget(self, job_id):
+        """Drop the tasks of a finished job"""
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+            for task_id in job['tasks'] if job else []:
+                self._tasks.pop(task_id, None)
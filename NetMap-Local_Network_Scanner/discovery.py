@@ -0,0 +1,290 @@
+"""
+NetMap - Routed Host Discovery
+ICMP echo sweep and TCP connect ping for subnets beyond the local broadcast
+domain, where ARP cannot reach
+"""
+
+import asyncio
+import os
+import random
+import select
+import socket
+import struct
+import time
+
+from port_prober import AsyncPortProber
+
+DISCOVERY_METHODS = ('arp', 'icmp', 'tcp')
+DEFAULT_DISCOVERY = ('arp',)
+
+# MAC address of hosts found through a router, where ARP cannot see them
+NO_MAC = 'N/A'
+
+# Ports a TCP ping tries; a SYN/ACK or a RST from any of them proves the host is up
+TCP_PING_PORTS = (80, 443, 22)
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+
+
+def icmp_checksum(data):
+    """RFC 1071 internet checksum"""
+    if len(data) % 2:
+        data += b'\x00'
+    total = sum(struct.unpack(f'>{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def build_echo_request(ident, seq, payload=b'NetMap'):
+    """
+    Build an ICMP echo request
+    Args:
+        ident: Identifier (replaced by the kernel on unprivileged sockets)
+        seq: Sequence number
+        payload: Echo data
+    Returns:
+        bytes ICMP message
+    """
+    header = struct.pack('>BBHHH', ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    checksum = icmp_checksum(header + payload)
+    return struct.pack('>BBHHH', ICMP_ECHO_REQUEST, 0, checksum, ident, seq) + payload
+
+
+def parse_echo_reply(message):
+    """
+    Parse an ICMP echo reply
+    Args:
+        message: ICMP message without the IP header
+    Returns:
+        tuple (ident, seq) or None if it is not an echo reply
+    """
+    if len(message) < 8 or message[0] != ICMP_ECHO_REPLY:
+        return None
+    _, _, _, ident, seq = struct.unpack('>BBHHH', message[:8])
+    return ident, seq
+
+
+class IcmpSocketTransport:
+    """
+    Sends echo requests on a raw ICMP socket, or on an unprivileged ping
+    socket (Linux, macOS) when raw sockets are not permitted
+    """
+
+    def __init__(self):
+        try:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+            self.raw = True
+        except PermissionError:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+            self.raw = False
+        self.sock.setblocking(False)
+        # A /16 sweep can have thousands of replies in flight
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+
+    def send(self, ip, message):
+        try:
+            self.sock.sendto(message, (ip, 0))
+        except OSError:
+            # e.g. no route to host; the target simply stays silent
+            pass
+
+    def recv(self, timeout):
+        """
+        Returns:
+            list of (source ip, ICMP message) received within timeout
+        """
+        readable, _, _ = select.select([self.sock], [], [], max(0.0, timeout))
+        if not readable:
+            return []
+        messages = []
+        while True:
+            try:
+                data, addr = self.sock.recvfrom(2048)
+            except BlockingIOError:
+                break
+            if self.raw:
+                # Raw sockets deliver the IP header too
+                data = data[(data[0] & 0x0F) * 4:]
+            messages.append((addr[0], data))
+        return messages
+
+    def close(self):
+        self.sock.close()
+
+
+class IcmpSweeper:
+    """Rate-limited ICMP echo sweep with retransmits to non-responders only"""
+
+    def __init__(self, transport, rate=1000, retries=1, quiet_period=0.5, timeout=2.0):
+        """
+        Args:
+            transport: Object with send(ip, message), recv(timeout) and close()
+            rate: Maximum echo requests per second
+            retries: Extra rounds sent to hosts that did not answer
+            quiet_period: Stop waiting once no reply arrived for this long
+                (doubled on every retry round)
+            timeout: Upper bound on the wait after each round
+        """
+        self.transport = transport
+        self.rate = rate
+        self.retries = retries
+        self.quiet_period = quiet_period
+        self.timeout = timeout
+        self.ident = os.getpid() & 0xFFFF
+        self.sent = 0
+
+    def _collect(self, found, wanted, timeout):
+        """Receive replies for up to timeout seconds; return True if any was new"""
+        new_reply = False
+        for ip, message in self.transport.recv(timeout):
+            parsed = parse_echo_reply(message)
+            # Unprivileged sockets rewrite the identifier and filter replies themselves
+            if parsed is None or (getattr(self.transport, 'raw', True) and parsed[0] != self.ident):
+                continue
+            if ip in wanted and ip not in found:
+                found.add(ip)
+                new_reply = True
+        return new_reply
+
+    def sweep(self, targets):
+        """
+        Find the targets that answer an echo request
+        Args:
+            targets: Iterable of IPv4 address strings
+        Returns:
+            list of responding IPs, in target order
+        """
+        targets = list(dict.fromkeys(str(ip) for ip in targets))
+        wanted = set(targets)
+        found = set()
+        interval = 1.0 / self.rate if self.rate else 0.0
+        seq = random.randrange(0x10000)
+
+        for attempt in range(self.retries + 1):
+            pending = [ip for ip in targets if ip not in found]
+            if not pending:
+                break
+
+            next_send = time.monotonic()
+            for ip in pending:
+                seq = (seq + 1) & 0xFFFF
+                self.transport.send(ip, build_echo_request(self.ident, seq))
+                self.sent += 1
+                next_send += interval
+                self._collect(found, wanted, max(0.0, next_send - time.monotonic()))
+
+            quiet = self.quiet_period * (2 ** attempt)
+            last_reply = time.monotonic()
+            deadline = last_reply + self.timeout
+            while len(found) < len(targets):
+                wait = min(deadline, last_reply + quiet) - time.monotonic()
+                if wait <= 0:
+                    break
+                if self._collect(found, wanted, wait):
+                    last_reply = time.monotonic()
+
+        return [ip for ip in targets if ip in found]
+
+    def close(self):
+        self.transport.close()
+
+
+class TcpPinger(AsyncPortProber):
+    """
+    TCP ping built on the connect prober: the kernel sends the SYN, and either
+    a SYN/ACK (connection accepted) or a RST (connection refused) proves the
+    host is up. Only silence counts as down.
+    """
+
+    def __init__(self, ports=TCP_PING_PORTS, timeout=1, max_concurrency=512, rate=1000):
+        """
+        Args:
+            ports: Ports to try on every host
+            timeout: Seconds to wait for each connection attempt
+            max_concurrency: Maximum number of connection attempts in flight
+            rate: Maximum connection attempts per second
+        """
+        super().__init__(timeout=timeout, max_concurrency=max_concurrency, per_host_limit=len(ports))
+        self.ports = list(ports)
+        self.rate = rate
+        self.sent = 0
+        self._next_send = 0.0
+
+    async def _connect(self, ip, port):
+        if self.rate:
+            # Reserve the next send slot, then sleep until it comes round
+            now = time.monotonic()
+            slot = max(self._next_send, now)
+            self._next_send = slot + 1.0 / self.rate
+            await asyncio.sleep(slot - now)
+
+        loop = asyncio.get_running_loop()
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        self.sent += 1
+        try:
+            await asyncio.wait_for(loop.sock_connect(sock, (ip, port)), self.timeout)
+            return True
+        except ConnectionRefusedError:
+            return True
+        except (OSError, asyncio.TimeoutError):
+            return False
+        finally:
+            sock.close()
+
+    def ping(self, ips):
+        """
+        Find the hosts that answer on any ping port
+        Args:
+            ips: Iterable of IP addresses
+        Returns:
+            list of responding IPs, in input order
+        """
+        ips = list(dict.fromkeys(ips))
+        self._next_send = 0.0
+        self.sent = 0
+        if not ips:
+            return []
+        alive = asyncio.run(self._ping_all(ips))
+        return [ip for ip in ips if ip in alive]
+
+    async def _ping_all(self, ips):
+        """
+        Try each host's ping ports in turn, stopping at the first accept or
+        refusal, so a live host costs one connection attempt rather than one per port
+        """
+        alive = set()
+        pending = iter(ips)
+
+        async def worker():
+            for ip in pending:
+                for port in self.ports:
+                    if await self._connect(ip, port):
+                        alive.add(ip)
+                        break
+
+        await asyncio.gather(*(worker() for _ in range(min(self.max_concurrency, len(ips)))))
+        return alive
+
+
+def neighbour_macs(path='/proc/net/arp'):
+    """
+    Read the kernel neighbour table, filled in as a side effect of pinging
+    hosts on a local subnet
+    Returns:
+        dict mapping ip to MAC address (empty where the table is unavailable)
+    """
+    macs = {}
+    try:
+        with open(path) as f:
+            next(f, None)
+            for line in f:
+                fields = line.split()
+                # Flags 0x0 means the entry is incomplete
+                if len(fields) >= 4 and fields[2] != '0x0' and fields[3] != '00:00:00:00:00:00':
+                    macs[fields[0]] = fields[3]
+    except OSError:
+        pass
+    return macs
@@ -0,0 +1,272 @@
+"""
+NetMap - Streaming Exporters
+Write scan results row by row as CSV, JSON Lines or Parquet, optionally
+gzip-compressed, so exporting a large scan never holds the whole file in memory
+"""
+
+import csv
+import gzip
+import io
+import json
+import os
+import zlib
+from datetime import datetime
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+EXPORT_FORMATS = ('csv', 'jsonl', 'parquet')
+
+EXPORTS_DIR = os.path.join(os.path.dirname(__file__), 'exports')
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+# Rows buffered per Parquet row group
+PARQUET_BATCH_SIZE = 4096
+
+# Bytes gathered before a chunk of a streamed download is sent
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def export_filename(filename=None, fmt='csv', compress=False):
+    """
+    Name an export file, adding the extension of the format
+    Args:
+        filename: Requested name (auto-generated from the time if None)
+        fmt: Export format
+        compress: gzip the file (not for Parquet, which compresses internally)
+    Returns:
+        str filename such as 'netmap_scan_20240101_120000.jsonl.gz'
+    """
+    if not filename:
+        filename = f"netmap_scan_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    extension = f".{fmt}.gz" if compress and fmt != 'parquet' else f".{fmt}"
+    if not filename.endswith(extension):
+        filename += extension
+    return filename
+
+
+def detect_format(path):
+    """
+    Guess the export format from a file name
+    Args:
+        path: File name such as 'scan.csv.gz'
+    Returns:
+        tuple (format, compressed)
+    Raises:
+        ValueError: If the extension is not an export format
+    """
+    name = path.lower()
+    compress = name.endswith('.gz')
+    if compress:
+        name = name[:-3]
+    fmt = os.path.splitext(name)[1].lstrip('.')
+    if fmt == 'json':
+        fmt = 'jsonl'
+    if fmt not in EXPORT_FORMATS or (compress and fmt == 'parquet'):
+        raise ValueError(f"Unknown export format: {path}")
+    return fmt, compress
+
+
+class CsvExporter:
+    """Writes one CSV row per host"""
+
+    def __init__(self, stream, fieldnames):
+        """
+        Args:
+            stream: Text stream to write to
+            fieldnames: Column order
+        """
+        self.stream = stream
+        self.rows = 0
+        self._writer = csv.DictWriter(stream, fieldnames=fieldnames, extrasaction='ignore')
+        self._writer.writeheader()
+
+    def write(self, host):
+        self._writer.writerow(host)
+        self.rows += 1
+
+    def close(self):
+        self.stream.close()
+
+
+class JsonlExporter:
+    """Writes one JSON object per host and line"""
+
+    def __init__(self, stream, fieldnames):
+        """
+        Args:
+            stream: Text stream to write to
+            fieldnames: Column order
+        """
+        self.stream = stream
+        self.fieldnames = fieldnames
+        self.rows = 0
+
+    def write(self, host):
+        record = {field: host.get(field) for field in self.fieldnames}
+        self.stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.rows += 1
+
+    def close(self):
+        self.stream.close()
+
+
+class ParquetExporter:
+    """Buffers hosts into row groups and writes each to a Parquet file"""
+
+    def __init__(self, path, fieldnames, batch_size=PARQUET_BATCH_SIZE):
+        """
+        Args:
+            path: Output file
+            fieldnames: Column order (all columns are stored as strings)
+            batch_size: Rows per row group
+        Raises:
+            RuntimeError: If pyarrow is not installed
+        """
+        if pyarrow is None:
+            raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+        self.fieldnames = fieldnames
+        self.batch_size = batch_size
+        self.rows = 0
+        self._schema = pyarrow.schema([(field, pyarrow.string()) for field in fieldnames])
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema, compression='zstd')
+        self._batch = {field: [] for field in fieldnames}
+
+    def _flush(self):
+        if self._batch[self.fieldnames[0]]:
+            self._writer.write_table(pyarrow.table(self._batch, schema=self._schema))
+            self._batch = {field: [] for field in self.fieldnames}
+
+    def write(self, host):
+        for field in self.fieldnames:
+            value = host.get(field)
+            self._batch[field].append(None if value is None else str(value))
+        self.rows += 1
+        if len(self._batch[self.fieldnames[0]]) >= self.batch_size:
+            self._flush()
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+
+def open_exporter(path, fieldnames, fmt=None, compress=None):
+    """
+    Open a streaming exporter on a file
+    Args:
+        path: Output file
+        fieldnames: Column order
+        fmt: 'csv', 'jsonl' or 'parquet' (detected from the file name if None)
+        compress: gzip the output (detected from a '.gz' suffix if None)
+    Returns:
+        Exporter with write(host) and close()
+    Raises:
+        ValueError: If the format is unknown
+        RuntimeError: If Parquet is requested without pyarrow
+    """
+    if fmt is None:
+        fmt, detected = detect_format(path)
+        compress = detected if compress is None else compress
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    if fmt == 'parquet':
+        return ParquetExporter(path, fieldnames)
+    if compress:
+        stream = gzip.open(path, 'wt', newline='', encoding='utf-8')
+    else:
+        stream = open(path, 'w', newline='', encoding='utf-8')
+    exporter_class = CsvExporter if fmt == 'csv' else JsonlExporter
+    return exporter_class(stream, fieldnames)
+
+
+def export_hosts(hosts, fieldnames, filename=None, fmt='csv', compress=False):
+    """
+    Export hosts to a file in the exports directory
+    Args:
+        hosts: Iterable of host dicts or HostTable rows
+        fieldnames: Column order
+        filename: Output filename (optional, auto-generated if None)
+        fmt: Export format
+        compress: gzip the file
+    Returns:
+        str: Path to the saved file
+    """
+    os.makedirs(EXPORTS_DIR, exist_ok=True)
+    filepath = os.path.join(EXPORTS_DIR, export_filename(filename, fmt, compress))
+
+    exporter = open_exporter(filepath, fieldnames, fmt, compress)
+    try:
+        for host in hosts:
+            exporter.write(host)
+    finally:
+        exporter.close()
+    return filepath
+
+
+class _ChunkBuffer(io.RawIOBase):
+    """Byte sink that hands its contents out in chunks"""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.data += data
+        return len(data)
+
+    def take(self):
+        chunk = bytes(self.data)
+        self.data.clear()
+        return chunk
+
+
+def stream_export(hosts, fieldnames, fmt='csv', compress=False, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Render hosts as an export file in chunks, for a chunked HTTP download
+    Args:
+        hosts: Iterable of host dicts or HostTable rows
+        fieldnames: Column order
+        fmt: 'csv' or 'jsonl'
+        compress: gzip the stream
+        chunk_size: Bytes gathered before a chunk is yielded
+    Yields:
+        bytes chunks of the file
+    Raises:
+        ValueError: If the format cannot be streamed
+    """
+    if fmt not in ('csv', 'jsonl'):
+        raise ValueError(f"Format cannot be streamed: {fmt}")
+
+    sink = _ChunkBuffer()
+    stream = io.TextIOWrapper(sink, encoding='utf-8', newline='', write_through=True)
+    exporter = (CsvExporter if fmt == 'csv' else JsonlExporter)(stream, fieldnames)
+    # wbits=31 produces a gzip member rather than a raw zlib stream
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    def encode(data, final=False):
+        if compressor is None:
+            return data
+        data = compressor.compress(data)
+        return data + compressor.flush() if final else data
+
+    for host in hosts:
+        exporter.write(host)
+        if len(sink.data) >= chunk_size:
+            chunk = encode(sink.take())
+            if chunk:
+                yield chunk
+
+    chunk = encode(sink.take(), final=True)
+    if chunk:
+        yield chunk
@@ -0,0 +1,251 @@
+"""
+NetMap - Scan History Store
+Append-only record of every scan in SQLite (WAL), indexed by MAC, IP, port
+and time so history queries are index seeks rather than CSV scans
+"""
+
+import ipaddress
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from port_profiles import OPEN_PORTS_FIELD
+
+DEFAULT_HISTORY_PATH = os.path.join(os.path.dirname(__file__), 'cache', 'netmap_history.db')
+
+# Port number at the end of a column name such as "SSH (22)"
+_PORT_COLUMN = re.compile(r'\((\d+)\)$')
+_RELATIVE_TIME = re.compile(r'^(\d+)\s*([smhdw])$')
+_UNIT_SECONDS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS scans ('
+    '  id INTEGER PRIMARY KEY,'
+    '  started REAL NOT NULL,'
+    '  subnets TEXT,'
+    '  source TEXT,'
+    '  host_count INTEGER NOT NULL)',
+    # IPs are stored as integers so range queries stay cheap
+    'CREATE TABLE IF NOT EXISTS observations ('
+    '  scan_id INTEGER NOT NULL,'
+    '  seen REAL NOT NULL,'
+    '  ip INTEGER NOT NULL,'
+    '  mac TEXT NOT NULL,'
+    '  vendor TEXT,'
+    '  hostname TEXT)',
+    'CREATE INDEX IF NOT EXISTS observations_mac ON observations (mac, seen)',
+    'CREATE INDEX IF NOT EXISTS observations_ip ON observations (ip, seen)',
+    'CREATE INDEX IF NOT EXISTS observations_seen ON observations (seen)',
+    # Only open ports are stored; a closed port is the absence of a row
+    'CREATE TABLE IF NOT EXISTS open_ports ('
+    '  scan_id INTEGER NOT NULL,'
+    '  seen REAL NOT NULL,'
+    '  port INTEGER NOT NULL,'
+    '  ip INTEGER NOT NULL,'
+    '  mac TEXT NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS open_ports_port ON open_ports (port, seen)',
+)
+
+
+def parse_time(value, now=None):
+    """
+    Parse a query time bound
+    Args:
+        value: Epoch seconds, an ISO date/time, or a relative age such as '7d' or '12h'
+        now: Reference time for relative ages (current time if None)
+    Returns:
+        float epoch seconds, or None if value is empty
+    Raises:
+        ValueError: If the value cannot be parsed
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    value = str(value).strip()
+    match = _RELATIVE_TIME.match(value.lower())
+    if match:
+        age = int(match.group(1)) * _UNIT_SECONDS[match.group(2)]
+        return (now if now is not None else time.time()) - age
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise ValueError(f"Invalid time: {value}")
+
+
+def open_ports_of(host):
+    """
+    Extract the open port numbers of a host record
+    Args:
+        host: Host dict with per-port columns or an 'Open Ports' list
+    Returns:
+        list of int ports
+    """
+    ports = []
+    for column, value in host.items():
+        if column == OPEN_PORTS_FIELD:
+            ports.extend(int(port) for port in str(value).split(',') if port.strip().isdigit())
+        elif value == 'Open':
+            match = _PORT_COLUMN.search(column)
+            if match:
+                ports.append(int(match.group(1)))
+    return ports
+
+
+def _ip_to_int(ip):
+    return int(ipaddress.IPv4Address(ip))
+
+
+def _int_to_ip(value):
+    return str(ipaddress.IPv4Address(value))
+
+
+class HistoryStore:
+    """Append-only scan history with indexed lookups"""
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH):
+        """
+        Args:
+            path: SQLite file holding the history (':memory:' for tests)
+        """
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            for statement in _SCHEMA:
+                self._conn.execute(statement)
+
+    def record_scan(self, hosts, subnets=None, source=None, timestamp=None):
+        """
+        Append one scan to the history
+        Args:
+            hosts: List of host dicts as produced by NetworkScanner.gather_host_info
+            subnets: Subnets covered by the scan (informational)
+            source: What ran the scan ('cli', 'web', 'monitor', ...)
+            timestamp: Scan time in epoch seconds (now if None)
+        Returns:
+            int scan ID
+        """
+        seen = timestamp if timestamp is not None else time.time()
+        observations = []
+        open_ports = []
+        for host in hosts:
+            ip = _ip_to_int(host['IP Address'])
+            mac = host['MAC Address'].lower()
+            observations.append((ip, mac, host.get('Vendor'), host.get('Hostname')))
+            open_ports.extend((port, ip, mac) for port in open_ports_of(host))
+
+        with self._lock, self._conn:
+            scan_id = self._conn.execute(
+                'INSERT INTO scans (started, subnets, source, host_count) VALUES (?, ?, ?, ?)',
+                (seen, ', '.join(subnets or []), source, len(hosts))
+            ).lastrowid
+            self._conn.executemany(
+                'INSERT INTO observations (scan_id, seen, ip, mac, vendor, hostname) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [(scan_id, seen) + row for row in observations]
+            )
+            self._conn.executemany(
+                'INSERT INTO open_ports (scan_id, seen, port, ip, mac) VALUES (?, ?, ?, ?, ?)',
+                [(scan_id, seen) + row for row in open_ports]
+            )
+        return scan_id
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def first_seen(self, mac):
+        """
+        When a MAC address was first and last seen
+        Args:
+            mac: MAC address
+        Returns:
+            dict with first/last time and IP, or None if never seen
+        """
+        mac = mac.lower()
+        first = self._query(
+            'SELECT seen, ip FROM observations WHERE mac = ? ORDER BY seen ASC LIMIT 1', (mac,)
+        )
+        if not first:
+            return None
+        last = self._query(
+            'SELECT seen, ip FROM observations WHERE mac = ? ORDER BY seen DESC LIMIT 1', (mac,)
+        )
+        return {
+            'mac': mac,
+            'first_seen': first[0][0],
+            'first_ip': _int_to_ip(first[0][1]),
+            'last_seen': last[0][0],
+            'last_ip': _int_to_ip(last[0][1])
+        }
+
+    def hosts_with_port(self, port, since=None, until=None):
+        """
+        Hosts seen with a port open within a time window
+        Args:
+            port: Port number
+            since: Start of the window in epoch seconds (all history if None)
+            until: End of the window in epoch seconds (now if None)
+        Returns:
+            list of dicts with IP, MAC, first/last time open and observation count
+        """
+        rows = self._query(
+            'SELECT ip, mac, MIN(seen), MAX(seen), COUNT(*) FROM open_ports '
+            'WHERE port = ? AND seen >= ? AND seen <= ? GROUP BY ip, mac ORDER BY ip',
+            (port, since if since is not None else 0, until if until is not None else float('inf'))
+        )
+        return [
+            {'ip': _int_to_ip(ip), 'mac': mac, 'first_seen': first, 'last_seen': last, 'observations': count}
+            for ip, mac, first, last, count in rows
+        ]
+
+    def ip_history(self, ip, since=None, limit=1000):
+        """
+        Devices observed at an IP address, newest first
+        Args:
+            ip: IP address
+            since: Only observations after this epoch time (all history if None)
+            limit: Maximum number of observations returned
+        Returns:
+            list of dicts with time, MAC, vendor and hostname
+        """
+        rows = self._query(
+            'SELECT seen, mac, vendor, hostname FROM observations '
+            'WHERE ip = ? AND seen >= ? ORDER BY seen DESC LIMIT ?',
+            (_ip_to_int(ip), since if since is not None else 0, limit)
+        )
+        return [
+            {'seen': seen, 'mac': mac, 'vendor': vendor, 'hostname': hostname}
+            for seen, mac, vendor, hostname in rows
+        ]
+
+    def scans(self, limit=50):
+        """
+        Returns:
+            list of the most recent scans, newest first
+        """
+        rows = self._query(
+            'SELECT id, started, subnets, source, host_count FROM scans ORDER BY id DESC LIMIT ?',
+            (limit,)
+        )
+        return [
+            {'scan_id': scan_id, 'started': started, 'subnets': subnets, 'source': source, 'host_count': count}
+            for scan_id, started, subnets, source, count in rows
+        ]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
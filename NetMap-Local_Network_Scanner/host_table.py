@@ -0,0 +1,256 @@
+"""
+NetMap - Columnar Host Table
+Compact storage for scan results: IPs as uint32, MACs as 6-byte fields,
+port states as per-host bitsets and vendor/hostname strings interned once,
+with row views that still read like the legacy host dicts
+"""
+
+import socket
+import struct
+from array import array
+from collections.abc import Mapping, Sequence
+
+from discovery import NO_MAC
+from port_profiles import (
+    OPEN_PORTS_FIELD, PORT_COLUMN_LIMIT, SERVICES_FIELD, port_column, result_fieldnames
+)
+
+_NO_MAC_BYTES = bytes(6)
+
+
+def ip_key(ip):
+    """
+    Sort key for a dotted IPv4 address, much cheaper than ipaddress.IPv4Address
+    Args:
+        ip: IPv4 address string
+    Returns:
+        int value of the address
+    Raises:
+        ValueError: If ip is not a dotted-quad IPv4 address
+    """
+    try:
+        # inet_pton, unlike inet_aton, rejects short forms such as '10.1'
+        return struct.unpack('!I', socket.inet_pton(socket.AF_INET, ip))[0]
+    except (OSError, TypeError):
+        raise ValueError(f"Invalid IPv4 address: {ip!r}") from None
+
+
+def mac_to_bytes(mac):
+    """
+    Pack a MAC address into its 6-byte table field
+    Args:
+        mac: MAC in aa:bb:cc:dd:ee:ff or aa-bb-... form, or 'N/A' for routed hosts
+    Returns:
+        bytes of length 6
+    Raises:
+        ValueError: If mac is not a 6-byte MAC address
+    """
+    if mac == NO_MAC:
+        return _NO_MAC_BYTES
+    try:
+        raw = bytes.fromhex(mac.replace(':', '').replace('-', ''))
+    except (AttributeError, ValueError):
+        raw = b''
+    # A short MAC would shift every later row's 6-byte field
+    if len(raw) != 6:
+        raise ValueError(f"Invalid MAC address: {mac!r}")
+    return raw
+
+
+def _bytes_to_mac(raw):
+    if raw == _NO_MAC_BYTES:
+        return NO_MAC
+    return ':'.join(f'{b:02x}' for b in raw)
+
+
+class HostRow(Mapping):
+    """
+    Read-only view of one table row with the legacy host dict keys, so CSV
+    writers, history and change tracking can use it like a dict. Values are
+    rendered on access.
+    """
+
+    __slots__ = ('_table', '_index')
+
+    def __init__(self, table, index):
+        self._table = table
+        self._index = index
+
+    def __getitem__(self, field):
+        return self._table._value(self._index, field)
+
+    def __iter__(self):
+        return iter(self._table.fieldnames)
+
+    def __len__(self):
+        return len(self._table.fieldnames)
+
+    def __repr__(self):
+        return f"HostRow({dict(self)!r})"
+
+
+class HostTable(Sequence):
+    """
+    Scan results stored column by column. Indexing returns HostRow views; a
+    view follows its position, so views taken before sort() see the new order.
+    """
+
+    def __init__(self, ports, services=False):
+        """
+        Args:
+            ports: Scanned port numbers (one bit per port per host)
+            services: Keep the 'Services' column of service detection
+        """
+        self.ports = sorted(ports)
+        self.services = services
+        self.fieldnames = result_fieldnames(self.ports, services)
+        self._bit = {port: i for i, port in enumerate(self.ports)}
+        self._column_bit = {port_column(port): i for i, port in enumerate(self.ports)}
+        self._stride = (len(self.ports) + 7) // 8
+
+        self._ips = array('I')
+        self._macs = bytearray()
+        self._vendors = array('I')
+        self._hostnames = array('I')
+        self._service_ids = array('I')
+        self._port_bits = bytearray()
+
+        # Vendors and hostnames repeat a lot across a large network
+        self._strings = []
+        self._string_ids = {}
+
+    def _intern(self, value):
+        value = '' if value is None else str(value)
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = self._string_ids[value] = len(self._strings)
+            self._strings.append(value)
+        return string_id
+
+    def add(self, ip, mac, vendor, hostname, port_status, services=None):
+        """
+        Append one host
+        Args:
+            ip: IP address
+            mac: MAC address (or 'N/A' for routed hosts)
+            vendor: Vendor name
+            hostname: Hostname
+            port_status: dict mapping port to True if open
+            services: Rendered 'Services' column (ignored unless the table keeps it)
+        Raises:
+            ValueError: If the IP or MAC address is malformed; nothing is stored
+        """
+        ip_value = ip_key(ip)
+        mac_value = mac_to_bytes(mac)
+        self._ips.append(ip_value)
+        self._macs += mac_value
+        self._vendors.append(self._intern(vendor))
+        self._hostnames.append(self._intern(hostname))
+        if self.services:
+            self._service_ids.append(self._intern(services))
+
+        bits = bytearray(self._stride)
+        for port, is_open in port_status.items():
+            i = self._bit.get(port)
+            if is_open and i is not None:
+                bits[i >> 3] |= 1 << (i & 7)
+        self._port_bits += bits
+
+    def append(self, host):
+        """
+        Append a legacy host dict, as produced by NetworkScanner.gather_host_info
+        Args:
+            host: Host dict (or HostRow)
+        """
+        if OPEN_PORTS_FIELD in host:
+            listed = {int(port) for port in str(host[OPEN_PORTS_FIELD]).split(',') if port.strip().isdigit()}
+            port_status = {port: port in listed for port in self.ports}
+        else:
+            port_status = {
+                port: host.get(port_column(port)) == 'Open' for port in self.ports
+            }
+        self.add(
+            host['IP Address'], host['MAC Address'], host.get('Vendor'), host.get('Hostname'),
+            port_status, host.get(SERVICES_FIELD)
+        )
+
+    def extend(self, hosts):
+        for host in hosts:
+            self.append(host)
+
+    def __len__(self):
+        return len(self._ips)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [HostRow(self, i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('host index out of range')
+        return HostRow(self, index)
+
+    def is_open(self, index, port):
+        """True if the port was open on the host at index"""
+        i = self._bit.get(port)
+        if i is None:
+            return False
+        return bool(self._port_bits[index * self._stride + (i >> 3)] & (1 << (i & 7)))
+
+    def open_ports(self, index):
+        """
+        Returns:
+            list of open port numbers of the host at index
+        """
+        start = index * self._stride
+        bits = self._port_bits[start:start + self._stride]
+        return [port for i, port in enumerate(self.ports) if bits[i >> 3] & (1 << (i & 7))]
+
+    def _value(self, index, field):
+        if field == 'IP Address':
+            return socket.inet_ntoa(struct.pack('!I', self._ips[index]))
+        if field == 'MAC Address':
+            return _bytes_to_mac(self._macs[index * 6:index * 6 + 6])
+        if field == 'Vendor':
+            return self._strings[self._vendors[index]]
+        if field == 'Hostname':
+            return self._strings[self._hostnames[index]]
+        if field == SERVICES_FIELD and self.services:
+            return self._strings[self._service_ids[index]]
+        if field == OPEN_PORTS_FIELD and len(self.ports) > PORT_COLUMN_LIMIT:
+            return ','.join(str(port) for port in self.open_ports(index)) or 'None'
+        i = self._column_bit.get(field)
+        if i is None or len(self.ports) > PORT_COLUMN_LIMIT:
+            raise KeyError(field)
+        is_open = self._port_bits[index * self._stride + (i >> 3)] & (1 << (i & 7))
+        return 'Open' if is_open else 'Closed'
+
+    def sort(self):
+        """Sort hosts by IP address (integer comparison of the stored addresses)"""
+        order = sorted(range(len(self)), key=self._ips.__getitem__)
+        stride = self._stride
+        self._ips = array('I', (self._ips[i] for i in order))
+        self._macs = bytearray(b''.join(self._macs[i * 6:i * 6 + 6] for i in order))
+        self._vendors = array('I', (self._vendors[i] for i in order))
+        self._hostnames = array('I', (self._hostnames[i] for i in order))
+        if self.services:
+            self._service_ids = array('I', (self._service_ids[i] for i in order))
+        self._port_bits = bytearray(b''.join(self._port_bits[i * stride:(i + 1) * stride] for i in order))
+
+    def to_dicts(self):
+        """
+        Returns:
+            list of legacy host dicts (e.g. for JSON responses)
+        """
+        return [dict(row) for row in self]
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the columns and the string pool"""
+        columns = (
+            self._ips.itemsize * len(self._ips) + len(self._macs)
+            + self._vendors.itemsize * (len(self._vendors) + len(self._hostnames) + len(self._service_ids))
+            + len(self._port_bits)
+        )
+        return columns + sum(len(s) for s in self._strings)
+
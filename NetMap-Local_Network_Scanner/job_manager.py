@@ -0,0 +1,184 @@
+"""
+NetMap - Scan Job Manager
+Runs scans as independent jobs on a bounded worker pool, queues the excess
+and evicts finished jobs least-recently-used first
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from scan_events import EventStream
+
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETE = 'complete'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+FINISHED_STATES = (COMPLETE, FAILED, CANCELLED)
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are already waiting for a worker"""
+
+
+class ScanJob:
+    """Status, results and event stream of one scan"""
+
+    def __init__(self, options):
+        """
+        Args:
+            options: dict of scan options (subnets, interfaces, ports, incremental)
+        """
+        self.id = uuid.uuid4().hex[:12]
+        self.options = options
+        self.state = QUEUED
+        self.progress = 0
+        self.message = 'Queued'
+        self.results = None
+        self.columns = None
+        self.statistics = None
+        self.changes = None
+        self.local_ip = None
+        self.subnet = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.events = EventStream()
+        self.future = None
+
+    @property
+    def done(self):
+        return self.state in FINISHED_STATES
+
+    def update_progress(self, progress, message):
+        """Record progress and push it to stream subscribers"""
+        self.progress = progress
+        self.message = message
+        self.events.publish('progress', {'progress': progress, 'message': message})
+
+    def to_dict(self):
+        """Job status without the result rows"""
+        return {
+            'job_id': self.id,
+            'state': self.state,
+            'scanning': self.state in (QUEUED, RUNNING),
+            'progress': self.progress,
+            'message': self.message,
+            'local_ip': self.local_ip,
+            'subnet': self.subnet,
+            'options': self.options,
+            'has_results': self.results is not None,
+            'host_count': len(self.results) if self.results is not None else None,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished
+        }
+
+
+class JobManager:
+    """Bounded pool of scan workers with a job table under an LRU policy"""
+
+    def __init__(self, run_scan, max_workers=2, max_queued=20, max_finished=50):
+        """
+        Args:
+            run_scan: Callable taking a ScanJob; fills in its results
+            max_workers: Scans allowed to run at the same time
+            max_queued: Jobs allowed to wait for a worker
+            max_finished: Finished jobs kept before the least recently used are evicted
+        """
+        self.run_scan = run_scan
+        self.max_queued = max_queued
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='netmap-scan')
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._latest = None
+
+    def submit(self, options):
+        """
+        Queue a new scan
+        Args:
+            options: dict of scan options
+        Returns:
+            ScanJob
+        Raises:
+            JobQueueFull: If max_queued jobs are already waiting
+        """
+        with self._lock:
+            queued = sum(1 for job in self._jobs.values() if job.state == QUEUED)
+            if queued >= self.max_queued:
+                raise JobQueueFull(f"{queued} scans already queued")
+
+            job = ScanJob(options)
+            self._jobs[job.id] = job
+            self._latest = job.id
+            job.future = self._executor.submit(self._run, job)
+            return job
+
+    def _run(self, job):
+        job.state = RUNNING
+        job.started = time.time()
+        try:
+            self.run_scan(job)
+            job.state = COMPLETE
+        except Exception as e:
+            job.state = FAILED
+            job.error = str(e)
+            job.update_progress(0, f'Error: {e}')
+            job.events.publish('failed', {'message': job.message})
+        finally:
+            job.finished = time.time()
+            with self._lock:
+                self._evict()
+
+    def _evict(self):
+        """Drop the least recently used finished jobs beyond max_finished"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        """
+        Look up a job, marking it as recently used
+        Args:
+            job_id: Job ID, or None for the most recently submitted job
+        Returns:
+            ScanJob or None
+        """
+        with self._lock:
+            job_id = job_id or self._latest
+            job = self._jobs.get(job_id)
+            if job is not None:
+                self._jobs.move_to_end(job_id)
+            return job
+
+    def cancel(self, job_id):
+        """
+        Cancel a job that has not started yet
+        Returns:
+            bool: True if the job was cancelled
+        """
+        job = self.get(job_id)
+        if job is None or not job.future.cancel():
+            return False
+        job.state = CANCELLED
+        job.finished = time.time()
+        job.update_progress(0, 'Cancelled')
+        job.events.publish('failed', {'message': 'Cancelled'})
+        with self._lock:
+            self._evict()
+        return True
+
+    def list(self):
+        """
+        Returns:
+            list of job status dicts, oldest first
+        """
+        with self._lock:
+            jobs = sorted(self._jobs.values(), key=lambda job: job.created)
+        return [job.to_dict() for job in jobs]
@@ -0,0 +1,134 @@
+"""
+NetMap - Persistent Lookup Cache
+SQLite-backed cache for vendor and hostname lookups shared across scans
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(__file__), 'cache', 'netmap_cache.db')
+
+# Eviction trims the cache to this fraction of max_entries, so the table is
+# only counted again after that many more inserts
+EVICT_TO = 0.9
+
+
+class LookupCache:
+    """On-disk key/value cache with TTL expiry, LRU bounds and negative entries"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=86400, negative_ttl=900, max_entries=100000):
+        """
+        Args:
+            path: SQLite database file (':memory:' for a private cache)
+            ttl: Seconds a successful lookup stays valid
+            negative_ttl: Seconds a failed lookup stays valid
+            max_entries: Least recently used entries beyond this are evicted
+        """
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        # One connection shared by the scanner's worker threads
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS lookups ('
+                '  kind TEXT NOT NULL,'
+                '  key TEXT NOT NULL,'
+                '  value TEXT,'
+                '  expires REAL NOT NULL,'
+                '  last_used REAL NOT NULL,'
+                '  PRIMARY KEY (kind, key))'
+            )
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS lookups_last_used ON lookups (last_used)'
+            )
+            (self._rows,) = self._conn.execute('SELECT COUNT(*) FROM lookups').fetchone()
+
+    def get(self, kind, key):
+        """
+        Look up a cached value
+        Args:
+            kind: Lookup type, e.g. 'vendor' or 'hostname'
+            key: MAC or IP address
+        Returns:
+            tuple (found, value); value is None for a cached failure
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, expires FROM lookups WHERE kind = ? AND key = ?',
+                (kind, key)
+            ).fetchone()
+
+            if row is None or row[1] < now:
+                self.misses += 1
+                return False, None
+
+            with self._conn:
+                self._conn.execute(
+                    'UPDATE lookups SET last_used = ? WHERE kind = ? AND key = ?',
+                    (now, kind, key)
+                )
+            self.hits += 1
+            return True, row[0]
+
+    def set(self, kind, key, value):
+        """
+        Store a lookup result
+        Args:
+            kind: Lookup type, e.g. 'vendor' or 'hostname'
+            key: MAC or IP address
+            value: Result, or None to record a failed lookup
+        """
+        now = time.time()
+        ttl = self.ttl if value is not None else self.negative_ttl
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO lookups (kind, key, value, expires, last_used) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (kind, key, value, now + ttl, now)
+            )
+            # An upper bound: replacing an existing key does not add a row
+            self._rows += 1
+            if self._rows > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        """Drop the least recently used entries once max_entries is exceeded"""
+        # Recount: replacements and other processes sharing the file make the running count drift
+        (count,) = self._conn.execute('SELECT COUNT(*) FROM lookups').fetchone()
+        if count > self.max_entries:
+            keep = int(self.max_entries * EVICT_TO)
+            self._conn.execute(
+                'DELETE FROM lookups WHERE rowid IN ('
+                '  SELECT rowid FROM lookups ORDER BY last_used LIMIT ?)',
+                (count - keep,)
+            )
+            count = keep
+        self._rows = count
+
+    def purge_expired(self):
+        """
+        Remove expired entries
+        Returns:
+            int number of entries removed
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute('DELETE FROM lookups WHERE expires < ?', (time.time(),))
+            self._rows = max(0, self._rows - cursor.rowcount)
+            return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
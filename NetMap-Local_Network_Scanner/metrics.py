@@ -0,0 +1,244 @@
+"""
+NetMap - Scan Metrics
+Thread-safe counters, histograms and stage timers, rendered in the
+Prometheus text format for /metrics and as a summary for cli.py --profile
+"""
+
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in seconds, from one packet to a whole /16 sweep
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+STAGE_METRIC = 'netmap_stage_duration_seconds'
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count per label set"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(_label_key(labels), 0)
+
+    def samples(self):
+        """
+        Returns:
+            list of (label key, value)
+        """
+        with self._lock:
+            return sorted(self._values.items())
+
+    def render(self):
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in self.samples()]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    """Bucketed observations per label set, with count, sum and max"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (last one is +Inf), count, sum, max
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0, 0.0, 0.0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += 1
+            series[2] += value
+            series[3] = max(series[3], value)
+
+    def stats(self):
+        """
+        Returns:
+            dict mapping label key to {'count', 'sum', 'max'}
+        """
+        with self._lock:
+            return {
+                key: {'count': count, 'sum': total, 'max': peak}
+                for key, (_, count, total, peak) in sorted(self._series.items())
+            }
+
+    def render(self):
+        lines = []
+        with self._lock:
+            series = sorted((key, [list(buckets), count, total]) for key, (buckets, count, total, _)
+                            in self._series.items())
+        for key, (buckets, count, total) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), buckets):
+                cumulative += bucket_count
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(key, [('le', _format_value(bound))])} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+class MetricsRegistry:
+    """Named metrics of one process"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, metric_class, name, help_text, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_class(name, help_text, **kwargs)
+            elif not isinstance(metric, metric_class):
+                raise ValueError(f"Metric {name} is already a {metric.kind}")
+            return metric
+
+    def counter(self, name, help_text=''):
+        """Get or create a counter"""
+        return self._get(Counter, name, help_text)
+
+    def histogram(self, name, help_text='', buckets=DEFAULT_BUCKETS):
+        """Get or create a histogram"""
+        return self._get(Histogram, name, help_text, buckets=buckets)
+
+    @contextmanager
+    def timer(self, stage):
+        """
+        Time a block of work into the stage duration histogram
+        Args:
+            stage: Stage name such as 'arp', 'dns' or 'port_probe'
+        """
+        histogram = self.histogram(STAGE_METRIC, 'Time spent in each scan stage')
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            histogram.observe(time.perf_counter() - started, stage=stage)
+
+    def render(self):
+        """
+        Returns:
+            str in the Prometheus text exposition format (version 0.0.4)
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            if metric.help:
+                lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        """
+        Per-stage timings and all counters, for a human-readable profile
+        Returns:
+            dict with 'stages' {stage: {'count', 'sum', 'max'}} and
+            'counters' {'name{labels}': value}
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        stages = {}
+        counters = {}
+        for metric in metrics:
+            if metric.name == STAGE_METRIC:
+                stages = {dict(key)['stage']: stats for key, stats in metric.stats().items()}
+            elif isinstance(metric, Counter):
+                for key, value in metric.samples():
+                    counters[f"{metric.name}{_format_labels(key)}"] = value
+        return {'stages': stages, 'counters': dict(sorted(counters.items()))}
+
+    def reset(self):
+        """Zero every metric; metrics already handed out stay registered"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.clear()
+
+
+def timed(stage):
+    """
+    Method decorator timing every call into the stage histogram of the
+    instance's metrics registry (self.metrics)
+    Args:
+        stage: Stage name
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.timer(stage):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Process-wide registry shared by every scanner, the web app and the CLI
+REGISTRY = MetricsRegistry()
+
+
+def print_profile(registry=REGISTRY):
+    """Print the per-stage timings and counters of a registry"""
+    summary = registry.summary()
+    print("\n" + "=" * 60)
+    print(f"{'Stage':<16} {'Calls':>8} {'Total (s)':>12} {'Mean (ms)':>12} {'Max (ms)':>10}")
+    print("=" * 60)
+    for stage, stats in sorted(summary['stages'].items(), key=lambda item: -item[1]['sum']):
+        mean = stats['sum'] / stats['count'] * 1000 if stats['count'] else 0.0
+        print(f"{stage:<16} {stats['count']:>8} {stats['sum']:>12.3f} {mean:>12.2f} {stats['max'] * 1000:>10.2f}")
+    print("=" * 60)
+    width = max((len(name) for name in summary['counters']), default=0)
+    for name, value in summary['counters'].items():
+        print(f"{name:<{width}} {value:>8}")
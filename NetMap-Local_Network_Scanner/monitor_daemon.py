@@ -0,0 +1,247 @@
+"""
+NetMap - Continuous Monitoring Daemon
+Rescans the network forever, spreading ARP sweeps and port probes evenly
+across the interval so the packet and CPU budget stays flat
+"""
+
+import argparse
+import ipaddress
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from change_detector import ChangeDetector, REMOVED
+from history_store import HistoryStore
+from host_table import ip_key
+from discovery import DEFAULT_DISCOVERY, DISCOVERY_METHODS
+from scan_events import EventStream
+
+# Largest block swept at once; bigger subnets are split into slices this size
+DEFAULT_SLICE_PREFIX = 26
+
+
+class MonitorDaemon:
+    """Scheduler that sweeps one slice of the network at a time, forever"""
+
+    def __init__(self, scanner, change_detector, subnets=None, interfaces=None, interval=300,
+                 slice_prefix=DEFAULT_SLICE_PREFIX, max_hosts=4096, workers=4, events=None,
+                 history=None):
+        """
+        Args:
+            scanner: NetworkScanner used for sweeps, probes and lookups
+            change_detector: ChangeDetector holding the persistent host table
+            subnets: List of subnets to monitor (detected network if None)
+            interfaces: List of interfaces whose networks to monitor (optional)
+            interval: Seconds per full pass over every subnet
+            slice_prefix: Prefix length of the blocks swept at once
+            max_hosts: Hosts kept in the in-memory index before the stalest are dropped
+            workers: Threads used for vendor lookups
+            events: EventStream to publish to (a bounded one is created if None)
+            history: HistoryStore recording every swept slice (optional)
+        """
+        self.scanner = scanner
+        self.change_detector = change_detector
+        self.subnets = subnets
+        self.interfaces = interfaces
+        self.interval = interval
+        self.slice_prefix = slice_prefix
+        self.max_hosts = max_hosts
+        self.history = history
+        # Replay only recent events so a stream open for days stays small
+        self.events = events or EventStream(max_history=max_hosts)
+        self.cycles = 0
+        self.last_slice = None
+        self._hosts = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        # One long-lived pool instead of a new one per slice
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='netmap-monitor')
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def build_slices(self):
+        """
+        Split the monitored subnets into blocks of at most slice_prefix
+        Returns:
+            list of (interface, subnet) tuples
+        """
+        if self.scanner.subnet is None:
+            self.scanner.get_local_network_info()
+        targets = self.scanner.resolve_scan_targets(self.subnets, self.interfaces)
+
+        slices = []
+        for interface, subnet in targets:
+            network = ipaddress.IPv4Network(subnet, strict=False)
+            if network.prefixlen < self.slice_prefix:
+                slices.extend(
+                    (interface, str(block)) for block in network.subnets(new_prefix=self.slice_prefix)
+                )
+            else:
+                slices.append((interface, str(network)))
+        return slices
+
+    def scan_slice(self, interface, subnet):
+        """
+        Sweep one slice, re-probe only new or changed hosts and publish changes
+        Args:
+            interface: Interface to send on
+            subnet: CIDR block to sweep
+        Returns:
+            list of change events
+        """
+        devices = self.scanner.discover_hosts([(interface, subnet)])
+        to_probe, reused = self.change_detector.plan(devices, self.scanner.fieldnames)
+
+        port_results = self.scanner.probe_ports(device['ip'] for device in to_probe)
+        hostnames = self.scanner.resolve_hostnames(device['ip'] for device in to_probe)
+        probed = list(self._executor.map(
+            lambda device: self.scanner.gather_host_info(
+                device, port_results[device['ip']], hostnames[device['ip']]
+            ),
+            to_probe
+        ))
+
+        changes = self.change_detector.commit(
+            reused + probed, [device['ip'] for device in to_probe], [subnet]
+        )
+        if self.history is not None:
+            self.history.record_scan(reused + probed, [subnet], source='monitor')
+
+        now = time.time()
+        with self._lock:
+            for host in reused + probed:
+                self._hosts[host['IP Address']] = (host, now)
+                self._hosts.move_to_end(host['IP Address'])
+            for change in changes:
+                if change['event'] == REMOVED:
+                    self._hosts.pop(change['ip'], None)
+                elif 'IP Address' in change['changes']:
+                    self._hosts.pop(change['changes']['IP Address'][0], None)
+            # Least recently seen hosts go first
+            while len(self._hosts) > self.max_hosts:
+                self._hosts.popitem(last=False)
+
+        for host in probed:
+            self.events.publish('host', host)
+        for change in changes:
+            print(f"[+] {change['event'].capitalize()}: {change['ip']} ({change['mac']})")
+            self.events.publish('change', change)
+        return changes
+
+    def run_cycle(self):
+        """
+        Sweep every slice once, each at its own slot within the interval
+        Returns:
+            bool: False if the daemon was stopped during the cycle
+        """
+        cycle_start = time.monotonic()
+        slices = self.build_slices()
+        spacing = self.interval / max(len(slices), 1)
+
+        for index, (interface, subnet) in enumerate(slices):
+            delay = cycle_start + index * spacing - time.monotonic()
+            if self._stop.wait(max(0, delay)):
+                return False
+
+            self.last_slice = subnet
+            try:
+                self.scan_slice(interface, subnet)
+            except Exception as e:
+                print(f"[!] Error monitoring {subnet}: {e}")
+                self.events.publish('warning', {'subnet': subnet, 'message': str(e)})
+
+            self.events.publish('progress', {
+                'progress': int((index + 1) / len(slices) * 100),
+                'message': f'Cycle {self.cycles + 1}: swept {subnet} ({index + 1}/{len(slices)})'
+            })
+
+        self.cycles += 1
+        print(f"[+] Cycle {self.cycles} complete: {len(self._hosts)} hosts")
+        self.events.publish('cycle', {'cycle': self.cycles, 'total_hosts': len(self._hosts)})
+        return True
+
+    def run(self):
+        """Run cycles back to back until stopped"""
+        while not self._stop.is_set():
+            cycle_start = time.monotonic()
+            if not self.run_cycle():
+                break
+            # A cycle that finished early waits out the rest of its interval
+            self._stop.wait(max(0, cycle_start + self.interval - time.monotonic()))
+
+    def start(self):
+        """Run the daemon on a background thread"""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name='netmap-monitor', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop after the slice in progress"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        # Ends every open stream
+        self.events.publish('complete', {'message': 'Monitoring stopped', 'cycles': self.cycles})
+
+    def hosts(self):
+        """
+        Returns:
+            list of host dicts currently in the index, sorted by IP
+        """
+        with self._lock:
+            hosts = [host for host, _ in self._hosts.values()]
+        return sorted(hosts, key=lambda h: ip_key(h['IP Address']))
+
+    def status(self):
+        """Daemon state for the status endpoint"""
+        return {
+            'running': self.running,
+            'interval': self.interval,
+            'cycles': self.cycles,
+            'last_slice': self.last_slice,
+            'host_count': len(self._hosts),
+            'columns': self.scanner.fieldnames
+        }
+
+
+def main():
+    from lookup_cache import LookupCache
+    from network_scanner import NetworkScanner
+
+    parser = argparse.ArgumentParser(description='NetMap - Continuous Monitoring Daemon')
+    parser.add_argument('--subnet', nargs='+', default=None, help='Subnets to monitor')
+    parser.add_argument('--interface', nargs='+', default=None, help='Interfaces whose networks to monitor')
+    parser.add_argument('--ports', default=None, help='Ports to probe (default: 22,80,443)')
+    parser.add_argument('--interval', type=int, default=300, help='Seconds per full pass (default: 300)')
+    parser.add_argument('--reprobe-ttl', type=int, default=3600,
+                        help='Seconds before unchanged hosts are probed again (default: 3600)')
+    parser.add_argument('--discovery', nargs='+', choices=DISCOVERY_METHODS, default=list(DEFAULT_DISCOVERY),
+                        help='Host discovery methods (default: arp)')
+    parser.add_argument('--arp-rate', type=int, default=100,
+                        help='ARP requests, echo requests or TCP pings per second (default: 100)')
+    args = parser.parse_args()
+
+    subnets = [s for spec in args.subnet for s in spec.split(',') if s] if args.subnet else None
+    scanner = NetworkScanner(ports=args.ports, cache=LookupCache(), arp_rate=args.arp_rate,
+                             discovery=args.discovery, discovery_rate=args.arp_rate)
+    daemon = MonitorDaemon(
+        scanner, ChangeDetector(reprobe_ttl=args.reprobe_ttl),
+        subnets=subnets, interfaces=args.interface, interval=args.interval,
+        history=HistoryStore()
+    )
+
+    print(f"[*] Monitoring every {args.interval}s, press Ctrl+C to stop")
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        print("\n[!] Monitoring stopped")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,433 @@
+"""
+NetMap - Batched Name Resolver
+Resolves hostnames for many hosts at once with UDP queries sent in parallel:
+reverse DNS (PTR) to the configured nameserver, and mDNS, LLMNR and NetBIOS
+node-status queries sent straight to each host
+"""
+
+import asyncio
+import ipaddress
+import os
+import random
+import socket
+import struct
+import time
+
+DNS_PORT = 53
+MDNS_PORT = 5353
+LLMNR_PORT = 5355
+NBNS_PORT = 137
+
+TYPE_PTR = 12
+TYPE_NBSTAT = 0x21
+CLASS_IN = 1
+FLAG_RD = 0x0100
+RCODE_MASK = 0x000F
+
+# Answers are preferred in this order when several protocols reply
+PROTOCOLS = ('dns', 'mdns', 'llmnr', 'nbns')
+
+# NetBIOS name '*' padded with NULs, first-level encoded (RFC 1002 4.1)
+_NBNS_WILDCARD = b'\x20' + b'CK' + b'A' * 30 + b'\x00'
+_NBNS_GROUP_FLAG = 0x8000
+_NBNS_WORKSTATION = 0x00
+
+# In-memory cache size at which expired entries are pruned
+_MAX_CACHED = 65536
+
+# Outstanding queries per UDP socket; a burst of answers larger than the
+# socket receive buffer would otherwise be dropped by the kernel
+_QUERIES_PER_SOCKET = 64
+
+
+def system_nameservers(path='/etc/resolv.conf'):
+    """
+    Read the IPv4 nameservers from resolv.conf
+    Returns:
+        list of IP address strings (empty if none are configured)
+    """
+    nameservers = []
+    try:
+        with open(path) as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) >= 2 and fields[0] == 'nameserver':
+                    try:
+                        ipaddress.IPv4Address(fields[1])
+                        nameservers.append(fields[1])
+                    except ValueError:
+                        pass
+    except OSError:
+        pass
+    return nameservers
+
+
+def system_hosts(path=None):
+    """
+    Read the static IPv4 address-to-name table (/etc/hosts)
+    Returns:
+        dict mapping ip to its first listed name
+    """
+    if path is None:
+        path = (os.path.join(os.environ.get('SystemRoot', r'C:\Windows'), 'System32', 'drivers', 'etc', 'hosts')
+                if os.name == 'nt' else '/etc/hosts')
+    hosts = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                fields = line.split('#', 1)[0].split()
+                if len(fields) >= 2:
+                    try:
+                        ipaddress.IPv4Address(fields[0])
+                    except ValueError:
+                        continue
+                    hosts.setdefault(fields[0], fields[1])
+    except OSError:
+        pass
+    return hosts
+
+
+def reverse_name(ip):
+    """'192.168.1.10' -> '10.1.168.192.in-addr.arpa'"""
+    return '.'.join(reversed(ip.split('.'))) + '.in-addr.arpa'
+
+
+def _encode_name(name):
+    encoded = b''
+    for label in name.rstrip('.').split('.'):
+        raw = label.encode('idna')
+        encoded += bytes([len(raw)]) + raw
+    return encoded + b'\x00'
+
+
+def _read_name(message, offset):
+    """
+    Decode a possibly compressed DNS name
+    Returns:
+        tuple (name, offset just past the name in the original position)
+    """
+    labels = []
+    end = None
+    jumps = 0
+    while True:
+        length = message[offset]
+        if length & 0xC0 == 0xC0:
+            if end is None:
+                end = offset + 2
+            jumps += 1
+            if jumps > 16:
+                raise ValueError("DNS name compression loop")
+            offset = struct.unpack('>H', message[offset:offset + 2])[0] & 0x3FFF
+            continue
+        offset += 1
+        if length == 0:
+            break
+        labels.append(message[offset:offset + length].decode('utf-8', 'replace'))
+        offset += length
+    return '.'.join(labels), end if end is not None else offset
+
+
+def build_query(txid, name, qtype=TYPE_PTR, flags=FLAG_RD):
+    """
+    Build a single-question DNS-format query (also used by mDNS and LLMNR)
+    Args:
+        txid: Transaction ID
+        name: Query name
+        qtype: Query type
+        flags: Header flags (recursion desired for unicast DNS)
+    Returns:
+        bytes query
+    """
+    header = struct.pack('>HHHHHH', txid, flags, 1, 0, 0, 0)
+    return header + _encode_name(name) + struct.pack('>HH', qtype, CLASS_IN)
+
+
+def build_ptr_response(query, hostname):
+    """
+    Build the answer to a PTR query (used to simulate a nameserver)
+    Args:
+        query: Query bytes as built by build_query
+        hostname: Name to answer with, or None for NXDOMAIN
+    Returns:
+        bytes response
+    """
+    txid = struct.unpack('>H', query[:2])[0]
+    question = query[12:]
+    if hostname is None:
+        return struct.pack('>HHHHHH', txid, 0x8183, 1, 0, 0, 0) + question
+    rdata = _encode_name(hostname)
+    answer = b'\xc0\x0c' + struct.pack('>HHIH', TYPE_PTR, CLASS_IN, 300, len(rdata)) + rdata
+    return struct.pack('>HHHHHH', txid, 0x8180, 1, 1, 0, 0) + question + answer
+
+
+def parse_ptr_response(message):
+    """
+    Extract the first PTR answer of a DNS, mDNS or LLMNR response
+    Returns:
+        Hostname or None (NXDOMAIN or no PTR answer)
+    """
+    txid, flags, qdcount, ancount, _, _ = struct.unpack('>HHHHHH', message[:12])
+    if flags & RCODE_MASK:
+        return None
+
+    offset = 12
+    for _ in range(qdcount):
+        _, offset = _read_name(message, offset)
+        offset += 4
+
+    for _ in range(ancount):
+        _, offset = _read_name(message, offset)
+        rtype, _, _, rdlength = struct.unpack('>HHIH', message[offset:offset + 10])
+        offset += 10
+        if rtype == TYPE_PTR:
+            name, _ = _read_name(message, offset)
+            return name or None
+        offset += rdlength
+    return None
+
+
+def build_nbns_status_query(txid):
+    """Build a NetBIOS node status request (RFC 1002 4.2.17)"""
+    return struct.pack('>HHHHHH', txid, 0, 1, 0, 0, 0) + _NBNS_WILDCARD + struct.pack('>HH', TYPE_NBSTAT, CLASS_IN)
+
+
+def parse_nbns_status(message):
+    """
+    Extract the workstation name from a NetBIOS node status response
+    Returns:
+        Unique <00> name or None
+    """
+    ancount = struct.unpack('>H', message[6:8])[0]
+    if not ancount:
+        return None
+    _, offset = _read_name(message, 12)
+    rtype = struct.unpack('>H', message[offset:offset + 2])[0]
+    if rtype != TYPE_NBSTAT:
+        return None
+    offset += 10
+    count = message[offset]
+    offset += 1
+    for _ in range(count):
+        entry = message[offset:offset + 18]
+        if len(entry) < 18:
+            break
+        flags = struct.unpack('>H', entry[16:18])[0]
+        if entry[15] == _NBNS_WORKSTATION and not flags & _NBNS_GROUP_FLAG:
+            return entry[:15].decode('ascii', 'replace').strip() or None
+        offset += 18
+    return None
+
+
+class _QueryProtocol(asyncio.DatagramProtocol):
+    """One UDP socket multiplexing many outstanding queries by transaction ID"""
+
+    def __init__(self):
+        self.transport = None
+        self._pending = {}
+        self._next_id = random.randrange(0x10000)
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    @property
+    def outstanding(self):
+        return len(self._pending)
+
+    def _allocate_id(self):
+        while True:
+            self._next_id = (self._next_id + 1) & 0xFFFF
+            if self._next_id not in self._pending:
+                return self._next_id
+
+    async def query(self, build, addr, parse, timeout, check_source=True):
+        """
+        Send one query and wait for its answer
+        Args:
+            build: Callable taking a transaction ID and returning the packet
+            addr: (ip, port) to send to
+            parse: Callable turning the response into a name
+            timeout: Seconds to wait
+            check_source: Only accept answers from addr's IP
+        Returns:
+            Name or None on timeout, error or negative answer
+        """
+        txid = self._allocate_id()
+        future = asyncio.get_running_loop().create_future()
+        self._pending[txid] = (future, addr[0] if check_source else None, parse)
+        try:
+            self.transport.sendto(build(txid), addr)
+            return await asyncio.wait_for(future, timeout)
+        except (OSError, asyncio.TimeoutError):
+            return None
+        finally:
+            self._pending.pop(txid, None)
+
+    def datagram_received(self, data, addr):
+        if len(data) < 12:
+            return
+        entry = self._pending.get(struct.unpack('>H', data[:2])[0])
+        if entry is None:
+            return
+        future, source, parse = entry
+        if future.done() or (source is not None and addr[0] != source):
+            return
+        try:
+            future.set_result(parse(data))
+        except (ValueError, IndexError, struct.error):
+            future.set_result(None)
+
+    def error_received(self, exc):
+        # ICMP errors cannot be matched to a query; those queries time out
+        pass
+
+
+class _SocketPool:
+    """Spreads the queries of one protocol over as many sockets as needed"""
+
+    def __init__(self):
+        self.sockets = []
+        self._lock = asyncio.Lock()
+
+    async def _socket(self):
+        async with self._lock:
+            for protocol in self.sockets:
+                if protocol.outstanding < _QUERIES_PER_SOCKET:
+                    return protocol
+            _, protocol = await asyncio.get_running_loop().create_datagram_endpoint(
+                _QueryProtocol, local_addr=('0.0.0.0', 0)
+            )
+            self.sockets.append(protocol)
+            return protocol
+
+    async def query(self, *args, **kwargs):
+        protocol = await self._socket()
+        return await protocol.query(*args, **kwargs)
+
+    def close(self):
+        for protocol in self.sockets:
+            protocol.transport.close()
+
+
+class NameResolver:
+    """Resolves the hostnames of many IPs in one concurrent batch"""
+
+    def __init__(self, nameservers=None, timeout=1.0, protocols=PROTOCOLS,
+                 cache_ttl=3600, negative_ttl=300, max_concurrency=1024, dns_port=DNS_PORT):
+        """
+        Args:
+            nameservers: DNS servers for PTR queries (from /etc/resolv.conf if None)
+            timeout: Seconds to wait for each query
+            protocols: Protocols to query, in order of preference
+            cache_ttl: Seconds a resolved name is reused
+            negative_ttl: Seconds an unresolvable IP is not queried again
+            max_concurrency: Hosts resolved at the same time
+            dns_port: Port of the nameservers
+        """
+        self.nameservers = system_nameservers() if nameservers is None else list(nameservers)
+        self.timeout = timeout
+        self.protocols = tuple(protocols)
+        self.cache_ttl = cache_ttl
+        self.negative_ttl = negative_ttl
+        self.max_concurrency = max_concurrency
+        self.dns_port = dns_port
+        self.static_hosts = system_hosts()
+        self._cache = {}
+
+    def _queries(self, endpoints, ip):
+        """Coroutines for every protocol that can name this IP, in preference order"""
+        queries = []
+        for protocol in self.protocols:
+            endpoint = endpoints.get(protocol)
+            if protocol == 'dns' and endpoint is not None:
+                queries.append(endpoint.query(
+                    lambda txid: build_query(txid, reverse_name(ip)),
+                    (self.nameservers[0], self.dns_port), parse_ptr_response, self.timeout
+                ))
+            elif protocol == 'dns' and 'dns' in self.protocols:
+                # No nameserver known (e.g. Windows): use the system resolver
+                queries.append(self._system_lookup(ip))
+            elif protocol == 'mdns':
+                queries.append(endpoint.query(
+                    lambda txid: build_query(txid, reverse_name(ip), flags=0),
+                    (ip, MDNS_PORT), parse_ptr_response, self.timeout
+                ))
+            elif protocol == 'llmnr':
+                queries.append(endpoint.query(
+                    lambda txid: build_query(txid, reverse_name(ip), flags=0),
+                    (ip, LLMNR_PORT), parse_ptr_response, self.timeout
+                ))
+            elif protocol == 'nbns':
+                queries.append(endpoint.query(
+                    build_nbns_status_query, (ip, NBNS_PORT), parse_nbns_status, self.timeout
+                ))
+        return queries
+
+    async def _system_lookup(self, ip):
+        loop = asyncio.get_running_loop()
+        try:
+            host = await asyncio.wait_for(loop.getnameinfo((ip, 0), socket.NI_NAMEREQD), self.timeout)
+            return host[0]
+        except (OSError, asyncio.TimeoutError):
+            return None
+
+    async def _resolve_one(self, endpoints, ip):
+        """Query every protocol at once and keep the most preferred answer"""
+        tasks = [asyncio.ensure_future(query) for query in self._queries(endpoints, ip)]
+        try:
+            for task in tasks:
+                name = await task
+                if name:
+                    return name.rstrip('.')
+            return None
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _resolve_all(self, ips):
+        endpoints = {
+            protocol: _SocketPool() for protocol in self.protocols
+            if protocol != 'dns' or self.nameservers
+        }
+        try:
+            # Bounds the sockets and queries in flight however many IPs are asked
+            limit = asyncio.Semaphore(self.max_concurrency)
+
+            async def limited(ip):
+                async with limit:
+                    return await self._resolve_one(endpoints, ip)
+
+            names = await asyncio.gather(*(limited(ip) for ip in ips))
+        finally:
+            for endpoint in endpoints.values():
+                endpoint.close()
+        return dict(zip(ips, names))
+
+    def resolve(self, ips):
+        """
+        Resolve hostnames for many IPs concurrently
+        Args:
+            ips: Iterable of IP address strings
+        Returns:
+            dict mapping ip to hostname or None
+        """
+        now = time.monotonic()
+        results = {}
+        pending = []
+        for ip in dict.fromkeys(ips):
+            cached = self._cache.get(ip)
+            if ip in self.static_hosts:
+                results[ip] = self.static_hosts[ip]
+            elif cached is not None and cached[1] > now:
+                results[ip] = cached[0]
+            else:
+                pending.append(ip)
+
+        if pending:
+            resolved = asyncio.run(self._resolve_all(pending))
+            now = time.monotonic()
+            if len(self._cache) > _MAX_CACHED:
+                self._cache = {ip: entry for ip, entry in self._cache.items() if entry[1] > now}
+            for ip, name in resolved.items():
+                self._cache[ip] = (name, now + (self.cache_ttl if name else self.negative_ttl))
+            results.update(resolved)
+        return results
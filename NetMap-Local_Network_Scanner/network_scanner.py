@@ -10,15 +10,80 @@ from scapy.all import ARP, Ether, srp
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
 import time
+from port_prober import AsyncPortProber
+from rate_control import RateController
+from name_resolver import NameResolver
+from oui_db import OUIDatabase
+from arp_sweeper import ArpSweeper, RawSocketTransport, subnet_targets
+from discovery import (
+    DEFAULT_DISCOVERY, NO_MAC, IcmpSocketTransport, IcmpSweeper, TcpPinger, neighbour_macs
+)
+from service_detect import ServiceDetector, format_services
+from host_table import HostTable, ip_key
+from metrics import REGISTRY, timed
+from port_profiles import (
+    BASE_FIELDS, DEFAULT_PORTS, OPEN_PORTS_FIELD, SERVICES_FIELD, parse_ports, port_columns,
+    result_fieldnames
+)
 
 
 class NetworkScanner:
     """Main network scanner class for discovering and analyzing hosts"""
     
-    def __init__(self):
+    def __init__(self, ports=None, probe_timeout=1, max_probes=512, per_host_probes=32,
+                 oui_db_path=None, online_vendor_lookup=True, cache=None,
+                 arp_rate=500, arp_retries=2, change_detector=None, resolve_timeout=1,
+                 discovery=DEFAULT_DISCOVERY, discovery_rate=1000, detect_services=False,
+                 service_timeout=2, service_ttl=300, adaptive=True, metrics=None):
         self.local_ip = None
         self.subnet = None
+        self.interface = None
+        self.arp_rate = arp_rate
+        self.arp_retries = arp_retries
+        self.discovery = tuple(discovery)
+        self.discovery_rate = discovery_rate
+        self.change_detector = change_detector
+        self.changes = []
         self.hosts = []
+        # (interface, subnet) pairs swept by the last scan_network call
+        self.targets = []
+        self.ports = parse_ports(ports) if ports is not None else list(DEFAULT_PORTS)
+        self.oui_db = OUIDatabase.open_default(oui_db_path)
+        self.online_vendor_lookup = online_vendor_lookup
+        self.cache = cache
+        self.detect_services = detect_services
+        self.services = {}
+        # AIMD controllers size probing to the network instead of fixed limits
+        self.adaptive = adaptive
+        self.probe_control = RateController(
+            window=min(64, max_probes), max_window=max_probes, timeout=probe_timeout
+        ) if adaptive else None
+        self.arp_control = RateController(max_rate=arp_rate) if adaptive else None
+        # The macvendors.com API allows a couple of requests per second
+        self.vendor_api_control = RateController(window=1, max_window=2, timeout=2, min_timeout=1, max_rate=2)
+        self.prober = AsyncPortProber(
+            timeout=probe_timeout,
+            max_concurrency=max_probes,
+            per_host_limit=per_host_probes,
+            service_detector=ServiceDetector(service_timeout, service_ttl) if detect_services else None,
+            rate_controller=self.probe_control
+        )
+        self.resolver = NameResolver(timeout=resolve_timeout)
+        
+        # Stage timers and counters, shared process-wide unless a registry is given
+        self.metrics = metrics if metrics is not None else REGISTRY
+        self._scans = self.metrics.counter('netmap_scans_total', 'Completed scan_network runs')
+        self._hosts_found = self.metrics.counter(
+            'netmap_hosts_discovered_total', 'Live hosts found, by discovery method')
+        self._arp_requests = self.metrics.counter('netmap_arp_requests_total', 'ARP requests sent')
+        self._probes_sent = self.metrics.counter('netmap_probes_sent_total', 'TCP connect probes sent')
+        self._probe_outcomes = self.metrics.counter('netmap_probes_total', 'TCP connect probes by outcome')
+        self._cache_requests = self.metrics.counter(
+            'netmap_cache_requests_total', 'Lookup cache requests by kind and result')
+        self._vendor_lookups = self.metrics.counter(
+            'netmap_vendor_lookups_total', 'MAC vendor lookups by source')
+        self._hostnames = self.metrics.counter(
+            'netmap_hostnames_total', 'Hostname resolutions by result')
         
     def get_local_network_info(self):
         """
@@ -34,6 +99,7 @@ class NetworkScanner:
             addrs = netifaces.ifaddresses(default_interface)
             ipinfo = addrs[netifaces.AF_INET][0]
             
+            self.interface = default_interface
             self.local_ip = ipinfo['addr']
             netmask = ipinfo['netmask']
             
@@ -58,35 +124,213 @@ class NetworkScanner:
             
             return self.local_ip, self.subnet
     
-    def perform_arp_scan(self, subnet=None):
+    def get_interface_networks(self):
+        """
+        List the IPv4 networks attached to every non-loopback interface
+        Returns:
+            list of dicts with 'interface', 'ip' and 'subnet' keys
+        """
+        networks = []
+        for interface in netifaces.interfaces():
+            for ipinfo in netifaces.ifaddresses(interface).get(netifaces.AF_INET, []):
+                addr = ipinfo.get('addr')
+                netmask = ipinfo.get('netmask')
+                if not addr or not netmask or addr.startswith('127.'):
+                    continue
+                network = ipaddress.IPv4Network(f"{addr}/{netmask}", strict=False)
+                networks.append({
+                    'interface': interface,
+                    'ip': addr,
+                    'subnet': str(network)
+                })
+        return networks
+    
+    def resolve_scan_targets(self, subnets=None, interfaces=None):
+        """
+        Pair each requested subnet with the interface that reaches it
+        Args:
+            subnets: List of CIDR strings (optional)
+            interfaces: List of interface names whose networks to scan (optional)
+        Returns:
+            list of (interface, subnet) tuples; the detected network if none requested
+        """
+        networks = self.get_interface_networks()
+        targets = []
+        
+        for interface in interfaces or []:
+            matches = [n for n in networks if n['interface'] == interface]
+            if not matches:
+                raise ValueError(f"No IPv4 network on interface {interface}")
+            targets.extend((interface, n['subnet']) for n in matches)
+        
+        for subnet in subnets or []:
+            network = ipaddress.IPv4Network(subnet, strict=False)
+            interface = next(
+                (n['interface'] for n in networks
+                 if ipaddress.IPv4Network(n['subnet']).overlaps(network)),
+                self.interface
+            )
+            targets.append((interface, str(network)))
+        
+        if not targets:
+            targets.append((self.interface, self.subnet))
+        
+        return list(dict.fromkeys(targets))
+    
+    def perform_multi_arp_scan(self, targets):
+        """
+        Sweep several subnets in parallel, one ARP worker per interface
+        Args:
+            targets: List of (interface, subnet) tuples
+        Returns:
+            list of dicts with IP, MAC and interface, deduplicated by IP
+        """
+        by_interface = {}
+        for interface, subnet in targets:
+            by_interface.setdefault(interface, []).append(subnet)
+        
+        devices = {}
+        with ThreadPoolExecutor(max_workers=len(by_interface) or 1) as executor:
+            future_to_interface = {
+                executor.submit(self.perform_arp_scan, subnets, interface): interface
+                for interface, subnets in by_interface.items()
+            }
+            
+            for future in as_completed(future_to_interface):
+                interface = future_to_interface[future]
+                for device in future.result():
+                    device['interface'] = interface
+                    devices.setdefault(device['ip'], device)
+        
+        return sorted(devices.values(), key=lambda d: ip_key(d['ip']))
+    
+    @timed('discovery')
+    def discover_hosts(self, targets, methods=None):
+        """
+        Find live hosts with the selected discovery methods. ARP covers
+        subnets on a local interface; ICMP and TCP ping also reach routed
+        subnets, whose hosts get the MAC address 'N/A'.
+        Args:
+            targets: List of (interface, subnet) tuples
+            methods: Discovery methods ('arp', 'icmp', 'tcp'), the scanner's default if None
+        Returns:
+            list of dicts with IP, MAC and interface, deduplicated by IP
+        """
+        methods = self.discovery if methods is None else tuple(methods)
+        local_networks = [ipaddress.IPv4Network(n['subnet']) for n in self.get_interface_networks()]
+        local = [
+            (interface, subnet) for interface, subnet in targets
+            if any(ipaddress.IPv4Network(subnet).overlaps(n) for n in local_networks)
+        ]
+        
+        devices = {}
+        if 'arp' in methods:
+            routed = [subnet for target, subnet in targets if (target, subnet) not in local]
+            if routed:
+                print(f"[!] Not on a local interface, ARP skipped: {', '.join(routed)}")
+            if local:
+                for device in self.perform_multi_arp_scan(local):
+                    devices[device['ip']] = device
+                self._hosts_found.inc(len(devices), method='arp')
+        
+        interfaces = {}
+        for interface, subnet in targets:
+            for ip in subnet_targets(subnet):
+                interfaces.setdefault(ip, interface)
+        
+        for method, sweep in (('icmp', self.icmp_sweep), ('tcp', self.tcp_ping)):
+            if method not in methods:
+                continue
+            pending = [ip for ip in interfaces if ip not in devices]
+            if not pending:
+                break
+            try:
+                alive = sweep(pending)
+            except OSError as e:
+                print(f"[!] {method.upper()} discovery unavailable ({e})")
+                continue
+            # Pinging a local host leaves its MAC in the kernel neighbour table
+            macs = neighbour_macs()
+            for ip in alive:
+                devices[ip] = {'ip': ip, 'mac': macs.get(ip, NO_MAC), 'interface': interfaces[ip]}
+            self._hosts_found.inc(len(alive), method=method)
+        
+        return sorted(devices.values(), key=lambda d: ip_key(d['ip']))
+    
+    @timed('icmp')
+    def icmp_sweep(self, ips):
+        """
+        Find hosts that answer ICMP echo requests
+        Args:
+            ips: List of IP addresses
+        Returns:
+            list of responding IPs
+        """
+        print(f"[*] ICMP echo sweep of {len(ips)} addresses...")
+        sweeper = IcmpSweeper(IcmpSocketTransport(), rate=self.discovery_rate)
+        try:
+            alive = sweeper.sweep(ips)
+        finally:
+            sweeper.close()
+        print(f"[+] {len(alive)} hosts answered ICMP")
+        return alive
+    
+    @timed('tcp_ping')
+    def tcp_ping(self, ips):
+        """
+        Find hosts that answer a TCP connection attempt with SYN/ACK or RST
+        Args:
+            ips: List of IP addresses
+        Returns:
+            list of responding IPs
+        """
+        print(f"[*] TCP ping of {len(ips)} addresses...")
+        alive = TcpPinger(rate=self.discovery_rate).ping(ips)
+        print(f"[+] {len(alive)} hosts answered TCP ping")
+        return alive
+    
+    @timed('arp')
+    def perform_arp_scan(self, subnet=None, interface=None):
         """
         Perform ARP scan to discover live hosts
         Args:
-            subnet: Network subnet to scan (e.g., '192.168.1.0/24')
+            subnet: Network subnet to scan (e.g., '192.168.1.0/24'), or a list of subnets
+            interface: Interface to send on (default gateway interface if None)
         Returns:
             list of dicts with IP and MAC addresses
         """
         if subnet is None:
             subnet = self.subnet
+        subnets = [subnet] if isinstance(subnet, str) else list(subnet)
         
-        print(f"[*] Scanning network: {subnet}")
+        print(f"[*] Scanning network: {', '.join(subnets)}")
+        
+        # Prefer the raw-socket sweeper where AF_PACKET exists (Linux)
+        if hasattr(socket, 'AF_PACKET'):
+            try:
+                devices = self.sweep_arp(subnets, interface)
+                print(f"[+] Found {len(devices)} active hosts")
+                return devices
+            except (OSError, KeyError, ValueError) as e:
+                print(f"[!] Raw ARP sweep unavailable ({e}), falling back to scapy")
         
         try:
-            # Create ARP request packet
-            arp = ARP(pdst=subnet)
-            ether = Ether(dst="ff:ff:ff:ff:ff:ff")
-            packet = ether/arp
-            
-            # Send packet and receive response
-            result = srp(packet, timeout=3, verbose=0)[0]
-            
-            # Parse responses
             devices = []
-            for sent, received in result:
-                devices.append({
-                    'ip': received.psrc,
-                    'mac': received.hwsrc
-                })
+            for subnet in subnets:
+                # Create ARP request packet
+                arp = ARP(pdst=subnet)
+                ether = Ether(dst="ff:ff:ff:ff:ff:ff")
+                packet = ether/arp
+                
+                # Send packet and receive response
+                result = srp(packet, timeout=3, verbose=0, iface=interface)[0]
+                
+                # Parse responses
+                for sent, received in result:
+                    devices.append({
+                        'ip': received.psrc,
+                        'mac': received.hwsrc
+                    })
             
             print(f"[+] Found {len(devices)} active hosts")
             return devices
@@ -95,61 +339,135 @@ class NetworkScanner:
             print(f"Error performing ARP scan: {e}")
             return []
     
+    def sweep_arp(self, subnets, interface=None):
+        """
+        Discover live hosts with the raw-socket ARP sweep engine
+        Args:
+            subnets: List of subnets reachable through the interface
+            interface: Interface to send on (default gateway interface if None)
+        Returns:
+            list of dicts with IP and MAC addresses
+        """
+        if interface is None:
+            interface = self.interface or netifaces.gateways()['default'][netifaces.AF_INET][1]
+        
+        addrs = netifaces.ifaddresses(interface)
+        src_mac = addrs[netifaces.AF_LINK][0]['addr']
+        src_ip = addrs[netifaces.AF_INET][0]['addr']
+        
+        sweeper = ArpSweeper(
+            RawSocketTransport(interface),
+            src_mac,
+            src_ip,
+            rate=self.arp_rate,
+            retries=self.arp_retries,
+            rate_controller=self.arp_control
+        )
+        try:
+            targets = [ip for subnet in subnets for ip in subnet_targets(subnet)]
+            return sweeper.sweep(targets)
+        finally:
+            self._arp_requests.inc(sweeper.sent)
+            sweeper.close()
+    
+    @timed('vendor')
     def get_mac_vendor(self, mac_address):
         """
-        Lookup MAC vendor using MAC OUI database
+        Lookup MAC vendor using the offline OUI database, falling back to
+        the macvendors.com API only when no database has been built
         Args:
             mac_address: MAC address string
         Returns:
             Vendor name or 'Unknown'
         """
+        if mac_address == NO_MAC:
+            return "Unknown"
+        
+        if self.oui_db is not None:
+            self._vendor_lookups.inc(source='oui_db')
+            return self.oui_db.lookup(mac_address) or "Unknown"
+        
+        if not self.online_vendor_lookup:
+            return "Unknown"
+        
+        mac_key = mac_address.lower()
+        if self.cache is not None:
+            found, vendor = self.cache.get('vendor', mac_key)
+            self._cache_requests.inc(kind='vendor', result='hit' if found else 'miss')
+            if found:
+                return vendor or "Unknown"
+        
+        self._vendor_lookups.inc(source='api')
         try:
-            # Format MAC for API (remove colons/dashes)
-            mac_clean = mac_address.replace(':', '').replace('-', '')
-            
-            # Use macvendors.com API
+            # Use macvendors.com API, paced by its own controller
+            self.vendor_api_control.pace()
             url = f"https://api.macvendors.com/{mac_address}"
-            response = requests.get(url, timeout=2)
-            
-            if response.status_code == 200:
-                return response.text
-            else:
-                return "Unknown"
-                
-        except Exception as e:
+            started = time.monotonic()
+            response = requests.get(url, timeout=self.vendor_api_control.timeout)
+        except requests.Timeout:
+            # Transient: back off and try again next scan instead of caching a failure
+            self.vendor_api_control.on_loss()
+            return "Unknown"
+        except requests.RequestException:
+            return "Unknown"
+        
+        if response.status_code == 429:
+            # Rate limited: back off without caching a failure
+            self.vendor_api_control.on_loss()
+            return "Unknown"
+        self.vendor_api_control.on_response(time.monotonic() - started)
+        
+        # Only a definite answer is cached: the vendor, or 404 for an unassigned prefix
+        if response.status_code == 200:
+            vendor = response.text
+        elif response.status_code == 404:
+            vendor = None
+        else:
             return "Unknown"
+        
+        if self.cache is not None:
+            self.cache.set('vendor', mac_key, vendor)
+        
+        return vendor or "Unknown"
     
     def get_hostname(self, ip_address):
         """
-        Get hostname via reverse DNS lookup
+        Get hostname via reverse DNS, mDNS, LLMNR or NetBIOS
         Args:
             ip_address: IP address string
         Returns:
             Hostname or 'N/A'
         """
-        try:
-            hostname = socket.gethostbyaddr(ip_address)[0]
-            return hostname
-        except:
-            # Try NetBIOS if DNS fails (Windows networks)
-            try:
-                import subprocess
-                result = subprocess.run(
-                    ['nbtstat', '-A', ip_address],
-                    capture_output=True,
-                    text=True,
-                    timeout=2
-                )
-                # Parse NetBIOS name from output
-                for line in result.stdout.split('\n'):
-                    if '<00>' in line and 'UNIQUE' in line:
-                        name = line.split()[0].strip()
-                        if name and not name.startswith('MAC'):
-                            return name
-            except:
-                pass
-            
-            return "N/A"
+        return self.resolve_hostnames([ip_address])[ip_address]
+    
+    @timed('dns')
+    def resolve_hostnames(self, ips):
+        """
+        Resolve the hostnames of many hosts in one concurrent batch
+        Args:
+            ips: Iterable of IP addresses
+        Returns:
+            dict mapping ip to hostname or 'N/A'
+        """
+        hostnames = {}
+        pending = []
+        for ip in dict.fromkeys(ips):
+            if self.cache is not None:
+                found, hostname = self.cache.get('hostname', ip)
+                self._cache_requests.inc(kind='hostname', result='hit' if found else 'miss')
+                if found:
+                    hostnames[ip] = hostname or "N/A"
+                    continue
+            pending.append(ip)
+        
+        if pending:
+            for ip, hostname in self.resolver.resolve(pending).items():
+                if self.cache is not None:
+                    self.cache.set('hostname', ip, hostname)
+                hostnames[ip] = hostname or "N/A"
+                self._hostnames.inc(result='resolved' if hostname else 'unresolved')
+        
+        return hostnames
     
     def check_port(self, ip, port, timeout=1):
         """
@@ -172,30 +490,54 @@ class NetworkScanner:
     
     def check_common_ports(self, ip):
         """
-        Check common ports (22, 80, 443) for a host
+        Check the configured ports (22, 80, 443 by default) for a host
         Args:
             ip: IP address
         Returns:
-            dict with port status
+            dict mapping port to True if open
         """
-        ports = {
-            22: 'SSH',
-            80: 'HTTP',
-            443: 'HTTPS'
-        }
+        return self.probe_ports([ip])[ip]
+    
+    @timed('port_probe')
+    def probe_ports(self, ips):
+        """
+        Check the configured ports on many hosts concurrently
+        Args:
+            ips: Iterable of IP addresses
+        Returns:
+            dict mapping ip to {port: bool}
+        """
+        if self.prober.service_detector is not None:
+            self.prober.service_detector.prune()
+        results = self.prober.probe_hosts(ips, self.ports)
+        
+        stats = self.prober.stats
+        self._probes_sent.inc(stats['sent'])
+        for outcome in ('open', 'refused', 'timeout', 'error'):
+            self._probe_outcomes.inc(stats[outcome], outcome=outcome)
         
-        port_status = {}
-        for port, service in ports.items():
-            is_open = self.check_port(ip, port)
-            port_status[service] = 'Open' if is_open else 'Closed'
+        # Services identified on this round's open ports; a port that has
+        # closed since the last round must not keep its old banner
+        services = {}
+        for (ip, port), service in self.prober.services.items():
+            services.setdefault(ip, {})[port] = service
+        self.services = services
         
-        return port_status
+        return results
+    
+    @property
+    def fieldnames(self):
+        """Result columns for the configured port set"""
+        return result_fieldnames(self.ports, self.detect_services)
     
-    def gather_host_info(self, device):
+    @timed('gather_host')
+    def gather_host_info(self, device, port_status=None, hostname=None):
         """
         Gather complete information for a single host
         Args:
             device: dict with 'ip' and 'mac' keys
+            port_status: Pre-computed {port: bool} map (probed on demand if None)
+            hostname: Pre-resolved hostname (resolved on demand if None)
         Returns:
             dict with complete host information
         """
@@ -207,66 +549,122 @@ class NetworkScanner:
         # Get vendor
         vendor = self.get_mac_vendor(mac)
         
-        # Small delay to avoid rate limiting
-        time.sleep(0.3)
-        
         # Get hostname
-        hostname = self.get_hostname(ip)
+        if hostname is None:
+            hostname = self.get_hostname(ip)
         
         # Check ports
-        port_status = self.check_common_ports(ip)
+        if port_status is None:
+            port_status = self.check_common_ports(ip)
         
-        return {
+        host = {
             'IP Address': ip,
             'MAC Address': mac,
             'Vendor': vendor,
-            'Hostname': hostname,
-            'SSH (22)': port_status['SSH'],
-            'HTTP (80)': port_status['HTTP'],
-            'HTTPS (443)': port_status['HTTPS']
+            'Hostname': hostname
         }
+        host.update(port_columns(port_status))
+        
+        if self.detect_services:
+            host[SERVICES_FIELD] = format_services(self.services.get(ip, {}))
+        
+        return host
     
-    def scan_network(self, max_workers=10):
+    @timed('scan')
+    def scan_network(self, max_workers=10, subnets=None, interfaces=None, discovery=None,
+                     on_host=None):
         """
         Perform complete network scan
         Args:
             max_workers: Number of concurrent threads for info gathering
+            subnets: List of subnets to scan (the manually set or detected subnet if None)
+            interfaces: List of interfaces whose networks to scan (optional)
+            discovery: Discovery methods ('arp', 'icmp', 'tcp'), the scanner's default if None
+            on_host: Callable receiving each host as soon as it is gathered
+                (e.g. a streaming exporter's write)
         Returns:
-            list of dicts with complete host information
+            HostTable of complete host information (rows read like host dicts)
         """
+        # Keep a manually specified subnet across network detection
+        if subnets is None and self.subnet:
+            subnets = [self.subnet]
+        
         # Detect network
         print("[*] Detecting local network...")
         self.get_local_network_info()
         print(f"[+] Local IP: {self.local_ip}")
-        print(f"[+] Subnet: {self.subnet}")
         
-        # Perform ARP scan
-        devices = self.perform_arp_scan()
+        targets = self.targets = self.resolve_scan_targets(subnets, interfaces)
+        for interface, subnet in targets:
+            print(f"[+] Subnet: {subnet} ({interface})")
         
-        if not devices:
+        # Discover live hosts (ARP runs one worker per interface)
+        devices = self.discover_hosts(targets, discovery)
+        
+        if not devices and self.change_detector is None:
             print("[-] No devices found")
-            return []
+            self.hosts = HostTable(self.ports, self.detect_services)
+            return self.hosts
+        
+        # In incremental mode only new, changed or stale hosts are probed again
+        reused = []
+        if self.change_detector is not None:
+            devices, reused = self.change_detector.plan(devices, self.fieldnames)
+            print(f"[*] Incremental scan: {len(devices)} new or changed hosts, "
+                  f"{len(reused)} unchanged")
+        
+        # Probe every (host, port) pair in one concurrent batch
+        print(f"\n[*] Probing {len(self.ports)} ports on {len(devices)} hosts...")
+        port_results = self.probe_ports(device['ip'] for device in devices)
+        if self.probe_control is not None and self.probe_control.responses:
+            stats = self.probe_control.stats()
+            print(f"[*] Adaptive probing: window {stats['window']}, RTT {stats['srtt_ms']} ms, "
+                  f"timeout {stats['timeout_ms']} ms, {stats['losses']} losses")
+        
+        # Resolve every hostname in one batch of UDP queries
+        print(f"[*] Resolving {len(devices)} hostnames...")
+        hostnames = self.resolve_hostnames(device['ip'] for device in devices)
         
         # Gather detailed information for each host
         print(f"\n[*] Gathering detailed information for {len(devices)} hosts...")
-        self.hosts = []
+        self.hosts = HostTable(self.ports, self.detect_services)
+        self.hosts.extend(reused)
+        if on_host is not None:
+            for host_info in reused:
+                on_host(host_info)
         
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             future_to_device = {
-                executor.submit(self.gather_host_info, device): device 
+                executor.submit(
+                    self.gather_host_info, device, port_results[device['ip']], hostnames[device['ip']]
+                ): device
                 for device in devices
             }
             
             for future in as_completed(future_to_device):
                 try:
                     host_info = future.result()
-                    self.hosts.append(host_info)
                 except Exception as e:
                     print(f"Error gathering info: {e}")
+                    continue
+                self.hosts.append(host_info)
+                # Outside the try: an export failure (e.g. a full disk) must stop the scan
+                if on_host is not None:
+                    on_host(host_info)
         
         # Sort by IP address
-        self.hosts.sort(key=lambda x: ipaddress.IPv4Address(x['IP Address']))
+        self.hosts.sort()
         
+        if self.change_detector is not None:
+            self.changes = self.change_detector.commit(
+                self.hosts,
+                [device['ip'] for device in devices],
+                [subnet for _, subnet in targets]
+            )
+            for change in self.changes:
+                print(f"[{change['event']}] {change['ip']} ({change['mac']}) {change['changes'] or ''}")
+        
+        self._scans.inc()
         print(f"\n[+] Scan complete! Found {len(self.hosts)} hosts")
         return self.hosts
     
@@ -276,22 +674,34 @@ class NetworkScanner:
             print("No hosts to display")
             return
         
+        # Port columns follow the scanned port set
+        port_fields = self.fieldnames[len(BASE_FIELDS):]
+        widths = {field: max(8, len(field.split(' (')[0]) + 1) for field in port_fields}
+        if OPEN_PORTS_FIELD in widths:
+            widths[OPEN_PORTS_FIELD] = 30
+        if SERVICES_FIELD in widths:
+            widths[SERVICES_FIELD] = 60
+        width = 80 + sum(widths.values())
+        
         # Print header
-        print("\n" + "="*120)
-        print(f"{'IP Address':<15} {'MAC Address':<18} {'Vendor':<25} {'Hostname':<20} {'SSH':<8} {'HTTP':<8} {'HTTPS':<8}")
-        print("="*120)
+        print("\n" + "="*width)
+        header = f"{'IP Address':<15} {'MAC Address':<18} {'Vendor':<25} {'Hostname':<20} "
+        header += " ".join(f"{field.split(' (')[0]:<{widths[field]}}" for field in port_fields)
+        print(header)
+        print("="*width)
         
         # Print each host
         for host in self.hosts:
-            print(f"{host['IP Address']:<15} "
-                  f"{host['MAC Address']:<18} "
-                  f"{host['Vendor'][:24]:<25} "
-                  f"{host['Hostname'][:19]:<20} "
-                  f"{host['SSH (22)']:<8} "
-                  f"{host['HTTP (80)']:<8} "
-                  f"{host['HTTPS (443)']:<8}")
-        
-        print("="*120)
+            row = (f"{host['IP Address']:<15} "
+                   f"{host['MAC Address']:<18} "
+                   f"{host['Vendor'][:24]:<25} "
+                   f"{host['Hostname'][:19]:<20} ")
+            row += " ".join(
+                f"{host.get(field, '')[:widths[field]]:<{widths[field]}}" for field in port_fields
+            )
+            print(row)
+        
+        print("="*width)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,314 @@
+"""
+NetMap - Offline OUI Vendor Database
+Compiles the IEEE MA-L/MA-M/MA-S registries into a compact sorted binary
+file and resolves MAC vendors from a memory-mapped copy of it
+"""
+
+import argparse
+import csv
+import mmap
+import os
+import struct
+
+MAGIC = b'NMOUI\x01'
+
+# magic, then record counts for the 24/28/36-bit tables and the string table offset
+HEADER = struct.Struct('>6s2x4I')
+
+# prefix value, offset of the vendor string in the string table
+RECORD = struct.Struct('>QI')
+
+STRING_LENGTH = struct.Struct('>H')
+
+# Prefix lengths in bits, longest first so the most specific assignment wins
+PREFIX_BITS = (36, 28, 24)
+
+REGISTRY_BITS = {
+    'MA-L': 24,
+    'MA-M': 28,
+    'MA-S': 36
+}
+
+IEEE_REGISTRY_URLS = [
+    'https://standards-oui.ieee.org/oui/oui.csv',
+    'https://standards-oui.ieee.org/oui28/mam.csv',
+    'https://standards-oui.ieee.org/oui36/oui36.csv'
+]
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(__file__), 'data', 'oui.bin')
+
+
+def mac_to_int(mac_address):
+    """
+    Convert a MAC address string to a 48-bit integer
+    Args:
+        mac_address: MAC in aa:bb:cc:dd:ee:ff, aa-bb-..., or aabb.ccdd.eeff form
+    Returns:
+        int value of the address
+    Raises:
+        ValueError: If the address is malformed
+    """
+    digits = mac_address.replace(':', '').replace('-', '').replace('.', '')
+    if len(digits) != 12:
+        raise ValueError(f"Invalid MAC address: {mac_address}")
+    return int(digits, 16)
+
+
+def parse_ieee_csv(filepath):
+    """
+    Read assignments from an IEEE registry CSV (oui.csv, mam.csv, oui36.csv)
+    Args:
+        filepath: Path to the CSV file
+    Returns:
+        list of (bits, prefix, vendor) tuples
+    """
+    entries = []
+    with open(filepath, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            bits = REGISTRY_BITS.get(row.get('Registry', '').strip())
+            assignment = row.get('Assignment', '').strip()
+            vendor = row.get('Organization Name', '').strip()
+            if bits and assignment and vendor:
+                entries.append((bits, int(assignment, 16), vendor))
+    return entries
+
+
+def parse_manuf(filepath):
+    """
+    Read assignments from a Wireshark-style manuf file
+    Args:
+        filepath: Path to the manuf file
+    Returns:
+        list of (bits, prefix, vendor) tuples
+    """
+    entries = []
+    with open(filepath, encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            fields = line.split('\t')
+            if len(fields) < 2:
+                continue
+
+            address, _, mask = fields[0].partition('/')
+            digits = address.replace(':', '').replace('-', '').replace('.', '')
+            bits = int(mask) if mask else len(digits) * 4
+            if bits not in PREFIX_BITS:
+                continue
+
+            # Long names are optional, fall back to the short name
+            vendor = fields[-1].strip()
+            value = int(digits.ljust(12, '0'), 16)
+            entries.append((bits, value >> (48 - bits), vendor))
+    return entries
+
+
+def compile_registry(sources, output_path=DEFAULT_DB_PATH):
+    """
+    Compile registry files into the binary prefix index
+    Args:
+        sources: List of IEEE CSV or manuf file paths
+        output_path: Where to write the compiled database
+    Returns:
+        int number of prefixes written
+    """
+    tables = {bits: {} for bits in PREFIX_BITS}
+    for source in sources:
+        if source.lower().endswith('.csv'):
+            entries = parse_ieee_csv(source)
+        else:
+            entries = parse_manuf(source)
+        for bits, prefix, vendor in entries:
+            tables[bits][prefix] = vendor
+
+    # Vendor names are stored once and shared by all of their prefixes
+    strings = bytearray()
+    string_offsets = {}
+    records = []
+    for bits in PREFIX_BITS:
+        section = []
+        for prefix, vendor in sorted(tables[bits].items()):
+            if vendor not in string_offsets:
+                # Cut at the length field's limit without splitting a UTF-8 sequence
+                encoded = vendor.encode('utf-8')[:0xFFFF].decode('utf-8', 'ignore').encode('utf-8')
+                string_offsets[vendor] = len(strings)
+                strings += STRING_LENGTH.pack(len(encoded)) + encoded
+            section.append(RECORD.pack(prefix, string_offsets[vendor]))
+        records.append(section)
+
+    strings_offset = HEADER.size + RECORD.size * sum(len(section) for section in records)
+    header = HEADER.pack(MAGIC, *(len(section) for section in records), strings_offset)
+
+    # Write beside the target and swap it in, so a running scanner that has the
+    # old file mapped, or a failed build, never sees a half-written database
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    temp_path = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(header)
+            for section in records:
+                f.write(b''.join(section))
+            f.write(strings)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return sum(len(section) for section in records)
+
+
+class OUIDatabase:
+    """Memory-mapped vendor lookup with longest-prefix matching"""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        """
+        Args:
+            path: Path to a database built by compile_registry
+        Raises:
+            ValueError: If the file is not a NetMap OUI database
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._tables = self._read_header()
+        except ValueError:
+            self._map.close()
+            raise
+
+    def _read_header(self):
+        """
+        Returns:
+            list of (bits, first record offset, record count) for each prefix table
+        Raises:
+            ValueError: If the header is missing, foreign or does not match the file size
+        """
+        if len(self._map) < HEADER.size or self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not a NetMap OUI database: {self.path}")
+        _, *counts, self._strings_offset = HEADER.unpack_from(self._map, 0)
+
+        tables = []
+        offset = HEADER.size
+        for bits, count in zip(PREFIX_BITS, counts):
+            tables.append((bits, offset, count))
+            offset += count * RECORD.size
+        if offset != self._strings_offset or offset > len(self._map):
+            raise ValueError(f"Truncated NetMap OUI database: {self.path}")
+        return tables
+
+    @classmethod
+    def open_default(cls, path=None):
+        """
+        Open the database if it has been built
+        Args:
+            path: Database path (default: data/oui.bin next to this module)
+        Returns:
+            OUIDatabase or None if the file is missing or invalid
+        """
+        try:
+            return cls(path or DEFAULT_DB_PATH)
+        except (OSError, ValueError):
+            return None
+
+    def __len__(self):
+        return sum(count for _, _, count in self._tables)
+
+    def _search(self, offset, count, key):
+        """Binary search one sorted table, returning the string offset or None"""
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            prefix, string_offset = RECORD.unpack_from(self._map, offset + mid * RECORD.size)
+            if prefix < key:
+                lo = mid + 1
+            elif prefix > key:
+                hi = mid
+            else:
+                return string_offset
+        return None
+
+    def _read_string(self, string_offset):
+        position = self._strings_offset + string_offset
+        (length,) = STRING_LENGTH.unpack_from(self._map, position)
+        start = position + STRING_LENGTH.size
+        return self._map[start:start + length].decode('utf-8')
+
+    def lookup(self, mac_address):
+        """
+        Resolve the vendor for a MAC address
+        Args:
+            mac_address: MAC address string
+        Returns:
+            Vendor name or None if no assignment matches
+        """
+        try:
+            value = mac_to_int(mac_address)
+        except ValueError:
+            return None
+
+        for bits, offset, count in self._tables:
+            string_offset = self._search(offset, count, value >> (48 - bits))
+            if string_offset is not None:
+                return self._read_string(string_offset)
+        return None
+
+    def close(self):
+        self._map.close()
+
+
+def download_registry(dest_dir):
+    """
+    Download the IEEE registry CSV files
+    Args:
+        dest_dir: Directory to save the files in
+    Returns:
+        list of downloaded file paths
+    """
+    import requests
+
+    os.makedirs(dest_dir, exist_ok=True)
+    paths = []
+    for url in IEEE_REGISTRY_URLS:
+        filepath = os.path.join(dest_dir, url.rsplit('/', 1)[-1])
+        print(f"[*] Downloading {url}")
+        response = requests.get(url, timeout=60)
+        response.raise_for_status()
+        with open(filepath, 'wb') as f:
+            f.write(response.content)
+        paths.append(filepath)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the NetMap offline OUI vendor database')
+    parser.add_argument(
+        'sources',
+        nargs='*',
+        help='IEEE registry CSV files or a Wireshark manuf file'
+    )
+    parser.add_argument(
+        '--download',
+        help='Download the IEEE MA-L/MA-M/MA-S registries before building',
+        action='store_true'
+    )
+    parser.add_argument(
+        '--output',
+        help=f'Output database path (default: {DEFAULT_DB_PATH})',
+        default=DEFAULT_DB_PATH
+    )
+    args = parser.parse_args()
+
+    sources = list(args.sources)
+    if args.download:
+        sources += download_registry(os.path.dirname(os.path.abspath(args.output)))
+    if not sources:
+        parser.error('Provide registry files or use --download')
+
+    count = compile_registry(sources, args.output)
+    print(f"[+] Wrote {count} prefixes to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+NetMap - Asynchronous Port Prober
+Probes many (host, port) pairs concurrently with global and per-host limits,
+optionally sized and paced by an adaptive rate controller
+"""
+
+import asyncio
+import socket
+import time
+
+PROBE_OUTCOMES = ('sent', 'open', 'refused', 'timeout', 'error')
+
+
+class AsyncPortProber:
+    """TCP connect prober built on asyncio non-blocking sockets"""
+
+    def __init__(self, timeout=1, max_concurrency=512, per_host_limit=32, service_detector=None,
+                 rate_controller=None):
+        """
+        Args:
+            timeout: Connection timeout in seconds for a single probe
+            max_concurrency: Maximum number of connections in flight overall
+            per_host_limit: Maximum number of connections in flight per host
+            service_detector: ServiceDetector run on every open port's
+                connection before it is closed (optional)
+            rate_controller: RateController that adapts the connections in
+                flight, the pacing and the timeout (fixed limits if None)
+        """
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.per_host_limit = per_host_limit
+        self.service_detector = service_detector
+        self.rate_controller = rate_controller
+        # (ip, port) -> service string from the last probe
+        self.services = {}
+        # Hosts that answered a probe; only their silence counts as loss
+        self._responsive = set()
+        # Outcome counts of the last probe() (sent, open, refused, timeout, error)
+        self.stats = dict.fromkeys(PROBE_OUTCOMES, 0)
+
+    async def _connect(self, ip, port):
+        """
+        Attempt a single TCP connection, identifying the service on it
+        when a service detector is set
+        Args:
+            ip: IP address
+            port: Port number
+        Returns:
+            bool: True if the connection was accepted
+        """
+        loop = asyncio.get_running_loop()
+        controller = self.rate_controller
+        timeout = controller.timeout if controller is not None else self.timeout
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        started = time.monotonic()
+        self.stats['sent'] += 1
+        try:
+            await asyncio.wait_for(loop.sock_connect(sock, (ip, port)), timeout)
+        except ConnectionRefusedError:
+            # A RST is an answer too: it measures the round trip
+            sock.close()
+            self.stats['refused'] += 1
+            self._answered(ip, time.monotonic() - started)
+            return False
+        except asyncio.TimeoutError:
+            sock.close()
+            self.stats['timeout'] += 1
+            # Filtered ports never answer; silence is loss only from hosts known to respond
+            if controller is not None and ip in self._responsive:
+                controller.on_loss()
+            return False
+        except OSError:
+            sock.close()
+            self.stats['error'] += 1
+            return False
+        self.stats['open'] += 1
+        self._answered(ip, time.monotonic() - started)
+
+        try:
+            if self.service_detector is not None:
+                self.services[(ip, port)] = await self.service_detector.identify(sock, ip, port)
+            return True
+        finally:
+            sock.close()
+
+    def _answered(self, ip, rtt):
+        self._responsive.add(ip)
+        if self.rate_controller is not None:
+            self.rate_controller.on_response(rtt)
+
+    async def _probe_all(self, targets):
+        """
+        Probe every target concurrently while honouring the limits.
+        A fixed pool of worker coroutines drains the target list, so memory
+        stays proportional to max_concurrency rather than to the target count.
+        With a rate controller, only its current window of workers may have a
+        connection in flight, and connections are paced over the round trip.
+        """
+        host_limits = {}
+        results = {}
+        pending = iter(targets)
+        controller = self.rate_controller
+        gate = asyncio.Condition()
+        in_flight = 0
+
+        async def worker():
+            nonlocal in_flight
+            for ip, port in pending:
+                host_limit = host_limits.setdefault(ip, asyncio.Semaphore(self.per_host_limit))
+                async with host_limit:
+                    if controller is None:
+                        results[(ip, port)] = await self._connect(ip, port)
+                        continue
+
+                    async with gate:
+                        await gate.wait_for(lambda: in_flight < controller.limit)
+                        in_flight += 1
+                    try:
+                        delay = controller.reserve()
+                        if delay > 0:
+                            await asyncio.sleep(delay)
+                        results[(ip, port)] = await self._connect(ip, port)
+                    finally:
+                        async with gate:
+                            in_flight -= 1
+                            # The window may have grown by one, so wake two workers
+                            gate.notify(2)
+
+        workers = min(self.max_concurrency, len(targets))
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        return results
+
+    def probe(self, targets):
+        """
+        Probe a batch of (ip, port) pairs
+        Args:
+            targets: Iterable of (ip, port) tuples
+        Returns:
+            dict mapping (ip, port) to True if open
+        """
+        targets = list(dict.fromkeys(targets))
+        self.services = {}
+        self._responsive = set()
+        self.stats = dict.fromkeys(PROBE_OUTCOMES, 0)
+        if not targets:
+            return {}
+        return asyncio.run(self._probe_all(targets))
+
+    def probe_hosts(self, ips, ports):
+        """
+        Probe the same set of ports on every host
+        Args:
+            ips: Iterable of IP address strings
+            ports: Iterable of port numbers
+        Returns:
+            dict mapping ip to {port: bool}
+        """
+        ips = list(ips)
+        ports = list(ports)
+        # Interleave hosts so the per-host limit does not stall the global queue
+        targets = [(ip, port) for port in ports for ip in ips]
+        results = self.probe(targets)
+
+        return {
+            ip: {port: results.get((ip, port), False) for port in ports}
+            for ip in ips
+        }
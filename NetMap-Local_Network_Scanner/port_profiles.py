@@ -0,0 +1,173 @@
+"""
+NetMap - Port Profiles
+Named port sets, port list/range parsing and result column naming
+"""
+
+# Ports checked when no port list is given
+DEFAULT_PORTS = [22, 80, 443]
+
+# Above this many ports the per-port columns collapse into one 'Open Ports' column
+PORT_COLUMN_LIMIT = 16
+
+BASE_FIELDS = ['IP Address', 'MAC Address', 'Vendor', 'Hostname']
+
+OPEN_PORTS_FIELD = 'Open Ports'
+
+SERVICES_FIELD = 'Services'
+
+SERVICE_NAMES = {
+    21: 'FTP', 22: 'SSH', 23: 'Telnet', 25: 'SMTP', 53: 'DNS',
+    80: 'HTTP', 88: 'Kerberos', 102: 'S7', 110: 'POP3', 111: 'RPC',
+    135: 'MSRPC', 139: 'NetBIOS', 143: 'IMAP', 389: 'LDAP', 443: 'HTTPS',
+    445: 'SMB', 465: 'SMTPS', 502: 'Modbus', 515: 'LPD', 548: 'AFP',
+    554: 'RTSP', 587: 'Submission', 631: 'IPP', 636: 'LDAPS', 873: 'Rsync',
+    993: 'IMAPS', 995: 'POP3S', 1433: 'MSSQL', 1521: 'Oracle', 1723: 'PPTP',
+    1883: 'MQTT', 1911: 'Fox', 2049: 'NFS', 2404: 'IEC-104', 3306: 'MySQL',
+    3389: 'RDP', 4840: 'OPC-UA', 5060: 'SIP', 5432: 'PostgreSQL', 5555: 'ADB',
+    5900: 'VNC', 6379: 'Redis', 7547: 'TR-069', 8080: 'HTTP-Alt',
+    8443: 'HTTPS-Alt', 8883: 'MQTTS', 9100: 'JetDirect', 20000: 'DNP3',
+    27017: 'MongoDB', 44818: 'EtherNet/IP'
+}
+
+# Nmap's 100 most frequently open TCP ports, listed by port number
+TOP_100_PORTS = [
+    7, 9, 13, 21, 22, 23, 25, 26, 37, 53, 79, 80, 81, 88, 106, 110, 111, 113,
+    119, 135, 139, 143, 144, 179, 199, 389, 427, 443, 444, 445, 465, 513, 514,
+    515, 543, 544, 548, 554, 587, 631, 646, 873, 990, 993, 995, 1025, 1026,
+    1027, 1028, 1029, 1110, 1433, 1720, 1723, 1755, 1900, 2000, 2001, 2049,
+    2121, 2717, 3000, 3128, 3306, 3389, 3986, 4899, 5000, 5009, 5051, 5060,
+    5101, 5190, 5357, 5432, 5631, 5666, 5800, 5900, 6000, 6001, 6646, 7070,
+    8000, 8008, 8009, 8080, 8081, 8443, 8888, 9100, 9999, 10000, 32768, 49152,
+    49153, 49154, 49155, 49156, 49157
+]
+
+# Frequently seen service ports outside the top 100
+_EXTRA_COMMON_PORTS = [
+    636, 1080, 1194, 1521, 1883, 2082, 2083, 2086, 2087, 2222, 2375, 2376,
+    3268, 3269, 4443, 4444, 4567, 5001, 5555, 5601, 5672, 5984, 5985,
+    5986, 6379, 6443, 6667, 7001, 7002, 7547, 8001, 8002, 8082, 8083, 8086,
+    8089, 8161, 8181, 8291, 8333, 8834, 8880, 8883, 9000, 9001, 9042, 9090,
+    9091, 9200, 9300, 9418, 9443, 10250, 11211, 15672, 27017, 27018, 50000,
+    50070
+]
+
+
+def _build_extended():
+    """
+    1000 ports: the top 100, the extra common service ports, then every
+    remaining port from 1 upwards until the set is full (not a frequency ranking)
+    """
+    ports = list(dict.fromkeys(TOP_100_PORTS + _EXTRA_COMMON_PORTS))
+    seen = set(ports)
+    for port in range(1, 65536):
+        if len(ports) >= 1000:
+            break
+        if port not in seen:
+            ports.append(port)
+            seen.add(port)
+    return ports
+
+
+PORT_PROFILES = {
+    'default': DEFAULT_PORTS,
+    'top-100': TOP_100_PORTS,
+    'extended': _build_extended(),
+    'ics': [
+        102, 502, 789, 1911, 1962, 2222, 2404, 2455, 4840, 4911, 5007, 9600,
+        18245, 20000, 20547, 44818
+    ],
+    'iot': [
+        23, 80, 81, 443, 554, 631, 1883, 2323, 5000, 5555, 6668, 7547, 8000,
+        8008, 8009, 8080, 8081, 8443, 8883, 8888, 9000, 9100, 32400, 34567,
+        37777, 49152, 62078
+    ]
+}
+
+
+def parse_ports(spec):
+    """
+    Parse a port specification into a sorted list of unique ports
+    Args:
+        spec: String such as '22,80,8000-8100,top-100' or an iterable of ints
+    Returns:
+        list of port numbers
+    Raises:
+        ValueError: If a port, range or profile name is invalid
+    """
+    if spec is None:
+        return list(DEFAULT_PORTS)
+
+    if not isinstance(spec, str):
+        items = [str(item) for item in spec]
+    else:
+        items = spec.split(',')
+
+    ports = set()
+    for item in items:
+        item = item.strip().lower()
+        if not item:
+            continue
+
+        if item in PORT_PROFILES:
+            ports.update(PORT_PROFILES[item])
+        elif '-' in item:
+            start, end = item.split('-', 1)
+            start, end = int(start), int(end)
+            if start > end:
+                raise ValueError(f"Invalid port range: {item}")
+            ports.update(range(start, end + 1))
+        else:
+            ports.add(int(item))
+
+    invalid = [port for port in ports if not 1 <= port <= 65535]
+    if invalid:
+        raise ValueError(f"Invalid port number: {invalid[0]}")
+    if not ports:
+        raise ValueError("No ports specified")
+
+    return sorted(ports)
+
+
+def port_column(port):
+    """
+    Column name for a port, e.g. 'SSH (22)'
+    Args:
+        port: Port number
+    Returns:
+        str column name
+    """
+    return f"{SERVICE_NAMES.get(port, 'TCP')} ({port})"
+
+
+def port_columns(port_status):
+    """
+    Render probe results into result columns
+    Args:
+        port_status: dict mapping port to True if open
+    Returns:
+        dict of column name to value ('Open'/'Closed', or a port list)
+    """
+    if len(port_status) > PORT_COLUMN_LIMIT:
+        open_ports = [str(port) for port, is_open in sorted(port_status.items()) if is_open]
+        return {OPEN_PORTS_FIELD: ','.join(open_ports) or 'None'}
+
+    return {
+        port_column(port): 'Open' if is_open else 'Closed'
+        for port, is_open in sorted(port_status.items())
+    }
+
+
+def result_fieldnames(ports, services=False):
+    """
+    Result schema for a scan of the given ports
+    Args:
+        ports: List of port numbers
+        services: Add the 'Services' column of service detection
+    Returns:
+        list of column names
+    """
+    if len(ports) > PORT_COLUMN_LIMIT:
+        fields = BASE_FIELDS + [OPEN_PORTS_FIELD]
+    else:
+        fields = BASE_FIELDS + [port_column(port) for port in sorted(ports)]
+    return fields + [SERVICES_FIELD] if services else fields
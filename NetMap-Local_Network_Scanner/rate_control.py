@@ -0,0 +1,124 @@
+"""
+NetMap - Adaptive Rate Control
+AIMD congestion window with TCP-style RTT estimation (RFC 6298), used to
+size probe concurrency, timeouts and packet pacing to the network
+"""
+
+import threading
+import time
+
+
+class RateController:
+    """
+    Grows the probe window while answers keep coming and halves it on loss,
+    at most once per round trip. Thread-safe, so asyncio probers, sweep
+    loops and worker threads can share one instance.
+    """
+
+    def __init__(self, window=32, min_window=1, max_window=1024, timeout=1.0,
+                 min_timeout=0.25, max_rate=None):
+        """
+        Args:
+            window: Initial number of probes in flight
+            min_window: Smallest window after backing off
+            max_window: Largest window
+            timeout: Initial and largest probe timeout in seconds
+            min_timeout: Smallest timeout however fast the network answers
+            max_rate: Upper bound on probes per second (unbounded if None)
+        """
+        self.window = float(window)
+        self.min_window = min_window
+        self.max_window = max_window
+        self.max_timeout = timeout
+        self.min_timeout = min_timeout
+        self.max_rate = max_rate
+        self.srtt = None
+        self.rttvar = None
+        self.responses = 0
+        self.losses = 0
+        self._ssthresh = float(max_window)
+        self._rto = timeout
+        self._last_decrease = 0.0
+        self._next_send = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def timeout(self):
+        """Current probe timeout (smoothed RTT plus four deviations)"""
+        return self._rto
+
+    @property
+    def limit(self):
+        """Current window as a whole number of probes"""
+        return max(self.min_window, int(self.window))
+
+    @property
+    def interval(self):
+        """Seconds between probes: the window spread over one round trip"""
+        interval = self.srtt / self.window if self.srtt is not None else 0.0
+        if self.max_rate:
+            interval = max(interval, 1.0 / self.max_rate)
+        return interval
+
+    def on_response(self, rtt):
+        """
+        Record an answered probe
+        Args:
+            rtt: Seconds between sending the probe and the answer
+        """
+        with self._lock:
+            self.responses += 1
+            if self.srtt is None:
+                self.srtt = rtt
+                self.rttvar = rtt / 2
+            else:
+                self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+                self.srtt = 0.875 * self.srtt + 0.125 * rtt
+            self._rto = min(self.max_timeout, max(self.min_timeout, self.srtt + 4 * self.rttvar))
+
+            # Slow start doubles the window every round trip, then grow by one per round trip
+            if self.window < self._ssthresh:
+                self.window += 1
+            else:
+                self.window += 1 / self.window
+            self.window = min(self.window, self.max_window)
+
+    def on_loss(self):
+        """Record a probe that should have been answered but was not"""
+        with self._lock:
+            self.losses += 1
+            now = time.monotonic()
+            # A burst of losses from one round trip backs off only once
+            if now - self._last_decrease < (self.srtt or self._rto):
+                return
+            self._last_decrease = now
+            self._ssthresh = max(self.window / 2, self.min_window)
+            self.window = self._ssthresh
+
+    def reserve(self):
+        """
+        Claim the next send slot
+        Returns:
+            Seconds to wait before sending
+        """
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_send, now)
+            self._next_send = slot + self.interval
+            return slot - now
+
+    def pace(self):
+        """Block the calling thread until its send slot"""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def stats(self):
+        """Controller state for reporting"""
+        return {
+            'window': round(self.window, 1),
+            'srtt_ms': round(self.srtt * 1000, 2) if self.srtt is not None else None,
+            'timeout_ms': round(self._rto * 1000, 1),
+            'responses': self.responses,
+            'losses': self.losses
+        }
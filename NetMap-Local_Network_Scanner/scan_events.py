@@ -0,0 +1,103 @@
+"""
+NetMap - Scan Event Stream
+Fans scan progress and host results out to Server-Sent Events subscribers
+"""
+
+import json
+import queue
+import threading
+from collections import deque
+
+# Events that end a scan; subscribers disconnect after receiving one
+TERMINAL_EVENTS = ('complete', 'failed')
+
+
+def format_sse(event, data):
+    """
+    Encode one Server-Sent Event
+    Args:
+        event: Event name
+        data: JSON-serialisable payload
+    Returns:
+        str SSE message
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class EventStream:
+    """Broadcasts the events of one scan to any number of subscribers"""
+
+    def __init__(self, heartbeat=15, max_history=None):
+        """
+        Args:
+            heartbeat: Seconds of silence before a keep-alive comment is sent
+            max_history: Replay only the most recent events (None keeps all);
+                long-running streams set this to keep memory flat
+        """
+        self.heartbeat = heartbeat
+        self.max_history = max_history
+        self._lock = threading.Lock()
+        self._subscribers = []
+        # Replayed to late subscribers so they see the whole scan
+        self._history = deque(maxlen=max_history)
+        self._progress = None
+        self._finished = False
+
+    def reset(self):
+        """Start a new scan, dropping the replay history"""
+        with self._lock:
+            self._history = deque(maxlen=self.max_history)
+            self._progress = None
+            self._finished = False
+
+    def publish(self, event, data):
+        """
+        Send an event to every subscriber
+        Args:
+            event: Event name ('start', 'progress', 'host', 'complete', 'failed')
+            data: JSON-serialisable payload
+        """
+        message = format_sse(event, data)
+        terminal = event in TERMINAL_EVENTS
+        with self._lock:
+            # Only the latest progress matters to a late subscriber
+            if event == 'progress':
+                self._progress = message
+            else:
+                self._history.append(message)
+            if terminal:
+                self._finished = True
+            for subscriber in self._subscribers:
+                subscriber.put((message, terminal))
+
+    def subscribe(self):
+        """
+        Stream the scan's events, starting with a replay of what already happened
+        Yields:
+            str SSE messages; ends after the scan completes or fails
+        """
+        subscriber = queue.Queue()
+        with self._lock:
+            backlog = list(self._history)
+            if self._progress:
+                backlog.append(self._progress)
+            finished = self._finished
+            self._subscribers.append(subscriber)
+
+        try:
+            yield from backlog
+            if finished:
+                return
+
+            while True:
+                try:
+                    message, terminal = subscriber.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield message
+                if terminal:
+                    return
+        finally:
+            with self._lock:
+                self._subscribers.remove(subscriber)
@@ -0,0 +1,229 @@
+"""
+NetMap - Service Detection
+Identifies the service behind an open port from the connection the prober
+already holds: server greetings (SSH, FTP, SMTP), the HTTP Server header and
+the common name of a TLS certificate
+"""
+
+import asyncio
+import ssl
+import time
+
+# Largest greeting or HTTP response head read from a port
+MAX_BANNER_BYTES = 1024
+
+# Largest TLS handshake accepted before giving up on reading the certificate
+MAX_TLS_BYTES = 32768
+
+# Longest service string kept in the results
+MAX_SERVICE_LENGTH = 80
+
+TLS_PORTS = {
+    443, 465, 563, 636, 853, 989, 990, 992, 993, 994, 995, 2083, 2087, 4443,
+    5061, 5986, 6443, 8443, 8883, 9443, 10250
+}
+
+HTTP_PORTS = {
+    80, 81, 591, 2082, 2086, 3000, 3128, 5000, 5601, 7001, 8000, 8008, 8080,
+    8081, 8082, 8088, 8181, 8888, 9000, 9090, 9200
+}
+
+_OID_COMMON_NAME = b'\x55\x04\x03'
+
+
+def _der_item(der, offset):
+    """
+    Read one DER tag-length header
+    Returns:
+        tuple (tag, content start, content end)
+    """
+    tag = der[offset]
+    length = der[offset + 1]
+    offset += 2
+    if length & 0x80:
+        size = length & 0x7F
+        length = int.from_bytes(der[offset:offset + size], 'big')
+        offset += size
+    return tag, offset, offset + length
+
+
+def _der_children(der, start, end):
+    """List the (tag, start, end) of every element inside a constructed value"""
+    children = []
+    while start < end:
+        child = _der_item(der, start)
+        children.append(child)
+        start = child[2]
+    return children
+
+
+def certificate_common_name(der):
+    """
+    Extract the subject common name from a DER certificate without a full
+    ASN.1 parser
+    Args:
+        der: DER-encoded X.509 certificate
+    Returns:
+        Common name or None
+    """
+    try:
+        _, start, end = _der_item(der, 0)
+        _, start, end = _der_item(der, start)
+        fields = _der_children(der, start, end)
+        # The version field is optional and tagged [0]
+        if fields and fields[0][0] == 0xA0:
+            fields = fields[1:]
+        # serialNumber, signature, issuer, validity, subject
+        _, start, end = fields[4]
+        for _, set_start, set_end in _der_children(der, start, end):
+            for _, attr_start, attr_end in _der_children(der, set_start, set_end):
+                (_, oid_start, oid_end), (_, value_start, value_end) = (
+                    _der_children(der, attr_start, attr_end)[:2]
+                )
+                if der[oid_start:oid_end] == _OID_COMMON_NAME:
+                    return der[value_start:value_end].decode('utf-8', 'replace')
+    except (IndexError, ValueError):
+        pass
+    return None
+
+
+def _first_line(data):
+    line = data.split(b'\n', 1)[0].strip()
+    text = ''.join(ch if ch.isprintable() else '.' for ch in line.decode('latin-1'))
+    return text[:MAX_SERVICE_LENGTH] or None
+
+
+def parse_http_server(response):
+    """
+    Describe an HTTP response head
+    Args:
+        response: Raw bytes of the response head
+    Returns:
+        'HTTP: <Server header>', 'HTTP' without one, or None if not HTTP
+    """
+    if not response.startswith(b'HTTP/'):
+        return None
+    for line in response.split(b'\r\n')[1:]:
+        name, _, value = line.partition(b':')
+        if name.strip().lower() == b'server':
+            return f"HTTP: {_first_line(value) or '?'}"[:MAX_SERVICE_LENGTH]
+    return 'HTTP'
+
+
+def format_services(services):
+    """
+    Render detected services into the 'Services' column
+    Args:
+        services: dict mapping port to service string (or None)
+    Returns:
+        str such as '22: SSH-2.0-OpenSSH_9.6; 443: TLS: CN=nas.local', or 'None'
+    """
+    parts = [f"{port}: {service}" for port, service in sorted(services.items()) if service]
+    return '; '.join(parts) or 'None'
+
+
+class ServiceDetector:
+    """Reads banners over sockets the port prober has just connected"""
+
+    def __init__(self, timeout=2.0, ttl=300):
+        """
+        Args:
+            timeout: Seconds allowed for identifying one port
+            ttl: Seconds an identified service is reused for the same (ip, port)
+                before its banner is read again (0 disables the cache)
+        """
+        self.timeout = timeout
+        self.ttl = ttl
+        # (ip, port) -> (expiry, service); in memory, so lookups never block the event loop
+        self._cache = {}
+
+    async def _read(self, loop, sock, limit, timeout):
+        """Read until the peer pauses, closes or limit bytes arrived"""
+        data = b''
+        try:
+            while len(data) < limit:
+                chunk = await asyncio.wait_for(loop.sock_recv(sock, limit - len(data)), timeout)
+                if not chunk:
+                    break
+                data += chunk
+                if b'\r\n\r\n' in data or (data.endswith(b'\n') and not data.startswith(b'HTTP/')):
+                    break
+        except (OSError, asyncio.TimeoutError):
+            pass
+        return data
+
+    async def _http_head(self, loop, sock, ip):
+        request = f"HEAD / HTTP/1.0\r\nHost: {ip}\r\nUser-Agent: NetMap\r\n\r\n".encode()
+        await loop.sock_sendall(sock, request)
+        return parse_http_server(await self._read(loop, sock, MAX_BANNER_BYTES, self.timeout))
+
+    async def _tls_common_name(self, loop, sock):
+        """Run a TLS handshake over the socket and return the certificate CN"""
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        incoming = ssl.MemoryBIO()
+        outgoing = ssl.MemoryBIO()
+        tls = context.wrap_bio(incoming, outgoing)
+
+        received = 0
+        while True:
+            try:
+                tls.do_handshake()
+                break
+            except ssl.SSLWantReadError:
+                pending = outgoing.read()
+                if pending:
+                    await loop.sock_sendall(sock, pending)
+                chunk = await loop.sock_recv(sock, 4096)
+                received += len(chunk)
+                if not chunk or received > MAX_TLS_BYTES:
+                    return None
+                incoming.write(chunk)
+
+        der = tls.getpeercert(binary_form=True)
+        name = certificate_common_name(der) if der else None
+        return f"TLS: CN={name}" if name else 'TLS'
+
+    async def _identify(self, sock, ip, port):
+        loop = asyncio.get_running_loop()
+        if port in TLS_PORTS:
+            return await self._tls_common_name(loop, sock)
+        if port in HTTP_PORTS:
+            return await self._http_head(loop, sock, ip)
+
+        # Server-first protocols greet straight away; otherwise try HTTP
+        banner = await self._read(loop, sock, MAX_BANNER_BYTES, min(1.0, self.timeout / 2))
+        if banner:
+            return _first_line(banner)
+        return await self._http_head(loop, sock, ip)
+
+    async def identify(self, sock, ip, port):
+        """
+        Identify the service on a connected socket
+        Args:
+            sock: Connected non-blocking socket
+            ip: IP address
+            port: Port number
+        Returns:
+            Service string or None
+        """
+        key = (ip, port)
+        now = time.monotonic()
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+
+        try:
+            service = await asyncio.wait_for(self._identify(sock, ip, port), self.timeout)
+        except (OSError, ssl.SSLError, asyncio.TimeoutError):
+            # Timeouts and resets are transient; try again next round
+            return None
+        if service is not None and self.ttl > 0:
+            self._cache[key] = (now + self.ttl, service)
+        return service
+
+    def prune(self):
+        """Drop expired entries so a long-running scanner does not keep every port it ever saw"""
+        now = time.monotonic()
+        self._cache = {key: entry for key, entry in self._cache.items() if entry[0] > now}
@@ -0,0 +1,1141 @@
+"""
+Test file to verify NetMap components work without a live LAN
+"""
+import sys
+import os
+import asyncio
+import contextlib
+import gzip
+import http.server
+import io
+import ipaddress
+import json
+import queue
+import socket
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import time
+import tracemalloc
+
+# Add NetMap to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from change_detector import ChangeDetector
+from monitor_daemon import MonitorDaemon
+from history_store import HistoryStore, parse_time
+from name_resolver import NameResolver, build_ptr_response
+from discovery import IcmpSweeper, TcpPinger, parse_echo_reply
+from port_prober import AsyncPortProber
+from service_detect import ServiceDetector, certificate_common_name
+from rate_control import RateController
+from oui_db import OUIDatabase, compile_registry
+from lookup_cache import LookupCache
+from job_manager import JobManager, JobQueueFull, CANCELLED, RUNNING
+from host_table import HostTable
+from exporters import detect_format, open_exporter, stream_export
+from benchmark import SimulatedNetwork, SimulatedScanner, compare, run_benchmark
+from metrics import MetricsRegistry
+from scan_events import EventStream
+from coordinator import PROTOCOL_VERSION, Coordinator, encode_results, partition_subnets
+from port_profiles import parse_ports, port_columns
+from arp_sweeper import (
+    ArpSweeper, ReplayTransport, build_arp_reply, read_pcap, write_pcap, subnet_targets
+)
+
+SRC_MAC = '02:00:00:00:00:01'
+SRC_IP = '192.168.50.1'
+
+
+def _recorded_replies():
+    return [
+        build_arp_reply('192.168.50.2', 'aa:bb:cc:00:00:02', SRC_MAC, SRC_IP),
+        build_arp_reply('192.168.50.3', 'aa:bb:cc:00:00:03', SRC_MAC, SRC_IP),
+        build_arp_reply('192.168.50.6', 'aa:bb:cc:00:00:06', SRC_MAC, SRC_IP),
+    ]
+
+
+def test_pcap_round_trip():
+    """Test that recorded ARP replies survive a pcap round trip"""
+    print("✓ Testing pcap round trip...")
+    frames = _recorded_replies()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'replies.pcap')
+        write_pcap(path, frames)
+        loaded = read_pcap(path)
+
+    assert loaded == frames, "Frames differ after round trip"
+    print(f"  ✅ {len(loaded)} frames replayed")
+    return True
+
+
+def test_arp_sweep_replay():
+    """Test the ARP sweep against a replayed capture"""
+    print("\n✓ Testing ARP sweep replay...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'replies.pcap')
+        write_pcap(path, _recorded_replies())
+        transport = ReplayTransport.from_pcap(path, drop={'192.168.50.3': 1}, latency=0.01)
+
+    sweeper = ArpSweeper(transport, SRC_MAC, SRC_IP, rate=10000, retries=2, quiet_period=0.05)
+    devices = sweeper.sweep(subnet_targets('192.168.50.0/29'))
+
+    found = {d['ip']: d['mac'] for d in devices}
+    expected = {
+        '192.168.50.2': 'aa:bb:cc:00:00:02',
+        '192.168.50.3': 'aa:bb:cc:00:00:03',
+        '192.168.50.6': 'aa:bb:cc:00:00:06',
+    }
+    ok = found == expected
+    print(f"  {'✅' if ok else '❌'} Found {len(found)} hosts: {sorted(found)}")
+
+    # Responders must not be asked again; silent hosts get every retry
+    retransmitted = [ip for ip in transport.sent if transport.sent.count(ip) > 1]
+    only_silent = '192.168.50.2' not in retransmitted and '192.168.50.6' not in retransmitted
+    print(f"  {'✅' if only_silent else '❌'} Retransmits sent to non-responders only")
+    assert ok and only_silent
+    return True
+
+
+def _host(ip, mac, ssh='Closed'):
+    return {'IP Address': ip, 'MAC Address': mac, 'Vendor': 'Acme', 'Hostname': 'N/A', 'SSH (22)': ssh}
+
+
+def test_oui_database():
+    """Test compiling registries and longest-prefix vendor lookups"""
+    print("\n✓ Testing offline OUI database...")
+    long_vendor = 'é' * 40000
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'registry.csv')
+        with open(csv_path, 'w', encoding='utf-8') as f:
+            f.write("Registry,Assignment,Organization Name,Organization Address\n"
+                    "MA-L,AABBCC,Big Vendor,Somewhere\n"
+                    "MA-M,AABBCCD,Mid Vendor,Somewhere\n"
+                    "MA-S,AABBCCDDE,Small Vendor,Somewhere\n")
+        manuf_path = os.path.join(tmp, 'manuf')
+        with open(manuf_path, 'w', encoding='utf-8') as f:
+            f.write(f"# comment\n11:22:33\tShort\t{long_vendor}\n")
+        db_path = os.path.join(tmp, 'oui.bin')
+        assert compile_registry([csv_path, manuf_path], db_path) == 4
+
+        db = OUIDatabase(db_path)
+        try:
+            assert len(db) == 4
+            # 36-bit beats 28-bit beats 24-bit
+            assert db.lookup('aa:bb:cc:dd:ee:ff') == 'Small Vendor'
+            assert db.lookup('aa:bb:cc:d1:00:00') == 'Mid Vendor'
+            assert db.lookup('AA-BB-CC-01-02-03') == 'Big Vendor'
+            assert db.lookup('00:00:00:00:00:01') is None
+            assert db.lookup('not-a-mac') is None
+            # 0xFFFF bytes would split a 2-byte character; the cut falls before it
+            assert db.lookup('1122.3344.5566') == 'é' * 32767
+        finally:
+            db.close()
+        # Rebuilding replaces the file whole, leaving no temp file behind
+        assert compile_registry([csv_path], db_path) == 3
+        assert sorted(os.listdir(tmp)) == ['manuf', 'oui.bin', 'registry.csv']
+
+        # Short, foreign and truncated files are rejected, not crashed on
+        with open(db_path, 'rb') as f:
+            valid = f.read()
+        for content in (b'', b'NMOUI', b'x' * 64, valid[:40]):
+            with open(db_path, 'wb') as f:
+                f.write(content)
+            assert OUIDatabase.open_default(db_path) is None, content[:8]
+    print("  ✅ 36/28/24-bit precedence, misses and truncated vendor names")
+    print("  ✅ Atomic rebuilds; short and foreign files rejected")
+    return True
+
+
+def test_change_detection():
+    """Test incremental rescan planning and change events"""
+    print("\n✓ Testing change detection...")
+    detector = ChangeDetector(':memory:', reprobe_ttl=3600, removed_after=1)
+    subnets = ['10.0.0.0/24']
+    detector.commit([_host('10.0.0.1', 'aa:00'), _host('10.0.0.2', 'bb:00')],
+                    ['10.0.0.1', '10.0.0.2'], subnets)
+
+    # .1 unchanged, .2's MAC now at .3, .4 is new
+    to_probe, reused = detector.plan([
+        {'ip': '10.0.0.1', 'mac': 'aa:00'},
+        {'ip': '10.0.0.3', 'mac': 'bb:00'},
+        {'ip': '10.0.0.4', 'mac': 'cc:00'},
+    ])
+    probed = [device['ip'] for device in to_probe]
+    assert probed == ['10.0.0.3', '10.0.0.4'], probed
+    assert [host['IP Address'] for host in reused] == ['10.0.0.1']
+    print(f"  ✅ Re-probing only {probed}")
+
+    events = detector.commit(
+        reused + [_host('10.0.0.3', 'bb:00'), _host('10.0.0.4', 'cc:00', 'Open')], probed, subnets
+    )
+    summary = sorted((event['event'], event['ip']) for event in events)
+    assert summary == [('added', '10.0.0.4'), ('changed', '10.0.0.3')], summary
+    print(f"  ✅ Events: {summary}")
+
+    events = detector.commit([_host('10.0.0.1', 'aa:00')], [], subnets)
+    summary = sorted((event['event'], event['ip']) for event in events)
+    assert summary == [('removed', '10.0.0.3'), ('removed', '10.0.0.4')], summary
+    print("  ✅ Removed hosts reported")
+
+    # A slice's commit only reads and removes hosts inside that slice
+    detector.commit([_host('10.0.0.70', 'dd:00')], ['10.0.0.70'], ['10.0.0.64/26'])
+    events = detector.commit([], [], ['10.0.0.0/26'])
+    assert [(event['event'], event['ip']) for event in events] == [('removed', '10.0.0.1')], events
+    assert [device['ip'] for device in detector.plan([{'ip': '10.0.0.70', 'mac': 'dd:00'}])[0]] == []
+
+    # State files without the integer address column are upgraded in place
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'state.db')
+        conn = sqlite3.connect(path)
+        conn.execute('CREATE TABLE hosts (ip TEXT PRIMARY KEY, mac TEXT NOT NULL, record TEXT NOT NULL,'
+                     ' probed REAL NOT NULL, misses INTEGER NOT NULL DEFAULT 0)')
+        conn.execute('INSERT INTO hosts VALUES (?, ?, ?, ?, 0)',
+                     ('10.0.1.5', 'ee:00', json.dumps(_host('10.0.1.5', 'ee:00')), time.time()))
+        conn.commit()
+        conn.close()
+        old = ChangeDetector(path, removed_after=1)
+        events = old.commit([], [], ['10.0.1.0/24'])
+        old.close()
+    assert [(event['event'], event['ip']) for event in events] == [('removed', '10.0.1.5')], events
+    print("  ✅ Slices read by address range, old state files migrated")
+    return True
+
+
+class _FakeScanner:
+    """Answers sweeps from a fixed table instead of the network"""
+    subnet = '10.1.0.0/24'
+    fieldnames = ['IP Address', 'MAC Address', 'Vendor', 'Hostname', 'SSH (22)']
+
+    def __init__(self, live):
+        self.live = live
+        self.swept = []
+        self.probed = []
+
+    def resolve_scan_targets(self, subnets=None, interfaces=None):
+        return [('eth0', subnet) for subnet in subnets or [self.subnet]]
+
+    def discover_hosts(self, targets, methods=None):
+        (_, subnet), = targets
+        self.swept.append((subnet, time.monotonic()))
+        network = ipaddress.IPv4Network(subnet)
+        return [{'ip': ip, 'mac': mac} for ip, mac in self.live.items()
+                if ipaddress.IPv4Address(ip) in network]
+
+    def probe_ports(self, ips):
+        ips = list(ips)
+        self.probed.extend(ips)
+        return {ip: {22: False} for ip in ips}
+
+    def resolve_hostnames(self, ips):
+        return {ip: 'N/A' for ip in ips}
+
+    def gather_host_info(self, device, port_status=None, hostname=None):
+        return _host(device['ip'], device['mac'])
+
+
+def test_monitor_daemon():
+    """Test that the monitor spreads slices over the interval and tracks hosts"""
+    print("\n✓ Testing monitor daemon...")
+    scanner = _FakeScanner({'10.1.0.5': 'aa:05', '10.1.0.200': 'aa:c8'})
+    daemon = MonitorDaemon(scanner, ChangeDetector(':memory:', removed_after=1),
+                           subnets=['10.1.0.0/24'], interval=0.4, slice_prefix=26, max_hosts=10)
+
+    assert daemon.run_cycle()
+    slices = [subnet for subnet, _ in scanner.swept]
+    assert slices == ['10.1.0.0/26', '10.1.0.64/26', '10.1.0.128/26', '10.1.0.192/26'], slices
+    times = [t for _, t in scanner.swept]
+    gaps = [b - a for a, b in zip(times, times[1:])]
+    assert all(gap >= 0.09 for gap in gaps), gaps
+    print(f"  ✅ {len(slices)} slices spread {min(gaps):.2f}s+ apart")
+
+    del scanner.live['10.1.0.200']
+    scanner.probed.clear()
+    daemon.run_cycle()
+    assert scanner.probed == [], scanner.probed
+    assert [h['IP Address'] for h in daemon.hosts()] == ['10.1.0.5']
+    print("  ✅ Unchanged hosts not re-probed, removed host dropped from index")
+    return True
+
+
+def test_history_store():
+    """Test history queries over many recorded scans"""
+    print("\n✓ Testing scan history store...")
+    store = HistoryStore(':memory:')
+    day = 86400
+    start = 1_700_000_000
+    hosts = [_host(f'10.2.{i // 256}.{i % 256}', f'aa:00:00:00:{i // 256:02x}:{i % 256:02x}')
+             for i in range(500)]
+    for n in range(60):
+        # .0.7 only exposes SSH during the last week
+        hosts[7]['SSH (22)'] = 'Open' if n >= 53 else 'Closed'
+        store.record_scan(hosts, ['10.2.0.0/23'], source='test', timestamp=start + n * day)
+    store.record_scan([_host('10.2.0.7', 'bb:00:00:00:00:01')], timestamp=start + 60 * day)
+
+    began = time.perf_counter()
+    seen = store.first_seen('AA:00:00:00:00:07')
+    recent = store.hosts_with_port(22, parse_time('7d', now=start + 60 * day))
+    ip_rows = store.ip_history('10.2.0.7', since=start + 58 * day)
+    elapsed = (time.perf_counter() - began) * 1000
+
+    assert seen['first_seen'] == start and seen['last_ip'] == '10.2.0.7', seen
+    assert [(h['ip'], h['observations']) for h in recent] == [('10.2.0.7', 7)], recent
+    assert [row['mac'] for row in ip_rows] == ['bb:00:00:00:00:01'] + ['aa:00:00:00:00:07'] * 2, ip_rows
+    print(f"  ✅ 30,000 observations queried in {elapsed:.1f} ms")
+    return True
+
+
+def _fake_nameserver(sock, delay):
+    """Answer PTR queries for 10.3.x.y with host-x-y, NXDOMAIN for odd y"""
+    answers = queue.Queue()
+
+    def send_delayed():
+        while True:
+            due, response, addr = answers.get()
+            time.sleep(max(0, due - time.monotonic()))
+            sock.sendto(response, addr)
+
+    threading.Thread(target=send_delayed, daemon=True).start()
+    while True:
+        try:
+            query, addr = sock.recvfrom(512)
+        except OSError:
+            return
+        labels = []
+        offset = 12
+        while query[offset]:
+            labels.append(query[offset + 1:offset + 1 + query[offset]].decode())
+            offset += 1 + query[offset]
+        y, x = int(labels[0]), int(labels[1])
+        name = None if y % 2 else f'host-{x}-{y}.lan'
+        answers.put((time.monotonic() + delay, build_ptr_response(query, name), addr))
+
+
+def test_lookup_cache():
+    """Test cache hits, misses, TTL and negative-TTL expiry and LRU eviction"""
+    print("\n✓ Testing lookup cache...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'cache', 'lookups.db')
+        cache = LookupCache(path, ttl=0.6, negative_ttl=0.2, max_entries=3)
+        cache.set('vendor', 'aa:00:00:00:00:01', 'Acme')
+        cache.set('hostname', '10.0.0.1', None)
+        assert cache.get('vendor', 'aa:00:00:00:00:01') == (True, 'Acme')
+        assert cache.get('hostname', '10.0.0.1') == (True, None)
+        assert cache.get('vendor', '10.0.0.1') == (False, None)
+        assert (cache.hits, cache.misses) == (2, 1)
+        cache.close()
+
+        # Entries outlive the connection; the failed lookup expires first
+        cache = LookupCache(path, ttl=0.6, negative_ttl=0.2, max_entries=3)
+        time.sleep(0.3)
+        assert cache.get('hostname', '10.0.0.1') == (False, None)
+        assert cache.get('vendor', 'aa:00:00:00:00:01') == (True, 'Acme')
+        time.sleep(0.4)
+        assert cache.get('vendor', 'aa:00:00:00:00:01') == (False, None)
+        assert cache.purge_expired() == 2
+
+        cache.close()
+
+        # Overflowing trims the cache to 90%, least recently used first: 'b'
+        # and 'c' once 'a' has been read again
+        cache = LookupCache(path, max_entries=10)
+        keys = 'abcdefghij'
+        for key in keys:
+            cache.set('vendor', key, key.upper())
+            time.sleep(0.005)
+        cache.get('vendor', 'a')
+        cache.set('vendor', 'k', 'K')
+        assert [key for key in keys + 'k' if cache.get('vendor', key)[0]] == list('adefghijk')
+        # The running count overshoots on replacements; the recount it
+        # triggers finds 10 rows and evicts nothing
+        cache.set('vendor', 'a', 'A2')
+        cache.set('vendor', 'l', 'L')
+        assert cache._rows == 10 and cache.get('vendor', 'a') == (True, 'A2')
+        assert [key for key in keys + 'kl' if cache.get('vendor', key)[0]] == list('adefghijkl')
+        cache.close()
+    print("  ✅ Hit, miss, expiry and LRU eviction")
+    return True
+
+
+def test_job_manager():
+    """Test the scan worker pool, queue limit, cancellation and LRU eviction"""
+    print("\n✓ Testing scan job manager...")
+    gates = {n: threading.Event() for n in range(6)}
+    started = queue.Queue()
+
+    def run_scan(job):
+        started.put(job.options['n'])
+        gates[job.options['n']].wait(10)
+        job.results = []
+
+    manager = JobManager(run_scan, max_workers=2, max_queued=3, max_finished=2)
+    jobs = [manager.submit({'n': n}) for n in range(5)]
+    assert sorted(started.get(timeout=5) for _ in range(2)) == [0, 1]
+    assert [job.state for job in jobs] == [RUNNING] * 2 + ['queued'] * 3
+
+    try:
+        manager.submit({'n': 5})
+        raise AssertionError('queue limit not enforced')
+    except JobQueueFull:
+        pass
+
+    import web_app
+    scans = web_app.jobs
+    web_app.jobs = manager
+    try:
+        response = web_app.app.test_client().post('/api/jobs', json={'ports': '22'})
+    finally:
+        web_app.jobs = scans
+    assert response.status_code == 429, response.status_code
+
+    # Only jobs still waiting for a worker can be cancelled
+    assert manager.cancel(jobs[3].id) and jobs[3].state == CANCELLED
+    assert not manager.cancel(jobs[0].id)
+    jobs.append(manager.submit({'n': 5}))
+
+    gates[0].set()
+    jobs[0].future.result(timeout=5)
+    # Job 0 finished before job 1, but the cancelled job 3 and job 1 were looked at since
+    manager.get(jobs[3].id)
+    manager.get(jobs[1].id)
+    gates[1].set()
+    jobs[1].future.result(timeout=5)
+    assert manager.get(jobs[0].id) is None
+    assert manager.get(jobs[3].id) is jobs[3] and manager.get(jobs[1].id) is jobs[1]
+
+    for gate in gates.values():
+        gate.set()
+    for job in jobs:
+        if job.state != CANCELLED:
+            job.future.result(timeout=5)
+    assert len([job for job in manager.list() if job['state'] != RUNNING]) == 2
+    print("  ✅ 429 on a full queue, queued job cancelled, finished jobs evicted LRU")
+    return True
+
+
+def test_batched_name_resolution():
+    """Test that 500 PTR lookups finish in about one round trip"""
+    print("\n✓ Testing batched name resolution...")
+    server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    server.bind(('127.0.0.1', 0))
+    threading.Thread(target=_fake_nameserver, args=(server, 0.2), daemon=True).start()
+
+    resolver = NameResolver(nameservers=['127.0.0.1'], dns_port=server.getsockname()[1],
+                            timeout=1.0, protocols=('dns',))
+    ips = [f'10.3.{i // 250}.{i % 250}' for i in range(500)]
+    began = time.perf_counter()
+    names = resolver.resolve(ips)
+    elapsed = time.perf_counter() - began
+    server.close()
+
+    assert names['10.3.1.4'] == 'host-1-4.lan', names['10.3.1.4']
+    assert names['10.3.0.7'] is None
+    assert sum(1 for name in names.values() if name) == 250
+    assert elapsed < 1.0, elapsed
+    print(f"  ✅ 500 hosts resolved in {elapsed:.2f}s with 0.2s server latency")
+
+    began = time.perf_counter()
+    assert resolver.resolve(ips) == names
+    print(f"  ✅ Cached repeat in {(time.perf_counter() - began) * 1000:.1f} ms")
+    return True
+
+
+class _FakeIcmpTransport:
+    """Echoes requests sent to live hosts, ignoring the first few to some"""
+    raw = True
+
+    def __init__(self, alive, drop):
+        self.alive = alive
+        self.drop = dict(drop)
+        self.sent = []
+        self._replies = []
+
+    def send(self, ip, message):
+        self.sent.append(ip)
+        if ip in self.alive and self.drop.get(ip, 0) > 0:
+            self.drop[ip] -= 1
+        elif ip in self.alive:
+            self._replies.append((ip, b'\x00' + message[1:]))
+
+    def recv(self, timeout):
+        replies, self._replies = self._replies, []
+        if not replies:
+            time.sleep(timeout)
+        return replies
+
+    def close(self):
+        pass
+
+
+def test_routed_discovery():
+    """Test ICMP sweep retransmits and the TCP ping's refused-means-up rule"""
+    print("\n✓ Testing routed host discovery...")
+    transport = _FakeIcmpTransport({'10.4.0.3', '10.4.0.9'}, {'10.4.0.9': 1})
+    sweeper = IcmpSweeper(transport, rate=10000, retries=1, quiet_period=0.05)
+    alive = sweeper.sweep(subnet_targets('10.4.0.0/28'))
+    assert alive == ['10.4.0.3', '10.4.0.9'], alive
+    assert transport.sent.count('10.4.0.3') == 1 and transport.sent.count('10.4.0.9') == 2
+    assert parse_echo_reply(b'\x03\x01' + bytes(6)) is None
+    print(f"  ✅ ICMP sweep found {alive}, retransmitting only to silent hosts")
+
+    # Nothing listens on port 1, so the connection is refused: the host is up
+    pinger = TcpPinger(ports=[1, 2, 3], rate=0)
+    assert pinger.ping(['127.0.0.1']) == ['127.0.0.1']
+    # The first refusal settles it; the other ports are not tried
+    assert pinger.sent == 1, pinger.sent
+    print("  ✅ Refused TCP connection counts as a live host, one attempt per live host")
+    return True
+
+
+def _der(tag, *parts):
+    content = b''.join(parts)
+    return bytes([tag, len(content)]) + content
+
+
+class _QuietHandler(http.server.BaseHTTPRequestHandler):
+    server_version = 'TestServer/1.0'
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_service_detection():
+    """Test banner, HTTP Server header and certificate CN detection"""
+    print("\n✓ Testing service detection...")
+    greeter = socket.socket()
+    greeter.bind(('127.0.0.1', 0))
+    greeter.listen()
+
+    def greet():
+        while True:
+            try:
+                conn, _ = greeter.accept()
+            except OSError:
+                return
+            conn.sendall(b'SSH-2.0-OpenSSH_9.6\r\n')
+            conn.close()
+
+    threading.Thread(target=greet, daemon=True).start()
+    web = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _QuietHandler)
+    threading.Thread(target=web.serve_forever, daemon=True).start()
+
+    ssh_port = greeter.getsockname()[1]
+    http_port = web.server_address[1]
+    detector = ServiceDetector(timeout=2)
+    prober = AsyncPortProber(service_detector=detector)
+    began = time.perf_counter()
+    results = prober.probe([('127.0.0.1', ssh_port), ('127.0.0.1', http_port)])
+    elapsed = time.perf_counter() - began
+
+    assert all(results.values()), results
+    first = dict(prober.services)
+    assert first[('127.0.0.1', ssh_port)] == 'SSH-2.0-OpenSSH_9.6'
+    assert first[('127.0.0.1', http_port)].startswith('HTTP: TestServer/1.0')
+    print(f"  ✅ SSH banner and HTTP Server header read in {elapsed:.2f}s")
+
+    # The next round reuses the identified services instead of reading banners again
+    reads = []
+
+    async def identify(sock, ip, port):
+        reads.append(port)
+        return None
+
+    detector._identify = identify
+    prober.probe([('127.0.0.1', ssh_port), ('127.0.0.1', http_port)])
+    assert reads == [] and prober.services == first, (reads, prober.services)
+    detector._cache = {key: (0, service) for key, (_, service) in detector._cache.items()}
+    prober.probe([('127.0.0.1', http_port)])
+    assert reads == [http_port] and prober.services[('127.0.0.1', http_port)] is None
+    greeter.close()
+    web.shutdown()
+    print("  ✅ Services cached per (ip, port) until their TTL runs out")
+
+    # Certificate with a version, serial, algorithm, issuer, validity and subject O=Acme, CN=nas.lan
+    subject = _der(0x30,
+                   _der(0x31, _der(0x30, _der(0x06, b'\x55\x04\x0a'), _der(0x0c, b'Acme'))),
+                   _der(0x31, _der(0x30, _der(0x06, b'\x55\x04\x03'), _der(0x0c, b'nas.lan'))))
+    tbs = _der(0x30, _der(0xA0, _der(0x02, b'\x02')), _der(0x02, b'\x01'),
+               _der(0x30), _der(0x30), _der(0x30), subject)
+    assert certificate_common_name(_der(0x30, tbs)) == 'nas.lan'
+    assert certificate_common_name(b'\x30\x03garbage') is None
+    print("  ✅ Certificate CN parsed from DER")
+    return True
+
+
+def test_rate_controller():
+    """Test AIMD window growth, back-off and RTT-based timeouts"""
+    print("\n✓ Testing adaptive rate control...")
+    control = RateController(window=4, max_window=64, timeout=1.0, min_timeout=0.05)
+    for _ in range(20):
+        control.on_response(0.01)
+    assert control.window == 24, control.window
+    assert 0.05 <= control.timeout < 0.1, control.timeout
+    assert abs(control.interval - 0.01 / 24) < 1e-9
+
+    # A burst of losses within one round trip halves the window once
+    control.on_loss()
+    control.on_loss()
+    assert control.window == 12, control.window
+    # Past the slow-start threshold the window grows by one per round trip
+    for _ in range(12):
+        control.on_response(0.01)
+    assert 12.9 < control.window < 13.1, control.window
+    print(f"  ✅ Window 4 -> 24 -> 12 -> {control.window:.1f}, timeout {control.timeout * 1000:.0f} ms")
+
+    # ARP replies that only arrive on a retry are reported as loss
+    transport = ReplayTransport(_recorded_replies(), drop={'192.168.50.3': 1})
+    arp_control = RateController(max_rate=10000)
+    sweeper = ArpSweeper(transport, SRC_MAC, SRC_IP, rate=10000, retries=1,
+                         quiet_period=0.05, rate_controller=arp_control)
+    assert len(sweeper.sweep(subnet_targets('192.168.50.0/29'))) == 3
+    assert arp_control.responses == 3 and arp_control.losses == 1, arp_control.stats()
+    print(f"  ✅ ARP sweep fed the controller: {arp_control.stats()}")
+    return True
+
+
+def _closed_port():
+    """A localhost port with nothing listening on it"""
+    probe = socket.socket()
+    probe.bind(('127.0.0.1', 0))
+    port = probe.getsockname()[1]
+    probe.close()
+    return port
+
+
+def test_port_prober_limits():
+    """Test the prober's in-flight limits and AIMD back-off against localhost"""
+    print("\n✓ Testing port prober limits...")
+    prober = AsyncPortProber(timeout=1, max_concurrency=8, per_host_limit=3)
+    connect = prober._connect
+    in_flight = {}
+    peaks = {'all': 0}
+
+    async def tracked(ip, port):
+        in_flight[ip] = in_flight.get(ip, 0) + 1
+        peaks[ip] = max(peaks.get(ip, 0), in_flight[ip])
+        peaks['all'] = max(peaks['all'], sum(in_flight.values()))
+        try:
+            # Hold the slot so the limits, not the speed of loopback, decide the overlap
+            await asyncio.sleep(0.01)
+            return await connect(ip, port)
+        finally:
+            in_flight[ip] -= 1
+
+    prober._connect = tracked
+    ports = [_closed_port() for _ in range(10)]
+    ips = ['127.0.0.1', '127.0.0.2', '127.0.0.3', '127.0.0.4']
+    results = prober.probe_hosts(ips, ports)
+    assert not any(open_ for host in results.values() for open_ in host.values())
+    assert prober.stats['refused'] == 40, prober.stats
+    assert peaks['all'] == 8 and all(peaks[ip] <= 3 for ip in ips), peaks
+    print(f"  ✅ At most {peaks['all']} connections in flight, {max(peaks[ip] for ip in ips)} per host")
+
+    # Listeners whose accept queue is full drop SYNs, so connecting times out
+    held = []
+    full_ports = []
+    for _ in range(4):
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(0)
+        held.append(listener)
+        for _ in range(2):
+            client = socket.socket()
+            client.settimeout(0.05)
+            with contextlib.suppress(OSError):
+                client.connect(listener.getsockname())
+            held.append(client)
+        full_ports.append(listener.getsockname()[1])
+    try:
+        control = RateController(window=16, max_window=64, timeout=0.3, min_timeout=0.05)
+        prober = AsyncPortProber(rate_controller=control)
+        # The refused port marks the host as responsive, so its silence counts as loss
+        prober.probe([('127.0.0.1', _closed_port())] + [('127.0.0.1', port) for port in full_ports])
+    finally:
+        for sock in held:
+            sock.close()
+    assert prober.stats['refused'] == 1 and prober.stats['timeout'] == 4, prober.stats
+    # Slow start grew the window to 17; the burst of timeouts halved it once
+    assert control.losses == 4 and control.window == 8.5, control.stats()
+    print(f"  ✅ Timeouts from a responsive host: window 16 -> 17 -> {control.window:g}")
+    return True
+
+
+def test_host_table():
+    """Test the columnar host table against legacy host dicts"""
+    print("\n✓ Testing columnar host table...")
+    legacy = [
+        {'IP Address': '10.0.0.20', 'MAC Address': 'aa:bb:cc:00:00:02', 'Vendor': 'Acme',
+         'Hostname': 'printer', **port_columns({22: False, 80: True, 443: True})},
+        {'IP Address': '10.0.0.3', 'MAC Address': 'N/A', 'Vendor': 'Unknown',
+         'Hostname': 'Unknown', **port_columns({22: True, 80: False, 443: False})},
+    ]
+    table = HostTable([22, 80, 443])
+    table.extend(legacy)
+    table.sort()
+    assert [dict(row) for row in table] == [legacy[1], legacy[0]]
+    assert list(table[0]) == table.fieldnames and table.open_ports(1) == [80, 443]
+    print("  ✅ Rows render as the legacy dicts, sorted by IP")
+
+    # A short MAC would shift every later row; a bad IP would sort as garbage
+    for ip, mac in (('10.0.0.4', 'aa:bb'), ('10.0.0.4', 'zz:bb:cc:dd:ee:ff'), ('999.1.1.1', 'N/A'), ('10.1', 'N/A')):
+        try:
+            table.add(ip, mac, 'Acme', 'Unknown', {22: True})
+            assert False, f"{ip} {mac} accepted"
+        except ValueError:
+            pass
+    assert len(table) == 2 and [dict(row) for row in table] == [legacy[1], legacy[0]]
+    print("  ✅ Malformed IPs and MACs are rejected without touching the table")
+
+    # Large scans use the 'Open Ports' column; compare memory with dicts
+    ports = parse_ports('extended')
+    hosts = [
+        {'IP Address': f'10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}',
+         'MAC Address': f'02:00:00:{i >> 16 & 255:02x}:{i >> 8 & 255:02x}:{i & 255:02x}',
+         'Vendor': 'Acme', 'Hostname': f'host{i}' if i % 8 == 0 else 'Unknown',
+         **port_columns({port: port in (22, 443) for port in ports})}
+        for i in range(4096)
+    ]
+    tracemalloc.start()
+    table = HostTable(ports)
+    table.extend(hosts)
+    table_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert table[4095]['Open Ports'] == '22,443' and table.to_dicts() == hosts
+    assert table_bytes * 2 < sum(sys.getsizeof(h) + sum(map(sys.getsizeof, h.values())) for h in hosts)
+    print(f"  ✅ {len(table)} hosts x {len(ports)} ports in {table_bytes // 1024} KB")
+    return True
+
+
+def test_streaming_export():
+    """Test chunked, gzip-compressed exports in constant memory"""
+    print("\n✓ Testing streaming exporters...")
+    fields = ['IP Address', 'MAC Address', 'Vendor', 'Hostname', 'SSH (22)']
+
+    def hosts(count):
+        for i in range(count):
+            yield {'IP Address': f'10.0.{i >> 8 & 255}.{i & 255}', 'MAC Address': 'aa:bb:cc:dd:ee:ff',
+                   'Vendor': 'Acme', 'Hostname': f'host{i}', 'SSH (22)': 'Open'}
+
+    chunks = list(stream_export(hosts(2000), fields, 'jsonl', compress=True, chunk_size=4096))
+    lines = gzip.decompress(b''.join(chunks)).decode().splitlines()
+    assert len(chunks) > 1 and len(lines) == 2000
+    assert json.loads(lines[-1])['Hostname'] == 'host1999'
+    print(f"  ✅ 2000 hosts streamed as {len(chunks)} gzip chunks")
+
+    # Memory stays flat however many hosts are streamed
+    tracemalloc.start()
+    for _ in stream_export(hosts(50000), fields, 'csv', chunk_size=16384):
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert peak < 1024 * 1024, peak
+    print(f"  ✅ 50000 CSV rows streamed with a {peak // 1024} KB peak")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'scan.csv.gz')
+        assert detect_format(path) == ('csv', True)
+        exporter = open_exporter(path, fields)
+        for host in hosts(3):
+            exporter.write(host)
+        exporter.close()
+        with gzip.open(path, 'rt') as f:
+            assert f.read().splitlines()[0] == ','.join(fields)
+    print("  ✅ Format detected from the file name")
+    return True
+
+
+def test_benchmark_harness():
+    """Test a full scan of the simulated network and regression checks"""
+    print("\n✓ Testing benchmark harness...")
+    result = run_benchmark(hosts=60, subnet='10.250.0.0/24', latency=0.001, jitter=0.0005,
+                           open_ports={22: 0.5, 80: 1.0}, trace_memory=False)
+    assert result['found'] == 60 and result['probes'] == 120, result
+    assert 0 < result['host_latency_p50_ms'] <= result['host_latency_p99_ms']
+    assert result['hosts_per_s'] > 0 and result['probes_per_s'] > 0
+    print(f"  ✅ {result['found']} hosts at {result['hosts_per_s']} hosts/s, "
+          f"p99 {result['host_latency_p99_ms']} ms")
+
+    assert compare(result, result) == []
+    slower = dict(result, hosts_per_s=result['hosts_per_s'] * 2, found=61)
+    regressions = compare(result, slower)
+    assert len(regressions) == 2 and regressions[0].startswith('hosts_per_s'), regressions
+    print(f"  ✅ Regressions reported: {regressions}")
+    return True
+
+
+def test_overlapping_targets():
+    """Test that overlapping subnets and interfaces yield each host once"""
+    print("\n✓ Testing overlapping scan targets...")
+    network = SimulatedNetwork('10.80.0.0/23', hosts=40, latency=0.0005, jitter=0.0,
+                               open_ports={22: 1.0})
+    scanner = SimulatedScanner(network, ports=[22], max_probes=32)
+    # Two interfaces whose networks overlap: eth1's /24 is half of eth0's /23
+    scanner.get_interface_networks = lambda: [
+        {'interface': 'eth0', 'ip': network.local_ip, 'subnet': '10.80.0.0/23'},
+        {'interface': 'eth1', 'ip': '10.80.1.1', 'subnet': '10.80.1.0/24'},
+    ]
+    swept = []
+    sweep_arp = scanner.sweep_arp
+
+    def recording_sweep(subnets, interface=None):
+        devices = sweep_arp(subnets, interface)
+        swept.extend(device['ip'] for device in devices)
+        return devices
+
+    scanner.sweep_arp = recording_sweep
+    hosts = scanner.scan_network(subnets=['10.80.0.0/23', '10.80.1.0/25', '10.80.1.0/24'],
+                                 interfaces=['eth0', 'eth1'])
+    ips = [host['IP Address'] for host in hosts]
+    # The upper /24 was swept from both interfaces, yet every host appears once
+    assert len(swept) > len(network.hosts), len(swept)
+    assert len(ips) == len(set(ips)) == len(network.hosts), (len(ips), len(set(ips)))
+    assert set(ips) == set(network.hosts)
+    print(f"  ✅ {len(swept)} ARP replies over 2 interfaces -> {len(ips)} unique hosts")
+    return True
+
+
+def test_vendor_lookup():
+    """Test that only definite vendor API answers are cached"""
+    print("\n✓ Testing online vendor lookups...")
+    import network_scanner
+    import requests
+
+    class Reply:
+        def __init__(self, status_code, text=''):
+            self.status_code = status_code
+            self.text = text
+
+    answers = []
+
+    def fake_get(url, timeout):
+        answer = answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    cache = LookupCache(':memory:')
+    scanner = network_scanner.NetworkScanner(oui_db_path=os.devnull, cache=cache)
+    scanner.vendor_api_control = RateController(window=1, max_window=2, timeout=2, min_timeout=1)
+    real_get = network_scanner.requests.get
+    network_scanner.requests.get = fake_get
+    try:
+        answers[:] = [requests.Timeout(), requests.ConnectionError(), Reply(503), Reply(200, 'Acme')]
+        for _ in range(3):
+            assert scanner.get_mac_vendor('02:00:00:00:00:01') == 'Unknown'
+            assert cache.get('vendor', '02:00:00:00:00:01') == (False, None)
+        assert scanner.vendor_api_control.losses == 1
+        assert scanner.get_mac_vendor('02:00:00:00:00:01') == 'Acme'
+        answers[:] = [Reply(404)]
+        assert scanner.get_mac_vendor('02:00:00:00:00:02') == 'Unknown'
+        assert cache.get('vendor', '02:00:00:00:00:02') == (True, None)
+        # Both answers now come from the cache
+        assert scanner.get_mac_vendor('02:00:00:00:00:01') == 'Acme' and answers == []
+    finally:
+        network_scanner.requests.get = real_get
+        cache.close()
+    print("  ✅ Timeouts, errors and 5xx retried; vendors and 404s cached")
+
+    # A scan that finds nothing still returns a (empty) host table
+    network = SimulatedNetwork('10.92.0.0/28', hosts=2, latency=0.0005, jitter=0.0)
+    hosts = SimulatedScanner(network).scan_network(subnets=['10.93.0.0/30'], discovery=['arp'])
+    assert isinstance(hosts, HostTable) and len(hosts) == 0 and hosts.to_dicts() == []
+    print("  ✅ Empty scan returns an empty HostTable")
+    return True
+
+
+def test_cli_history_and_diff():
+    """Test that the CLI records the scanned subnets and always reports --diff counts"""
+    print("\n✓ Testing CLI history and diff output...")
+    import cli
+    from benchmark import SIMULATED_INTERFACE
+    full = SimulatedNetwork('10.94.0.0/28', hosts=5, latency=0.0005, jitter=0.0, open_ports={22: 1.0})
+    empty = SimulatedNetwork('10.94.0.0/28', hosts=0, latency=0.0005, jitter=0.0)
+    history = HistoryStore(':memory:')
+
+    def two_interfaces(network, **options):
+        # The default route is on sim0; the simulated hosts sit behind sim1
+        scanner = SimulatedScanner(network, **options)
+
+        def detect():
+            scanner.interface, scanner.local_ip, scanner.subnet = SIMULATED_INTERFACE, '10.95.0.1', '10.95.0.0/24'
+            return scanner.local_ip, scanner.subnet
+
+        scanner.get_local_network_info = detect
+        scanner.get_interface_networks = lambda: [
+            {'interface': SIMULATED_INTERFACE, 'ip': '10.95.0.1', 'subnet': '10.95.0.0/24'},
+            {'interface': 'sim1', 'ip': network.local_ip, 'subnet': network.subnet},
+        ]
+        return scanner
+
+    patched = {
+        'HistoryStore': lambda: history,
+        'ChangeDetector': lambda reprobe_ttl: ChangeDetector(state_path, reprobe_ttl=reprobe_ttl, removed_after=1),
+    }
+    originals = {name: getattr(cli, name) for name in ('NetworkScanner', 'HistoryStore', 'ChangeDetector')}
+    outputs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        state_path = os.path.join(tmp, 'state.db')
+        try:
+            for name, value in patched.items():
+                setattr(cli, name, value)
+            for network in (full, empty):
+                cli.NetworkScanner = lambda network=network, **options: two_interfaces(network, **options)
+                sys.argv = ['cli.py', '--interface', 'sim1', '--diff', '--no-cache', '--offline']
+                output = io.StringIO()
+                with contextlib.redirect_stdout(output):
+                    cli.main()
+                outputs.append(output.getvalue())
+        finally:
+            for name, value in originals.items():
+                setattr(cli, name, value)
+    assert '[+] Changes: 5 added, 0 removed, 0 changed' in outputs[0], outputs[0]
+    # Nothing answered the second time, yet the removals are still reported
+    assert '[-] No devices found' in outputs[1]
+    assert '[+] Changes: 0 added, 5 removed, 0 changed' in outputs[1], outputs[1]
+    # --interface scans record the interface's subnet, not the detected one
+    assert [scan['subnets'] for scan in history.scans()] == [full.subnet] * 2, history.scans()
+    print("  ✅ Interface subnets recorded; change counts printed for an empty scan")
+    return True
+
+
+def test_scan_metrics():
+    """Test per-stage timers, counters and the Prometheus rendering"""
+    print("\n✓ Testing scan metrics...")
+    registry = MetricsRegistry()
+    network = SimulatedNetwork('10.251.0.0/26', hosts=20, latency=0.001, open_ports={22: 1.0, 80: 0.0})
+    scanner = SimulatedScanner(network, ports=[22, 80], metrics=registry)
+    with contextlib.redirect_stdout(io.StringIO()):
+        scanner.scan_network()
+
+    summary = registry.summary()
+    stages = summary['stages']
+    for stage in ('scan', 'discovery', 'arp', 'port_probe', 'dns', 'gather_host'):
+        assert stage in stages, stages
+    assert stages['gather_host']['count'] == 20 and stages['scan']['sum'] >= stages['arp']['sum']
+    counters = summary['counters']
+    assert counters['netmap_probes_sent_total'] == 40
+    assert counters['netmap_probes_total{outcome="open"}'] == 20
+    assert counters['netmap_hosts_discovered_total{method="arp"}'] == 20
+    print(f"  ✅ Stages timed: {sorted(stages)}")
+
+    text = registry.render()
+    assert '# TYPE netmap_stage_duration_seconds histogram' in text
+    assert 'netmap_stage_duration_seconds_count{stage="gather_host"} 20' in text
+    assert 'netmap_stage_duration_seconds_bucket{stage="scan",le="+Inf"} 1' in text
+    registry.reset()
+    assert registry.summary()['stages'] == {}
+    print("  ✅ Prometheus text rendered")
+    return True
+
+
+def _parse_sse(text):
+    """Split an SSE body into (event, data) pairs, keeping comments as (None, text)"""
+    events = []
+    for block in text.split('\n\n'):
+        if not block:
+            continue
+        if block.startswith(':'):
+            events.append((None, block))
+            continue
+        fields = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+def test_event_stream():
+    """Test SSE framing, replay and the job-completion event over the web endpoint"""
+    print("\n✓ Testing scan event stream...")
+    stream = EventStream(heartbeat=0.05)
+    received = []
+    subscriber = threading.Thread(target=lambda: received.extend(stream.subscribe()))
+    subscriber.start()
+    time.sleep(0.12)
+    stream.publish('start', {'total': 1})
+    stream.publish('progress', {'percent': 10})
+    stream.publish('progress', {'percent': 50})
+    stream.publish('host', {'IP Address': '10.0.0.5'})
+    stream.publish('complete', {'total_hosts': 1})
+    subscriber.join(2)
+    assert not subscriber.is_alive()
+    assert received[0] == ': keep-alive\n\n', received[0]
+    assert 'event: host\ndata: {"IP Address": "10.0.0.5"}\n\n' in received
+    live = [event for event, _ in _parse_sse(''.join(received)) if event]
+    assert live == ['start', 'progress', 'progress', 'host', 'complete'], live
+    # A late subscriber gets the history and only the latest progress, then the stream ends
+    replay = _parse_sse(''.join(stream.subscribe()))
+    assert [event for event, _ in replay] == ['start', 'host', 'complete', 'progress'], replay
+    assert replay[-1][1] == {'percent': 50}
+    print("  ✅ Framing, keep-alives and replay for late subscribers")
+
+    import web_app
+    network = SimulatedNetwork('10.90.0.0/26', hosts=12, latency=0.0005, jitter=0.0, open_ports={22: 0.5})
+    web_app.history = HistoryStore(':memory:')
+    scanner_class = web_app.NetworkScanner
+    web_app.NetworkScanner = lambda **options: SimulatedScanner(network, **options)
+    try:
+        client = web_app.app.test_client()
+        job_id = client.post('/api/jobs', json={
+            'subnets': network.subnet, 'ports': '22', 'discovery': 'arp'
+        }).get_json()['job_id']
+        response = client.get(f'/api/jobs/{job_id}/stream')
+        assert response.mimetype == 'text/event-stream'
+        # The body ends with the terminal event, so reading it waits for the scan
+        events = [(event, data) for event, data in _parse_sse(response.get_data(as_text=True)) if event]
+    finally:
+        web_app.NetworkScanner = scanner_class
+    names = [event for event, _ in events]
+    assert names[-1] == 'complete' and 'start' in names, names
+    hosts = [data['IP Address'] for event, data in events if event == 'host']
+    assert sorted(hosts) == sorted(network.hosts), hosts
+    assert events[-1][1]['total_hosts'] == len(network.hosts), events[-1]
+    print(f"  ✅ /api/jobs/<id>/stream: {len(hosts)} host events, then 'complete'")
+    return True
+
+
+def test_distributed_scan():
+    """Test segment leasing, lease expiry and a scan split across agent processes"""
+    print("\n✓ Testing distributed scan...")
+    segments = partition_subnets(['10.61.0.0/23'])
+    assert segments == {'10.61.0.0/24': ['10.61.0.0/24', '10.61.0.255/32'],
+                        '10.61.1.0/24': ['10.61.1.0/24', '10.61.1.0/32']}, segments
+
+    coordinator = Coordinator(lease_timeout=0.2)
+    local = coordinator.register('a', ['10.70.0.0/24'])
+    other = coordinator.register('b', ['10.71.0.0/24'])
+    found = []
+    coordinator.submit('job', ['10.70.0.0/24'], {'discovery': ['arp']}, on_host=found.append)
+    assert coordinator.lease(other) is None
+    task = coordinator.lease(local)
+    assert task['subnet'] == '10.70.0.0/24'
+    # The first agent goes silent; the lease expires and the task is retried
+    time.sleep(0.3)
+    coordinator.register('a', ['10.70.0.0/24'], agent_id=local)
+    task = coordinator.lease(local)
+    assert task['attempts'] == 2
+    try:
+        coordinator.report(local, task['task_id'], [json.dumps({'v': PROTOCOL_VERSION})])
+        raise AssertionError('header without columns accepted')
+    except ValueError:
+        pass
+    columns = ['IP Address', 'MAC Address']
+    bad_streams = [
+        encode_results(['ip'], iter([{'ip': '10.70.0.5'}])),
+        encode_results(columns, iter([{'IP Address': '999.1.1.1', 'MAC Address': 'N/A'}])),
+        encode_results(columns, iter([{'IP Address': '10.70.0.5', 'MAC Address': 'aa:bb'}])),
+        [json.dumps({'v': PROTOCOL_VERSION, 'columns': columns}), json.dumps(['10.70.0.5'])],
+    ]
+    for lines in bad_streams:
+        try:
+            coordinator.report(local, task['task_id'], lines)
+            raise AssertionError('malformed host row accepted')
+        except ValueError:
+            pass
+    assert found == []
+    host = {'IP Address': '10.70.0.5', 'MAC Address': '02:00:00:00:00:05'}
+    # A heartbeat (None) between hosts only renews the lease
+    lines = encode_results(columns, iter([None, host]))
+    assert coordinator.report(local, task['task_id'], lines)['state'] == 'done'
+    assert found == [host]
+    assert coordinator.wait('job', poll=0.05)['done'] == 1
+    print("  ✅ Expired lease retried, hosts decoded")
+
+    import web_app
+    from werkzeug.serving import make_server
+    web_app.history = HistoryStore(':memory:')
+    server = make_server('127.0.0.1', 0, web_app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}'
+    here = os.path.dirname(os.path.abspath(__file__))
+    agents = [
+        subprocess.Popen(
+            [sys.executable, 'agent.py', '--coordinator', url, '--simulate', subnet,
+             '--simulate-hosts', str(hosts), '--poll-interval', '0.2'],
+            cwd=here, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        for subnet, hosts in (('10.61.0.0/23', 30), ('10.62.0.0/24', 20))
+    ]
+    client = web_app.app.test_client()
+    try:
+        deadline = time.time() + 30
+        while len(client.get('/api/agents').get_json()['agents']) < 2 and time.time() < deadline:
+            time.sleep(0.2)
+        response = client.post('/api/jobs', json={
+            'subnets': '10.61.0.0/23, 10.62.0.0/24', 'ports': '22,80', 'distributed': True
+        })
+        job_id = response.get_json()['job_id']
+        while time.time() < deadline + 60:
+            response = client.get(f'/api/jobs/{job_id}/results')
+            if response.status_code == 200:
+                break
+            time.sleep(0.2)
+        results = response.get_json()['results']
+        assert len(results) == 50, len(results)
+        agents_status = client.get('/api/agents').get_json()['agents']
+        assert sorted(agent['tasks_done'] for agent in agents_status) == [1, 2], agents_status
+        print(f"  ✅ {len(results)} hosts from {len(agents_status)} agents over 3 segments")
+    finally:
+        for agent in agents:
+            agent.terminate()
+            agent.wait()
+        server.shutdown()
+    return True
+
+
+def main():
+    print("="*60)
+    print("NETMAP - SYSTEM TEST")
+    print("="*60)
+
+    tests = [
+        test_pcap_round_trip,
+        test_arp_sweep_replay,
+        test_oui_database,
+        test_change_detection,
+        test_monitor_daemon,
+        test_history_store,
+        test_lookup_cache,
+        test_job_manager,
+        test_batched_name_resolution,
+        test_routed_discovery,
+        test_service_detection,
+        test_rate_controller,
+        test_port_prober_limits,
+        test_host_table,
+        test_streaming_export,
+        test_benchmark_harness,
+        test_overlapping_targets,
+        test_vendor_lookup,
+        test_cli_history_and_diff,
+        test_scan_metrics,
+        test_event_stream,
+        test_distributed_scan,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+            else:
+                failed += 1
+        except Exception as e:
+            print(f"  ❌ Test crashed: {e}")
+            failed += 1
+
+    print("\n" + "="*60)
+    print(f"TEST RESULTS: {passed} passed, {failed} failed")
+    print("="*60)
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
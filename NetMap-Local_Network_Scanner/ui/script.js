@@ -1,4 +1,6 @@
 ﻿let scanInterval = null;
+let currentJobId = null;
+let monitorSource = null;
 
 function showAlert(message, type = 'success') {
     const alert = document.getElementById('alert');
@@ -34,13 +36,31 @@ async function startScan() {
         scanBtn.disabled = true;
         scanBtn.textContent = 'Scanning...';
 
-        const response = await fetch('/api/start-scan', { method: 'POST' });
+        const ports = document.getElementById('portSpec').value.trim();
+        const subnets = document.getElementById('subnetSpec').value.trim();
+        const response = await fetch('/api/start-scan', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                ports: ports || null,
+                subnets: subnets || null,
+                discovery: document.getElementById('discoverySpec').value,
+                services: Boolean(document.getElementById('serviceSpec').value)
+            })
+        });
         const data = await response.json();
 
         if (data.success) {
+            currentJobId = data.job_id;
             document.getElementById('progressContainer').classList.add('visible');
             
-            scanInterval = setInterval(checkScanStatus, 1000);
+            if (window.EventSource) {
+                streamScan();
+            } else {
+                scanInterval = setInterval(checkScanStatus, 1000);
+            }
         } else {
             showAlert('Error: ' + data.error, 'error');
             scanBtn.disabled = false;
@@ -48,19 +68,179 @@ async function startScan() {
         }
     } catch (error) {
         showAlert('Error starting scan: ' + error.message, 'error');
-        document.getElementById('scanBtn').disabled = false;
-        document.getElementById('scanBtn').textContent = '🚀 Start Scan';
+        resetScanButton();
+    }
+}
+
+function resetScanButton() {
+    document.getElementById('scanBtn').disabled = false;
+    document.getElementById('scanBtn').textContent = '🚀 Start Scan';
+}
+
+function setProgress(progress, message) {
+    document.getElementById('progressFill').style.width = progress + '%';
+    document.getElementById('progressMessage').textContent = message + ' (' + progress + '%)';
+}
+
+function streamScan() {
+    const source = new EventSource(`/api/jobs/${currentJobId}/stream`);
+    const tbody = document.getElementById('resultsBody');
+    let columns = null;
+    let hostCount = 0;
+
+    source.addEventListener('progress', event => {
+        const data = JSON.parse(event.data);
+        setProgress(data.progress, data.message);
+    });
+
+    source.addEventListener('start', event => {
+        const data = JSON.parse(event.data);
+        columns = data.columns;
+        document.getElementById('localIp').textContent = data.local_ip;
+        document.getElementById('subnet').textContent = data.subnet;
+        document.getElementById('networkInfo').classList.add('visible');
+        renderHeader(columns);
+        tbody.innerHTML = '';
+        document.getElementById('resultsContainer').classList.add('visible');
+    });
+
+    source.addEventListener('host', event => {
+        tbody.appendChild(renderHostRow(JSON.parse(event.data), columns));
+        hostCount += 1;
+    });
+
+    source.addEventListener('complete', event => {
+        const data = JSON.parse(event.data);
+        source.close();
+        resetScanButton();
+        if (data.statistics) {
+            renderStatistics(data.statistics);
+        }
+        if (hostCount > 0) {
+            showAlert(`Scan completed successfully! Found ${hostCount} device(s).`, 'success');
+        } else {
+            showAlert(data.message, 'warning');
+        }
+    });
+
+    source.addEventListener('failed', event => {
+        source.close();
+        resetScanButton();
+        showAlert(JSON.parse(event.data).message, 'error');
+    });
+
+    // Connection lost: fall back to polling instead of replaying the stream
+    source.onerror = () => {
+        if (source.readyState !== EventSource.CLOSED) {
+            source.close();
+            scanInterval = setInterval(checkScanStatus, 1000);
+        }
+    };
+}
+
+async function toggleMonitor() {
+    if (monitorSource) {
+        await fetch('/api/monitor', { method: 'DELETE' });
+        return;
+    }
+
+    try {
+        const ports = document.getElementById('portSpec').value.trim();
+        const subnets = document.getElementById('subnetSpec').value.trim();
+        const interval = document.getElementById('monitorInterval').value.trim();
+        const response = await fetch('/api/monitor', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                ports: ports || null,
+                subnets: subnets || null,
+                discovery: document.getElementById('discoverySpec').value,
+                services: Boolean(document.getElementById('serviceSpec').value),
+                interval: interval ? parseInt(interval, 10) : null
+            })
+        });
+        const data = await response.json();
+
+        if (data.success) {
+            streamMonitor(data.columns);
+            showAlert(`Monitoring started, full pass every ${data.interval}s`, 'success');
+        } else {
+            showAlert('Error: ' + data.error, 'error');
+        }
+    } catch (error) {
+        showAlert('Error starting monitor: ' + error.message, 'error');
     }
 }
 
+function streamMonitor(columns) {
+    const tbody = document.getElementById('resultsBody');
+    const monitorBtn = document.getElementById('monitorBtn');
+    monitorBtn.textContent = '⏹ Stop Monitoring';
+    monitorSource = new EventSource('/api/monitor/stream');
+
+    renderHeader(columns);
+    tbody.innerHTML = '';
+    document.getElementById('resultsContainer').classList.add('visible');
+    document.getElementById('progressContainer').classList.add('visible');
+
+    // Rows are keyed by IP so a re-probed host replaces its old row
+    const upsertRow = host => {
+        const row = renderHostRow(host, columns);
+        row.dataset.ip = host['IP Address'];
+        const existing = tbody.querySelector(`tr[data-ip="${row.dataset.ip}"]`);
+        if (existing) {
+            existing.replaceWith(row);
+        } else {
+            tbody.appendChild(row);
+        }
+    };
+
+    monitorSource.addEventListener('progress', event => {
+        const data = JSON.parse(event.data);
+        setProgress(data.progress, data.message);
+    });
+
+    monitorSource.addEventListener('host', event => {
+        upsertRow(JSON.parse(event.data));
+    });
+
+    monitorSource.addEventListener('change', event => {
+        const change = JSON.parse(event.data);
+        if (change.event === 'removed') {
+            const row = tbody.querySelector(`tr[data-ip="${change.ip}"]`);
+            if (row) {
+                row.remove();
+            }
+        } else if (change.changes['IP Address']) {
+            const row = tbody.querySelector(`tr[data-ip="${change.changes['IP Address'][0]}"]`);
+            if (row) {
+                row.remove();
+            }
+        }
+        showAlert(`Host ${change.event}: ${change.ip} (${change.mac})`, change.event === 'removed' ? 'warning' : 'success');
+    });
+
+    monitorSource.addEventListener('complete', event => {
+        monitorSource.close();
+        monitorSource = null;
+        monitorBtn.textContent = '📡 Start Monitoring';
+        showAlert(JSON.parse(event.data).message, 'warning');
+    });
+
+    // Hosts seen before this page connected
+    fetch('/api/monitor/hosts')
+        .then(response => response.json())
+        .then(data => data.success && data.results.forEach(upsertRow));
+}
+
 async function checkScanStatus() {
     try {
-        const response = await fetch('/api/scan-status');
+        const response = await fetch(`/api/scan-status?job=${currentJobId}`);
         const data = await response.json();
 
-        const progressFill = document.getElementById('progressFill');
-        progressFill.style.width = data.progress + '%';
-        document.getElementById('progressMessage').textContent = data.message + ' (' + data.progress + '%)';
+        setProgress(data.progress, data.message);
 
         if (data.local_ip) {
             document.getElementById('localIp').textContent = data.local_ip;
@@ -70,8 +250,7 @@ async function checkScanStatus() {
 
         if (!data.scanning && data.progress === 100) {
             clearInterval(scanInterval);
-            document.getElementById('scanBtn').disabled = false;
-            document.getElementById('scanBtn').textContent = '🚀 Start Scan';
+            resetScanButton();
 
             if (data.has_results) {
                 loadResults();
@@ -86,16 +265,15 @@ async function checkScanStatus() {
 
 async function loadResults() {
     try {
-        const response = await fetch('/api/results');
+        const response = await fetch(`/api/results?job=${currentJobId}`);
         const data = await response.json();
 
         if (data.success) {
             // Update statistics
-            document.getElementById('statTotal').textContent = data.statistics.total_hosts;
-            document.getElementById('statSSH').textContent = data.statistics.ssh_open;
-            document.getElementById('statHTTP').textContent = data.statistics.http_open;
-            document.getElementById('statHTTPS').textContent = data.statistics.https_open;
-            document.getElementById('statistics').classList.add('visible');
+            renderStatistics(data.statistics);
+
+            // Build the header from the scanned port set
+            renderHeader(data.columns);
 
             const tbody = document.getElementById('resultsBody');
             tbody.innerHTML = '';
@@ -103,30 +281,14 @@ async function loadResults() {
             // Check if we have results
             if (data.results.length === 0) {
                 const row = document.createElement('tr');
-                row.innerHTML = `<td colspan="7" style="text-align: center; padding: 2rem; color: #888;">
+                row.innerHTML = `<td colspan="${data.columns.length}" style="text-align: center; padding: 2rem; color: #888;">
                     No devices found on the network. Make sure you're running with administrator privileges.
                 </td>`;
                 tbody.appendChild(row);
             } else {
                 // Add rows for each host
                 data.results.forEach(host => {
-                    const row = document.createElement('tr');
-                    row.innerHTML = `
-                        <td>${host['IP Address']}</td>
-                        <td>${host['MAC Address']}</td>
-                        <td>${host['Vendor']}</td>
-                        <td>${host['Hostname']}</td>
-                        <td class="${host['SSH (22)'] === 'Open' ? 'status-open' : 'status-closed'}">
-                            ${host['SSH (22)'] === 'Open' ? '🟢' : '🔴'} ${host['SSH (22)']}
-                        </td>
-                        <td class="${host['HTTP (80)'] === 'Open' ? 'status-open' : 'status-closed'}">
-                            ${host['HTTP (80)'] === 'Open' ? '🟢' : '🔴'} ${host['HTTP (80)']}
-                        </td>
-                        <td class="${host['HTTPS (443)'] === 'Open' ? 'status-open' : 'status-closed'}">
-                            ${host['HTTPS (443)'] === 'Open' ? '🟢' : '🔴'} ${host['HTTPS (443)']}
-                        </td>
-                    `;
-                    tbody.appendChild(row);
+                    tbody.appendChild(renderHostRow(host, data.columns));
                 });
             }
 
@@ -145,16 +307,70 @@ async function loadResults() {
     }
 }
 
+function renderStatistics(statistics) {
+    const container = document.getElementById('statistics');
+    const cards = [`<div class="stat-card">
+            <h3 id="statTotal">${statistics.total_hosts}</h3>
+            <p>Total Hosts</p>
+        </div>`];
+
+    Object.entries(statistics.open_ports).forEach(([port, count]) => {
+        cards.push(`<div class="stat-card">
+            <h3>${count}</h3>
+            <p>${port} Open</p>
+        </div>`);
+    });
+
+    container.innerHTML = cards.join('');
+    container.classList.add('visible');
+}
+
+function renderHeader(columns) {
+    const header = document.getElementById('resultsHeader');
+    header.innerHTML = columns.map(column => `<th>${column}</th>`).join('');
+}
+
+function renderHostRow(host, columns) {
+    const row = document.createElement('tr');
+    row.innerHTML = `
+        <td>${host['IP Address']}</td>
+        <td>${host['MAC Address']}</td>
+        <td>${host['Vendor']}</td>
+        <td>${host['Hostname']}</td>
+        ${columns.slice(4).map(column => renderPortCell(host[column])).join('')}
+    `;
+    return row;
+}
+
+function renderPortCell(status) {
+    if (status === 'Open' || status === 'Closed') {
+        const isOpen = status === 'Open';
+        return `<td class="${isOpen ? 'status-open' : 'status-closed'}">${isOpen ? '🟢' : '🔴'} ${status}</td>`;
+    }
+    return `<td>${status}</td>`;
+}
+
 async function exportResults() {
     try {
         const filename = document.getElementById('exportFilename').value;
+        const [format, compression] = document.getElementById('exportFormat').value.split('.');
+        
+        // CSV and JSON Lines stream straight from the results as a chunked download
+        if (format !== 'parquet') {
+            const params = new URLSearchParams({ format: format, gzip: compression === 'gz' ? '1' : '0' });
+            if (filename) {
+                params.set('filename', filename);
+            }
+            window.location.href = `/api/jobs/${currentJobId}/download?${params}`;
+            return;
+        }
         
         const response = await fetch('/api/export', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
             },
-            body: JSON.stringify({ filename: filename || null })
+            body: JSON.stringify({ filename: filename || null, job_id: currentJobId, format: format })
         });
 
         const data = await response.json();
@@ -3,55 +3,41 @@ NetMap - Utility Functions
 Helper functions for CSV export and data formatting
 """
 
-import csv
-import os
-from datetime import datetime
+from exporters import export_hosts
 
 
-def export_to_csv(hosts, filename=None):
+def export_to_csv(hosts, filename=None, fieldnames=None):
     """
     Export scan results to CSV file
     Args:
-        hosts: List of host dictionaries
+        hosts: List of host dictionaries (or a HostTable)
         filename: Output filename (optional, auto-generated if None)
+        fieldnames: Column order (optional, derived from the hosts if None)
     Returns:
         str: Path to saved CSV file
     """
     if not hosts:
         return None
     
-    # Generate filename if not provided
-    if filename is None:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"netmap_scan_{timestamp}.csv"
-    
-    # Ensure .csv extension
-    if not filename.endswith('.csv'):
-        filename += '.csv'
-    
-    # Create exports directory if it doesn't exist
-    exports_dir = os.path.join(os.path.dirname(__file__), 'exports')
-    os.makedirs(exports_dir, exist_ok=True)
+    if fieldnames is None:
+        fieldnames = getattr(hosts, 'fieldnames', None) or result_columns(hosts)
     
-    filepath = os.path.join(exports_dir, filename)
-    
-    # Write to CSV
-    with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
-        fieldnames = [
-            'IP Address', 
-            'MAC Address', 
-            'Vendor', 
-            'Hostname',
-            'SSH (22)',
-            'HTTP (80)',
-            'HTTPS (443)'
-        ]
-        
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(hosts)
-    
-    return filepath
+    # Rows are written one at a time as they are rendered
+    return export_hosts(hosts, fieldnames, filename, 'csv')
+
+
+def result_columns(hosts):
+    """
+    Collect the column names used by a list of hosts, in first-seen order
+    Args:
+        hosts: List of host dictionaries
+    Returns:
+        list of column names
+    """
+    columns = {}
+    for host in hosts:
+        columns.update(dict.fromkeys(host))
+    return list(columns)
 
 
 def format_port_status(status):
@@ -3,25 +3,225 @@ NetMap - Flask Web Application
 Simple full-stack web interface for network scanning
 """
 
-from flask import Flask, render_template, jsonify, request, send_file
+from flask import Flask, Response, abort, render_template, jsonify, request, send_file
 from network_scanner import NetworkScanner
-from utils import export_to_csv
+from utils import validate_subnet
+from exporters import CONTENT_TYPES, EXPORT_FORMATS, EXPORTS_DIR, export_filename, export_hosts, stream_export
+from lookup_cache import LookupCache
+from job_manager import JobManager, JobQueueFull
+from change_detector import ChangeDetector
+from monitor_daemon import MonitorDaemon
+from history_store import HistoryStore, parse_time
+from discovery import DEFAULT_DISCOVERY, DISCOVERY_METHODS
+from host_table import HostTable
+from metrics import REGISTRY
+from coordinator import Coordinator
+from port_profiles import (
+    BASE_FIELDS, OPEN_PORTS_FIELD, PORT_PROFILES, SERVICES_FIELD, parse_ports, result_fieldnames
+)
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import os
 import threading
 
 app = Flask(__name__, template_folder='ui', static_folder='ui')
 
-# Global variables to store scan state
-scan_status = {
-    'scanning': False,
-    'progress': 0,
-    'message': '',
-    'results': None,
-    'local_ip': None,
-    'subnet': None
-}
+# Shares the on-disk lookup cache with the CLI and across concurrent jobs
+lookup_cache = LookupCache()
 
-scanner = NetworkScanner()
+# Last known host table for incremental (diff) scans
+change_detector = ChangeDetector()
+
+# Every scan and monitor sweep is appended here for history queries
+history = HistoryStore()
+
+# Used for network detection; each scan job gets its own scanner
+scanner = NetworkScanner(cache=lookup_cache)
+
+# Continuous monitoring daemon; keeps its own host table apart from one-off diff scans
+monitor = None
+monitor_lock = threading.Lock()
+MONITOR_STATE_PATH = os.path.join(os.path.dirname(__file__), 'cache', 'netmap_monitor.db')
+
+# Hands the segments of distributed scans to remote agents
+coordinator = Coordinator()
+
+
+def perform_scan(job):
+    """Perform the actual network scan for one job"""
+    if job.options.get('distributed'):
+        return perform_distributed_scan(job)
+    
+    job_scanner = NetworkScanner(
+        ports=job.options['ports'],
+        cache=lookup_cache,
+        detect_services=job.options['services']
+    )
+    job.columns = job_scanner.fieldnames
+    
+    # Update progress
+    job.update_progress(10, 'Detecting network...')
+    
+    job_scanner.get_local_network_info()
+    job.local_ip = job_scanner.local_ip
+    
+    targets = job_scanner.resolve_scan_targets(job.options['subnets'], job.options['interfaces'])
+    job.subnet = ', '.join(subnet for _, subnet in targets)
+    
+    # Discover live hosts (ARP runs one worker per interface)
+    job.update_progress(30, f'Scanning network {job.subnet}...')
+    devices = job_scanner.discover_hosts(targets, job.options['discovery'])
+    
+    incremental = job.options.get('incremental')
+    if not devices and not incremental:
+        history.record_scan([], [subnet for _, subnet in targets], source='web')
+        job.results = []
+        job.statistics = calculate_statistics([], job.columns)
+        job.update_progress(100, 'No devices found')
+        job.events.publish('complete', {'total_hosts': 0, 'message': 'No devices found'})
+        return
+    
+    # In incremental mode only new, changed or stale hosts are probed again
+    reused = []
+    if incremental:
+        devices, reused = change_detector.plan(devices, job.columns)
+    
+    # Probe ports on every discovered device in one concurrent batch
+    job.update_progress(50, f'Probing {len(job_scanner.ports)} ports on {len(devices)} hosts...')
+    port_results = job_scanner.probe_ports(device['ip'] for device in devices)
+    hostnames = job_scanner.resolve_hostnames(device['ip'] for device in devices)
+    
+    # Gather detailed information for discovered devices
+    job.update_progress(60, f'Gathering information for {len(devices)} hosts...')
+    job.events.publish('start', {
+        'job_id': job.id,
+        'columns': job.columns,
+        'total': len(devices) + len(reused),
+        'local_ip': job.local_ip,
+        'subnet': job.subnet
+    })
+    
+    results = HostTable(job_scanner.ports, job.options['services'])
+    results.extend(reused)
+    for host_info in reused:
+        job.events.publish('host', host_info)
+    
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        future_to_device = {
+            executor.submit(
+                job_scanner.gather_host_info, device, port_results[device['ip']], hostnames[device['ip']]
+            ): device
+            for device in devices
+        }
+        
+        completed = 0
+        total = len(devices)
+        for future in as_completed(future_to_device):
+            try:
+                host_info = future.result()
+                results.append(host_info)
+                job.events.publish('host', host_info)
+                completed += 1
+                # Update progress
+                progress = 60 + int((completed / total) * 35)
+                job.update_progress(progress, f'Gathering information... ({completed}/{total} hosts)')
+            except Exception as e:
+                print(f"Error gathering info: {e}")
+    
+    # Sort by IP address
+    results.sort()
+    
+    if incremental:
+        job.changes = change_detector.commit(
+            results,
+            [device['ip'] for device in devices],
+            [subnet for _, subnet in targets]
+        )
+        for change in job.changes:
+            job.events.publish('change', change)
+    
+    history.record_scan(results, [subnet for _, subnet in targets], source='web')
+    REGISTRY.counter('netmap_scans_total').inc()
+    
+    # Complete
+    job.results = results
+    job.statistics = calculate_statistics(results, job.columns)
+    job.update_progress(100, 'Scan complete!')
+    job.events.publish('complete', {
+        'total_hosts': len(results),
+        'message': 'Scan complete!',
+        'statistics': job.statistics
+    })
+
+
+def perform_distributed_scan(job):
+    """Scan a job's subnets with the registered agents, one segment per task"""
+    ports = job.options['ports']
+    job.columns = result_fieldnames(ports, job.options['services'])
+    job.subnet = ', '.join(job.options['subnets'])
+    results = HostTable(ports, job.options['services'])
+    seen = set()
+    results_lock = threading.Lock()
+    
+    def add_host(host):
+        with results_lock:
+            # A retried segment may report some hosts twice
+            if host['IP Address'] in seen:
+                return
+            seen.add(host['IP Address'])
+            results.append(host)
+        job.events.publish('host', host)
+    
+    def task_finished(task):
+        status = coordinator.job_status(job.id)
+        finished = status['done'] + status['failed']
+        job.update_progress(
+            10 + int(finished / status['total'] * 85),
+            f"{finished}/{status['total']} segments scanned ({status['hosts']} hosts)"
+        )
+        job.events.publish('task', task)
+    
+    tasks = coordinator.submit(
+        job.id,
+        job.options['subnets'],
+        {'ports': ports, 'discovery': job.options['discovery'], 'services': job.options['services']},
+        on_host=add_host,
+        on_task=task_finished
+    )
+    job.update_progress(10, f'Waiting for agents to scan {len(tasks)} segments...')
+    job.events.publish('start', {
+        'job_id': job.id,
+        'columns': job.columns,
+        'total': None,
+        'subnet': job.subnet,
+        'segments': len(tasks)
+    })
+    
+    status = coordinator.wait(job.id)
+    failed = [task for task in coordinator.tasks(job.id) if task['state'] == 'failed']
+    coordinator.forget(job.id)
+    
+    with results_lock:
+        results.sort()
+    history.record_scan(results, job.options['subnets'], source='distributed')
+    REGISTRY.counter('netmap_scans_total').inc()
+    
+    job.results = results
+    job.statistics = calculate_statistics(results, job.columns)
+    message = 'Scan complete!'
+    if failed:
+        message += f" {len(failed)} of {status['total']} segments failed: " + ', '.join(
+            f"{task['subnet']} ({task['error']})" for task in failed[:5]
+        )
+    job.update_progress(100, message)
+    job.events.publish('complete', {
+        'total_hosts': len(results),
+        'message': message,
+        'statistics': job.statistics
+    })
+
+
+# Bounded pool of concurrent scans; excess jobs queue, finished jobs are evicted LRU
+jobs = JobManager(perform_scan, max_workers=2, max_queued=20, max_finished=50)
 
 
 @app.route('/')
@@ -35,13 +235,12 @@ def detect_network():
     """Detect local network information"""
     try:
         local_ip, subnet = scanner.get_local_network_info()
-        scan_status['local_ip'] = local_ip
-        scan_status['subnet'] = subnet
         
         return jsonify({
             'success': True,
             'local_ip': local_ip,
-            'subnet': subnet
+            'subnet': subnet,
+            'networks': scanner.get_interface_networks()
         })
     except Exception as e:
         return jsonify({
@@ -50,155 +249,439 @@ def detect_network():
         }), 500
 
 
+def parse_scan_options(data):
+    """
+    Validate the scan options of a request body
+    Args:
+        data: dict with optional 'ports', 'subnets', 'interfaces', 'discovery', 'services',
+            'incremental' and 'distributed'
+    Returns:
+        dict of scan options
+    Raises:
+        ValueError: If a port, subnet or discovery method is invalid
+    """
+    # Port list from the request body (numbers, ranges and profile names)
+    ports = parse_ports(data.get('ports') or None)
+    
+    # Optional subnets (list or comma separated) and interfaces to scan
+    subnets = data.get('subnets') or []
+    if isinstance(subnets, str):
+        subnets = [subnet.strip() for subnet in subnets.split(',') if subnet.strip()]
+    invalid = [subnet for subnet in subnets if not validate_subnet(subnet)]
+    if invalid:
+        raise ValueError(f'Invalid subnet: {invalid[0]}')
+    
+    # Discovery methods; ICMP and TCP ping reach routed subnets
+    discovery = data.get('discovery') or list(DEFAULT_DISCOVERY)
+    if isinstance(discovery, str):
+        discovery = [method.strip() for method in discovery.split(',') if method.strip()]
+    unknown = [method for method in discovery if method not in DISCOVERY_METHODS]
+    if unknown:
+        raise ValueError(f'Unknown discovery method: {unknown[0]}')
+    
+    # Distributed scans hand the subnets to remote agents
+    distributed = bool(data.get('distributed'))
+    if distributed and not subnets:
+        raise ValueError('Distributed scans need subnets')
+    
+    return {
+        'ports': ports,
+        'subnets': subnets or None,
+        'discovery': discovery,
+        'interfaces': data.get('interfaces') or None,
+        'services': bool(data.get('services')),
+        'incremental': bool(data.get('incremental')) and not distributed,
+        'distributed': distributed
+    }
+
+
+@app.errorhandler(404)
+def not_found(e):
+    """Return JSON errors for the API"""
+    return jsonify({
+        'success': False,
+        'error': 'Not found'
+    }), 404
+
+
+@app.route('/api/jobs', methods=['POST'])
 @app.route('/api/start-scan', methods=['POST'])
 def start_scan():
-    """Start network scan in background thread"""
-    if scan_status['scanning']:
+    """Queue a network scan job"""
+    try:
+        options = parse_scan_options(request.get_json(silent=True) or {})
+        job = jobs.submit(options)
+    except ValueError as e:
         return jsonify({
             'success': False,
-            'error': 'Scan already in progress'
+            'error': str(e)
         }), 400
-    
-    # Reset status
-    scan_status['scanning'] = True
-    scan_status['progress'] = 0
-    scan_status['message'] = 'Initializing scan...'
-    scan_status['results'] = None
-    
-    # Start scan in background thread
-    thread = threading.Thread(target=perform_scan)
-    thread.daemon = True
-    thread.start()
+    except JobQueueFull as e:
+        return jsonify({
+            'success': False,
+            'error': f'Too many scans queued: {e}'
+        }), 429
     
     return jsonify({
         'success': True,
-        'message': 'Scan started'
+        'message': 'Scan started',
+        'job_id': job.id
     })
 
 
-def perform_scan():
-    """Perform the actual network scan"""
-    try:
-        # Update progress
-        scan_status['progress'] = 10
-        scan_status['message'] = 'Detecting network...'
-        
-        # Detect network if not already done
-        if not scanner.subnet:
-            scanner.get_local_network_info()
-            scan_status['local_ip'] = scanner.local_ip
-            scan_status['subnet'] = scanner.subnet
-        
-        # Perform ARP scan
-        scan_status['progress'] = 30
-        scan_status['message'] = f'Scanning network {scanner.subnet}...'
-        devices = scanner.perform_arp_scan()
-        
-        if not devices:
-            scan_status['scanning'] = False
-            scan_status['progress'] = 100
-            scan_status['message'] = 'No devices found'
-            return
-        
-        # Gather detailed information for discovered devices
-        scan_status['progress'] = 60
-        scan_status['message'] = f'Gathering information for {len(devices)} hosts...'
-        
-        # Use ThreadPoolExecutor to gather info from the devices we already found
-        from concurrent.futures import ThreadPoolExecutor, as_completed
-        import ipaddress
-        
-        results = []
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            future_to_device = {
-                executor.submit(scanner.gather_host_info, device): device 
-                for device in devices
-            }
-            
-            completed = 0
-            total = len(devices)
-            for future in as_completed(future_to_device):
-                try:
-                    host_info = future.result()
-                    results.append(host_info)
-                    completed += 1
-                    # Update progress
-                    progress = 60 + int((completed / total) * 35)
-                    scan_status['progress'] = progress
-                    scan_status['message'] = f'Gathering information... ({completed}/{total} hosts)'
-                except Exception as e:
-                    print(f"Error gathering info: {e}")
-        
-        # Sort by IP address
-        results.sort(key=lambda x: ipaddress.IPv4Address(x['IP Address']))
-        
-        # Complete
-        scan_status['progress'] = 100
-        scan_status['message'] = 'Scan complete!'
-        scan_status['results'] = results
-        scan_status['scanning'] = False
-        
-    except Exception as e:
-        scan_status['scanning'] = False
-        scan_status['progress'] = 0
-        scan_status['message'] = f'Error: {str(e)}'
-        scan_status['results'] = None
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """List queued, running and retained finished jobs"""
+    return jsonify({
+        'success': True,
+        'jobs': jobs.list()
+    })
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get the status of one job"""
+    job = jobs.get(job_id)
+    if job is None:
+        abort(404)
+    return jsonify(dict(job.to_dict(), success=True))
+
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a job that is still queued"""
+    if not jobs.cancel(job_id):
+        return jsonify({
+            'success': False,
+            'error': 'Job is not queued'
+        }), 409
+    return jsonify({'success': True})
 
 
 @app.route('/api/scan-status', methods=['GET'])
 def get_scan_status():
     """Get current scan status"""
-    return jsonify({
-        'scanning': scan_status['scanning'],
-        'progress': scan_status['progress'],
-        'message': scan_status['message'],
-        'local_ip': scan_status['local_ip'],
-        'subnet': scan_status['subnet'],
-        'has_results': scan_status['results'] is not None
-    })
+    job = jobs.get(request.args.get('job'))
+    if job is None:
+        return jsonify({
+            'scanning': False,
+            'progress': 0,
+            'message': '',
+            'local_ip': scanner.local_ip,
+            'subnet': scanner.subnet,
+            'has_results': False
+        })
+    
+    return jsonify(job.to_dict())
 
 
+@app.route('/api/jobs/<job_id>/stream', methods=['GET'])
+@app.route('/api/scan/stream', methods=['GET'])
+def stream_scan(job_id=None):
+    """Stream progress and host results of a job as Server-Sent Events"""
+    job = jobs.get(job_id or request.args.get('job'))
+    if job is None:
+        abort(404)
+    
+    return Response(
+        job.events.subscribe(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('/api/jobs/<job_id>/results', methods=['GET'])
 @app.route('/api/results', methods=['GET'])
-def get_results():
+def get_results(job_id=None):
     """Get scan results"""
-    if scan_status['results'] is None:
+    job = jobs.get(job_id or request.args.get('job'))
+    if job is None or job.results is None:
         return jsonify({
             'success': False,
             'error': 'No scan results available'
         }), 404
     
-    # Calculate statistics
-    total_hosts = len(scan_status['results'])
-    ssh_open = sum(1 for h in scan_status['results'] if h['SSH (22)'] == 'Open')
-    http_open = sum(1 for h in scan_status['results'] if h['HTTP (80)'] == 'Open')
-    https_open = sum(1 for h in scan_status['results'] if h['HTTPS (443)'] == 'Open')
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'results': [dict(host) for host in job.results],
+        'columns': job.columns,
+        'statistics': job.statistics,
+        'changes': job.changes
+    })
+
+
+@app.route('/api/agents', methods=['POST'])
+def register_agent():
+    """Register a scan agent and the networks it can reach"""
+    data = request.get_json(silent=True) or {}
+    try:
+        agent_id = coordinator.register(
+            data.get('name') or request.remote_addr,
+            data.get('networks') or [],
+            data.get('agent_id')
+        )
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     
     return jsonify({
         'success': True,
-        'results': scan_status['results'],
-        'statistics': {
-            'total_hosts': total_hosts,
-            'ssh_open': ssh_open,
-            'http_open': http_open,
-            'https_open': https_open
-        }
+        'agent_id': agent_id
+    })
+
+
+@app.route('/api/agents', methods=['GET'])
+def list_agents():
+    """List registered agents and what they are working on"""
+    return jsonify({
+        'success': True,
+        'agents': coordinator.agents()
     })
 
 
+@app.route('/api/agents/<agent_id>/lease', methods=['POST'])
+def lease_task(agent_id):
+    """Hand an agent its next segment to scan (task is null when idle)"""
+    try:
+        task = coordinator.lease(agent_id)
+    except KeyError:
+        return jsonify({
+            'success': False,
+            'error': 'Unknown agent'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'task': task
+    })
+
+
+@app.route('/api/agents/<agent_id>/tasks/<task_id>', methods=['POST'])
+def report_task(agent_id, task_id):
+    """Consume an agent's JSON Lines result stream as it is uploaded"""
+    try:
+        task = coordinator.report(agent_id, task_id, request.stream)
+    except KeyError:
+        return jsonify({
+            'success': False,
+            'error': 'Unknown agent or task'
+        }), 404
+    except PermissionError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 409
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid result stream: {e}'
+        }), 400
+    
+    return jsonify({
+        'success': True,
+        'task': task
+    })
+
+
+@app.route('/api/monitor', methods=['POST'])
+def start_monitor():
+    """Start (or restart) the continuous monitoring daemon"""
+    global monitor
+    data = request.get_json(silent=True) or {}
+    try:
+        options = parse_scan_options(data)
+        interval = int(data.get('interval') or 300)
+        if interval < 10:
+            raise ValueError('Interval must be at least 10 seconds')
+    except (TypeError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    with monitor_lock:
+        if monitor is not None:
+            monitor.stop()
+            monitor.change_detector.close()
+        monitor = MonitorDaemon(
+            NetworkScanner(ports=options['ports'], cache=lookup_cache, arp_rate=100,
+                           discovery=options['discovery'], discovery_rate=100,
+                           detect_services=options['services']),
+            ChangeDetector(MONITOR_STATE_PATH),
+            subnets=options['subnets'],
+            interfaces=options['interfaces'],
+            interval=interval,
+            history=history
+        )
+        monitor.start()
+    
+    return jsonify(dict(monitor.status(), success=True))
+
+
+@app.route('/api/monitor', methods=['DELETE'])
+def stop_monitor():
+    """Stop the monitoring daemon"""
+    with monitor_lock:
+        if monitor is None or not monitor.running:
+            return jsonify({
+                'success': False,
+                'error': 'Monitor is not running'
+            }), 409
+        monitor.stop()
+    return jsonify(dict(monitor.status(), success=True))
+
+
+@app.route('/api/monitor', methods=['GET'])
+def get_monitor_status():
+    """Get the monitoring daemon state"""
+    if monitor is None:
+        return jsonify({'success': True, 'running': False})
+    return jsonify(dict(monitor.status(), success=True))
+
+
+@app.route('/api/monitor/hosts', methods=['GET'])
+def get_monitor_hosts():
+    """Get the monitor's rolling host index"""
+    if monitor is None:
+        abort(404)
+    return jsonify({
+        'success': True,
+        'results': monitor.hosts(),
+        'columns': monitor.scanner.fieldnames
+    })
+
+
+@app.route('/api/monitor/stream', methods=['GET'])
+def stream_monitor():
+    """Stream host and change events of the monitor as Server-Sent Events"""
+    if monitor is None:
+        abort(404)
+    
+    return Response(
+        monitor.events.subscribe(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('/api/history/scans', methods=['GET'])
+def get_history_scans():
+    """List the most recent recorded scans"""
+    return jsonify({
+        'success': True,
+        'scans': history.scans(request.args.get('limit', 50, type=int))
+    })
+
+
+@app.route('/api/history/mac/<mac>', methods=['GET'])
+def get_mac_history(mac):
+    """When a MAC address was first and last seen"""
+    seen = history.first_seen(mac)
+    if seen is None:
+        return jsonify({
+            'success': False,
+            'error': f'MAC {mac} has never been seen'
+        }), 404
+    return jsonify(dict(seen, success=True))
+
+
+@app.route('/api/history/ip/<ip>', methods=['GET'])
+def get_ip_history(ip):
+    """Devices observed at an IP address (?since=7d)"""
+    try:
+        since = parse_time(request.args.get('since'))
+        observations = history.ip_history(ip, since, request.args.get('limit', 1000, type=int))
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    return jsonify({
+        'success': True,
+        'ip': ip,
+        'observations': observations
+    })
+
+
+@app.route('/api/history/port/<int:port>', methods=['GET'])
+def get_port_history(port):
+    """Hosts seen with a port open in a time window (?since=7d&until=...)"""
+    try:
+        since = parse_time(request.args.get('since'))
+        until = parse_time(request.args.get('until'))
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    return jsonify({
+        'success': True,
+        'port': port,
+        'hosts': history.hosts_with_port(port, since, until)
+    })
+
+
+@app.route('/api/port-profiles', methods=['GET'])
+def get_port_profiles():
+    """List the named port profiles"""
+    return jsonify({
+        'success': True,
+        'profiles': {name: len(ports) for name, ports in PORT_PROFILES.items()}
+    })
+
+
+def calculate_statistics(results, columns):
+    """
+    Count hosts with each scanned port open
+    Args:
+        results: List of host dictionaries
+        columns: Result column names
+    Returns:
+        dict with total host count and per-port open counts
+    """
+    open_counts = {}
+    for column in columns[len(BASE_FIELDS):]:
+        if column not in (OPEN_PORTS_FIELD, SERVICES_FIELD):
+            open_counts[column] = sum(1 for h in results if h.get(column) == 'Open')
+    
+    if OPEN_PORTS_FIELD in columns:
+        for host in results:
+            for port in host.get(OPEN_PORTS_FIELD, '').split(','):
+                if port.isdigit():
+                    open_counts[port] = open_counts.get(port, 0) + 1
+    
+    return {
+        'total_hosts': len(results),
+        'open_ports': open_counts
+    }
+
+
 @app.route('/api/export', methods=['POST'])
 def export_results():
-    """Export scan results to CSV"""
-    if scan_status['results'] is None:
+    """Export scan results to a CSV, JSON Lines or Parquet file"""
+    data = request.get_json(silent=True) or {}
+    job = jobs.get(data.get('job_id'))
+    if job is None or job.results is None:
         return jsonify({
             'success': False,
             'error': 'No scan results to export'
         }), 404
     
+    fmt = data.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({
+            'success': False,
+            'error': f"Invalid format: {fmt} (choose from {', '.join(EXPORT_FORMATS)})"
+        }), 400
+    
     try:
-        data = request.json
-        filename = data.get('filename', None) if data else None
+        filename = data.get('filename', None)
         
-        filepath = export_to_csv(scan_status['results'], filename)
+        # Rows are rendered and written one at a time
+        filepath = export_hosts(job.results, job.columns, filename, fmt, bool(data.get('gzip')))
         
         return jsonify({
             'success': True,
@@ -212,11 +695,38 @@ def export_results():
         }), 500
 
 
+@app.route('/api/jobs/<job_id>/download')
+@app.route('/api/download')
+def download_results(job_id=None):
+    """Stream a job's results as a chunked CSV or JSON Lines download"""
+    job = jobs.get(job_id or request.args.get('job'))
+    if job is None or job.results is None:
+        return jsonify({
+            'success': False,
+            'error': 'No scan results available'
+        }), 404
+    
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'jsonl'):
+        return jsonify({
+            'success': False,
+            'error': 'Only csv and jsonl can be streamed; use /api/export for parquet'
+        }), 400
+    
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+    filename = os.path.basename(request.args.get('filename') or f"netmap_{job.id}").replace('"', '')
+    filename = export_filename(filename, fmt, compress)
+    return Response(
+        stream_export(job.results, job.columns, fmt, compress),
+        mimetype='application/gzip' if compress else CONTENT_TYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+
 @app.route('/api/download/<filename>')
 def download_file(filename):
-    """Download exported CSV file"""
-    exports_dir = os.path.join(os.path.dirname(__file__), 'exports')
-    filepath = os.path.join(exports_dir, filename)
+    """Download an exported file"""
+    filepath = os.path.join(EXPORTS_DIR, filename)
     
     if os.path.exists(filepath):
         return send_file(filepath, as_attachment=True)
@@ -227,6 +737,12 @@ def download_file(filename):
         }), 404
 
 
+@app.route('/metrics')
+def metrics():
+    """Scan stage timings and counters in the Prometheus text format"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
 @app.route('/favicon.ico')
 def favicon():
     """Return empty response for favicon requests to avoid 404 in logs"""
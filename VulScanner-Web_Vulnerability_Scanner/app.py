@@ -30,8 +30,16 @@ def scan():
             }), 400
         
         # Get optional parameters
-        delay = float(data.get('delay', 1.0))
+        delay = data.get('delay')
+        delay = float(delay) if delay not in (None, '') else None
         timeout = int(data.get('timeout', 20))
+        concurrency = int(data.get('concurrency', 10))
+        rate = data.get('rate')
+        rate = float(rate) if rate not in (None, '') else None
+        crawl = bool(data.get('crawl', False))
+        max_depth = int(data.get('depth', 2))
+        max_pages = int(data.get('max_pages', 50))
+        blind = bool(data.get('blind', False))
         
         # Get the EH/reports directory (we're already in EH folder)
         current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -43,7 +51,13 @@ def scan():
             delay=delay,
             timeout=timeout,
             output_dir=reports_dir,
-            silent=True
+            silent=True,
+            concurrency=concurrency,
+            rate=rate,
+            crawl=crawl,
+            max_depth=max_depth,
+            max_pages=max_pages,
+            blind=blind
         )
         
         # Run the scan
@@ -0,0 +1,90 @@
+"""
+Micro-benchmark: SQL error signature matching on response bodies of
+different sizes, the old per-pattern loop against the compiled matcher
+"""
+import argparse
+import os
+import random
+import re
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scanner.sql_signatures import DEFAULT_MATCHER
+
+# The nine patterns SQLInjectionDetector searched one after another
+LEGACY_PATTERNS = [
+    r"SQL syntax.*MySQL",
+    r"Warning.*mysql_.*",
+    r"SQL syntax.*MariaDB",
+    r"PostgreSQL.*ERROR",
+    r"ORA-[0-9]{5}",
+    r"SQLite.*error",
+    r"Microsoft SQL Server.*[0-9a-fA-F]{8}",
+    r"Unclosed quotation mark",
+    r"quoted string not properly terminated"
+]
+
+ERROR = ("<b>Warning</b>: You have an error in your SQL syntax; check the manual that "
+         "corresponds to your MySQL server version for the right syntax to use near ''' at line 1")
+
+
+def legacy_has_sql_error(text):
+    for pattern in LEGACY_PATTERNS:
+        if re.search(pattern, text, re.IGNORECASE):
+            return True
+    return False
+
+
+def matcher_has_sql_error(text):
+    return DEFAULT_MATCHER.search(text) is not None
+
+
+def make_page(size, seed=1):
+    """HTML of roughly `size` characters with random words and no SQL error"""
+    rng = random.Random(seed)
+    words = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 9))) for _ in range(2000)]
+    lines = []
+    length = 0
+    while length < size:
+        line = f'<div class="row"><p>{" ".join(rng.choices(words, k=12))}</p></div>\n'
+        lines.append(line)
+        length += len(line)
+    return ''.join(lines)
+
+
+def bench(func, text, repeat):
+    """Best time of `repeat` calls, in milliseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SQL error signature matching")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                        help='Body sizes in characters (default: 10000 100000 1000000)')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per case, best is kept (default: 5)')
+    args = parser.parse_args()
+
+    print(f"Legacy loop: {len(LEGACY_PATTERNS)} patterns | Matcher: {DEFAULT_MATCHER.count} signatures, "
+          f"{len(DEFAULT_MATCHER.prefixes)} literal prefixes")
+    print(f"{'Body':<22} {'Legacy (ms)':>12} {'Matcher (ms)':>13} {'Speedup':>8}")
+    print("-" * 58)
+    for size in args.sizes:
+        page = make_page(size)
+        cases = (('clean', page), ('error at top', ERROR + page), ('error at end', page + ERROR))
+        for label, body in cases:
+            assert legacy_has_sql_error(body) == matcher_has_sql_error(body)
+            legacy = bench(legacy_has_sql_error, body, args.repeat)
+            matcher = bench(matcher_has_sql_error, body, args.repeat)
+            print(f"{f'{size:,} {label}':<22} {legacy:>12.2f} {matcher:>13.2f} {legacy / matcher:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
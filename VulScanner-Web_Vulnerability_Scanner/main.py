@@ -13,8 +13,20 @@ def main():
         epilog="⚠️  For educational and authorized testing ONLY."
     )
     parser.add_argument('url', help='Target URL to scan (e.g., http://localhost:8080 or https://example.com)')
-    parser.add_argument('--delay', type=float, default=1.0,
-                        help='Delay between requests in seconds (default: 1.0)')
+    parser.add_argument('--delay', type=float, default=None,
+                        help='Delay between requests in seconds; same as --rate 1/delay (default: not set)')
+    parser.add_argument('--concurrency', type=int, default=10,
+                        help='Requests in flight at once (default: 10)')
+    parser.add_argument('--rate', type=float, default=None,
+                        help='Maximum requests per second (default: 10, 0 for no limit)')
+    parser.add_argument('--crawl', action='store_true',
+                        help='Crawl the site and test every page and form found')
+    parser.add_argument('--depth', type=int, default=2,
+                        help='Link hops to follow when crawling (default: 2)')
+    parser.add_argument('--max-pages', type=int, default=50,
+                        help='Maximum pages to crawl (default: 50)')
+    parser.add_argument('--blind', action='store_true',
+                        help='Also test for boolean-based and time-based blind SQL injection')
     parser.add_argument('--timeout', type=int, default=20,
                         help='Request timeout in seconds (default: 10)')
     parser.add_argument('--user-agent', type=str,
@@ -23,6 +35,10 @@ def main():
                         help='Directory to save reports (default: EH/reports)')
 
     args = parser.parse_args()
+    if args.rate is not None and args.rate < 0:
+        parser.error('--rate must be 0 (no limit) or a positive number')
+    if args.delay is not None and args.delay <= 0:
+        parser.error('--delay must be a positive number of seconds')
 
     try:
         scanner = VulnerabilityScanner(
@@ -30,7 +46,13 @@ def main():
             delay=args.delay,
             timeout=args.timeout,
             user_agent=args.user_agent,
-            output_dir=args.output_dir
+            output_dir=args.output_dir,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            crawl=args.crawl,
+            max_depth=args.depth,
+            max_pages=args.max_pages,
+            blind=args.blind
         )
         scanner.run()
     except KeyboardInterrupt:
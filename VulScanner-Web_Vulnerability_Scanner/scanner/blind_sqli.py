@@ -0,0 +1,285 @@
+import hashlib
+import html
+import math
+import re
+import threading
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from urllib.parse import urlparse, parse_qs, urlencode, quote_plus
+from scanner.utils import normalize_url
+
+# Boolean pairs: {v} is the parameter's original value. The true condition
+# must leave the page as it was and the false one must change it.
+BOOLEAN_TESTS = [
+    ("{v} AND {n}={n}", "{v} AND {n}={m}"),
+    ("{v}' AND '{n}'='{n}", "{v}' AND '{n}'='{m}"),
+    ("{v}\" AND \"{n}\"=\"{n}", "{v}\" AND \"{n}\"=\"{m}"),
+    ("{v}' AND {n}={n}-- -", "{v}' AND {n}={m}-- -"),
+]
+
+# Time-based payloads per DBMS; {s} is the sleep in seconds
+TIME_TESTS = [
+    ('MySQL', "{v}' AND SLEEP({s})-- -"),
+    ('MySQL', "{v} AND SLEEP({s})"),
+    ('PostgreSQL', "{v}' AND 1=(SELECT 1 FROM PG_SLEEP({s}))-- -"),
+    ('PostgreSQL', "{v} AND 1=(SELECT 1 FROM PG_SLEEP({s}))"),
+    ('Microsoft SQL Server', "{v}'; WAITFOR DELAY '0:0:{s}'-- -"),
+    ('Microsoft SQL Server', "{v}; WAITFOR DELAY '0:0:{s}'-- -"),
+]
+
+# Length buckets grow by 10%, so neighbouring buckets are within ~20%
+BUCKET_RATIO = 1.1
+
+# Simhash distance allowed between two loads of an unchanged page
+MIN_TOLERANCE = 3
+
+# Baselines that differ more than this are too dynamic to compare against
+MAX_TOLERANCE = 12
+
+_TOKEN = re.compile(r"[a-z_]{2,}|0")
+_DIGITS = re.compile(r"\d+")
+
+Fingerprint = namedtuple('Fingerprint', ['status', 'length', 'bucket', 'simhash'])
+
+
+@lru_cache(maxsize=65536)
+def _token_hash(token):
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), 'big')
+
+
+def simhash(text, bits=64):
+    """Similarity hash of a text: near-identical texts differ in few bits"""
+    vector = [0] * bits
+    for token, weight in Counter(_TOKEN.findall(text)).items():
+        value = _token_hash(token)
+        for bit in range(bits):
+            vector[bit] += weight if value >> bit & 1 else -weight
+    return sum(1 << bit for bit in range(bits) if vector[bit] > 0)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def length_bucket(length):
+    return int(math.log(length + 1, BUCKET_RATIO))
+
+
+def normalize_body(text, payload=None):
+    """Lowercased body with the reflected payload removed and numbers (ids, timestamps) collapsed"""
+    if payload:
+        for form in {payload, html.escape(payload), html.escape(payload, quote=False), quote_plus(payload)}:
+            text = text.replace(form, '')
+    return _DIGITS.sub('0', text.lower())
+
+
+def fingerprint(resp, payload=None):
+    body = normalize_body(resp.text, payload)
+    return Fingerprint(resp.status_code, len(body), length_bucket(len(body)), simhash(body))
+
+
+def distance(a, b):
+    """Simhash distance, or None when the status or length bucket already differs"""
+    if a.status != b.status or abs(a.bucket - b.bucket) > 1:
+        return None
+    return hamming(a.simhash, b.simhash)
+
+
+class BaselineCache:
+    """Fingerprint and latency of the unmodified response of each endpoint, fetched once"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.baselines = {}
+        self.lock = threading.Lock()
+
+    def get(self, url):
+        """
+        Returns dict with 'fingerprint', 'tolerance' (simhash distance between two loads)
+        and 'latency' (slowest of the loads, seconds), or None if the page could not be loaded
+        """
+        key = normalize_url(url)
+        with self.lock:
+            if key in self.baselines:
+                return self.baselines[key]
+
+        responses = [resp for _, resp in self.engine.map([(i, 'GET', url, {}) for i in range(2)])]
+        baseline = None
+        if all(resp is not None for resp in responses):
+            first, second = (fingerprint(resp) for resp in responses)
+            drift = distance(first, second)
+            baseline = {
+                'fingerprint': first,
+                'tolerance': None if drift is None else max(MIN_TOLERANCE, drift + 2),
+                'latency': max(resp.elapsed.total_seconds() for resp in responses)
+            }
+        with self.lock:
+            self.baselines[key] = baseline
+        return baseline
+
+
+class BlindSQLiDetector:
+    """
+    Boolean-based and time-based blind SQL injection.
+
+    Responses are compared by status, length bucket and simhash against a
+    cached baseline per endpoint instead of diffing full bodies. Time-based
+    tests of an endpoint run one after another (so they cannot slow each
+    other down) but in parallel with other endpoints and the other detectors.
+    """
+
+    def __init__(self, engine, sleep=5, time_based=True):
+        self.engine = engine
+        self.sleep = sleep
+        self.time_based = time_based
+        self.baselines = BaselineCache(engine)
+        self.pending = []
+        # Sleeping requests hold an engine slot for seconds; leave the other half to the detectors
+        self.timers = ThreadPoolExecutor(max_workers=max(1, engine.concurrency // 2),
+                                         thread_name_prefix='vulnscan-timing')
+
+    def _payload_urls(self, url, param, payloads):
+        parsed = urlparse(url)
+        base = f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
+        params = parse_qs(parsed.query, keep_blank_values=True)
+        urls = []
+        for payload in payloads:
+            test_params = params.copy()
+            test_params[param] = [payload]
+            urls.append(f"{base}?{urlencode(test_params, doseq=True)}")
+        return urls
+
+    def _boolean_jobs(self, url, param, value, tests, n, m):
+        jobs = []
+        for index, pair in enumerate(tests):
+            payloads = [template.format(v=value, n=n, m=m) for template in pair]
+            for truth, test_url, payload in zip((True, False), self._payload_urls(url, param, payloads), payloads):
+                jobs.append(((param, index, truth, test_url, payload), 'GET', test_url, {}))
+        return jobs
+
+    def _boolean_results(self, jobs, baseline):
+        """Map of (param, test index) to the evidence of a true/false pair that behaves like an injection"""
+        responses = {}
+        for (param, index, truth, test_url, payload), resp in self.engine.map(jobs):
+            responses[(param, index, truth)] = (resp, test_url, payload)
+
+        hits = {}
+        for (param, index, truth), (resp, test_url, payload) in responses.items():
+            if not truth or resp is None:
+                continue
+            false_resp, _, false_payload = responses[(param, index, False)]
+            if false_resp is None:
+                continue
+            true_print = fingerprint(resp, payload)
+            false_print = fingerprint(false_resp, false_payload)
+            true_distance = distance(true_print, baseline['fingerprint'])
+            false_distance = distance(false_print, baseline['fingerprint'])
+            if true_distance is None or true_distance > baseline['tolerance']:
+                continue
+            if false_distance is not None and false_distance <= baseline['tolerance']:
+                continue
+            hits[(param, index)] = {
+                'url': test_url,
+                'payload': payload,
+                'evidence': (
+                    f"True condition matches the baseline (distance {true_distance}); false condition "
+                    f"{'changes the status' if false_print.status != true_print.status else 'differs'} "
+                    f"(length {true_print.length} -> {false_print.length}"
+                    f"{'' if false_distance is None else f', distance {false_distance}'})"
+                )
+            }
+        return hits
+
+    def test_url_params(self, url, skip_params=()):
+        """
+        Boolean-based tests of every parameter of url; time-based tests are
+        started in the background and reported by collect()
+        skip_params: Parameters already known to be injectable
+        """
+        findings = []
+        parsed = urlparse(url)
+        if not parsed.query:
+            return findings
+        params = {
+            param: values[0] for param, values in parse_qs(parsed.query, keep_blank_values=True).items()
+            if param not in skip_params
+        }
+        if not params:
+            return findings
+
+        baseline = self.baselines.get(url)
+        if baseline is None:
+            return findings
+
+        flagged = set()
+        if baseline['tolerance'] is not None and baseline['tolerance'] <= MAX_TOLERANCE:
+            jobs = []
+            for param, value in params.items():
+                jobs.extend(self._boolean_jobs(url, param, value, BOOLEAN_TESTS, 1, 2))
+            hits = {}
+            for (param, index), hit in sorted(self._boolean_results(jobs, baseline).items()):
+                hits.setdefault(param, (index, hit))
+
+            # Confirm each hit with different numbers before reporting it
+            confirm = []
+            for param, (index, _) in hits.items():
+                confirm.extend(self._boolean_jobs(url, param, params[param], [BOOLEAN_TESTS[index]], 7, 9))
+            confirmed = {param for param, _ in self._boolean_results(confirm, baseline)}
+            for param, (index, hit) in hits.items():
+                if param in confirmed:
+                    flagged.add(param)
+                    findings.append({
+                        'type': 'Blind SQL Injection (boolean-based)',
+                        'url': hit['url'],
+                        'parameter': param,
+                        'payload': hit['payload'],
+                        'method': 'GET',
+                        'evidence': hit['evidence']
+                    })
+
+        if self.time_based:
+            for param, value in params.items():
+                if param not in flagged:
+                    self.pending.append(self.timers.submit(self._time_test, url, param, value, baseline))
+        return findings
+
+    def _time_test(self, url, param, value, baseline):
+        """Run the time-based payloads of one parameter in turn; returns a finding or None"""
+        threshold = baseline['latency'] + self.sleep * 0.8
+        timeout = baseline['latency'] + self.sleep * 3
+        for dbms, template in TIME_TESTS:
+            payload = template.format(v=value, s=self.sleep)
+            test_url = self._payload_urls(url, param, [payload])[0]
+            resp = self.engine.request('GET', test_url, timeout=timeout)
+            if resp is None or resp.elapsed.total_seconds() < threshold:
+                continue
+            # A slow server is not an injection: the same request without the sleep must be fast
+            control = self.engine.request('GET', self._payload_urls(url, param, [template.format(v=value, s=0)])[0],
+                                          timeout=timeout)
+            if control is None or control.elapsed.total_seconds() >= threshold:
+                continue
+            return {
+                'type': 'Blind SQL Injection (time-based)',
+                'url': test_url,
+                'parameter': param,
+                'payload': payload,
+                'method': 'GET',
+                'dbms': dbms,
+                'evidence': (f"Response took {resp.elapsed.total_seconds():.2f}s with a {self.sleep}s sleep, "
+                             f"{control.elapsed.total_seconds():.2f}s without (baseline {baseline['latency']:.2f}s)")
+            }
+        return None
+
+    def collect(self):
+        """Wait for the time-based tests started so far and return their findings"""
+        findings = []
+        for future in self.pending:
+            finding = future.result()
+            if finding:
+                findings.append(finding)
+        self.pending = []
+        return findings
+
+    def close(self):
+        self.timers.shutdown(wait=True)
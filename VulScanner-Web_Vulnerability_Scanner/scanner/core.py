@@ -1,19 +1,39 @@
 import requests
 import os
+from urllib.parse import urlparse
 from colorama import Fore, Style
 from scanner.sqli_detector import SQLInjectionDetector
 from scanner.xss_detector import XSSDetector
 from scanner.reporter import Reporter
+from scanner.request_engine import RequestEngine
+from scanner.crawler import Crawler
+from scanner.blind_sqli import BlindSQLiDetector
 from scanner.utils import validate_url, is_localhost
 
+# Request budget in requests/second when neither rate nor delay is given
+DEFAULT_RATE = 10
+
 class VulnerabilityScanner:
-    def __init__(self, target_url, delay=1, timeout=10, user_agent=None, output_dir=None, silent=False):
+    def __init__(self, target_url, delay=None, timeout=10, user_agent=None, output_dir=None, silent=False,
+                 concurrency=10, rate=None, crawl=False, max_depth=2, max_pages=50, blind=False):
         if not validate_url(target_url):
             raise ValueError("URL must start with http:// or https://")
 
         self.target_url = target_url
         self.delay = delay
         self.timeout = timeout
+        self.concurrency = concurrency
+        # Request budget in requests/second, shared by every request of the scan;
+        # an explicit delay means one request per delay
+        if rate is None:
+            rate = 1 / delay if delay else DEFAULT_RATE
+        if rate < 0:
+            raise ValueError("Rate must be 0 (no limit) or a positive number of requests per second")
+        self.rate = rate
+        self.crawl = crawl
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.blind = blind
         
         # Default to EH/reports folder if not specified
         if output_dir is None:
@@ -43,7 +63,8 @@ class VulnerabilityScanner:
             if self.is_localhost:
                 print(f"{Fore.GREEN}🏠 Localhost detected - Local testing mode{Style.RESET_ALL}")
             
-            print(f"Delay: {self.delay}s | Timeout: {self.timeout}s\n")
+            rate = f"{self.rate:g} req/s" if self.rate else "unlimited"
+            print(f"Concurrency: {self.concurrency} | Rate: {rate} | Timeout: {self.timeout}s\n")
 
         # Initial request to get base page
         try:
@@ -68,21 +89,63 @@ class VulnerabilityScanner:
                 print(f"{Fore.RED}❌ {error_msg}{Style.RESET_ALL}")
             raise
 
-        # Run detectors
-        sqli_detector = SQLInjectionDetector(self.session, self.delay, self.timeout)
-        xss_detector = XSSDetector(self.session, self.delay, self.timeout)
+        # Run detectors; they share one engine, so the rate budget covers the whole scan
+        with RequestEngine(self.session, self.concurrency, self.rate, self.timeout) as engine:
+            sqli_detector = SQLInjectionDetector(self.session, self.delay, self.timeout, engine)
+            xss_detector = XSSDetector(self.session, self.delay, self.timeout, engine)
+            blind_detector = BlindSQLiDetector(engine) if self.blind else None
 
-        if not self.silent:
-            print(f"{Fore.BLUE}🔍 Testing for SQL Injection...{Style.RESET_ALL}")
-        self.findings.extend(sqli_detector.test_url_params(self.target_url))
+            if self.crawl:
+                self.crawl_and_test(engine, resp.text, sqli_detector, xss_detector, blind_detector)
+            else:
+                if not self.silent:
+                    print(f"{Fore.BLUE}🔍 Testing for SQL Injection...{Style.RESET_ALL}")
+                self.test_sql_injection(self.target_url, sqli_detector, blind_detector)
+
+                if not self.silent:
+                    print(f"{Fore.BLUE}🔍 Testing for XSS...{Style.RESET_ALL}")
+                self.findings.extend(xss_detector.test_url_params(self.target_url))
+                self.findings.extend(xss_detector.test_forms(self.target_url, resp.text))
+
+            if blind_detector is not None:
+                if not self.silent:
+                    print(f"{Fore.BLUE}⏱️  Waiting for time-based SQL injection tests...{Style.RESET_ALL}")
+                self.findings.extend(blind_detector.collect())
+                blind_detector.close()
 
         if not self.silent:
-            print(f"{Fore.BLUE}🔍 Testing for XSS...{Style.RESET_ALL}")
-        self.findings.extend(xss_detector.test_url_params(self.target_url))
-        self.findings.extend(xss_detector.test_forms(self.target_url, resp.text))
+            print(f"Sent {engine.sent} requests ({engine.errors} failed)")
 
         # Generate report
         reporter = Reporter(self.output_dir)
         if not self.silent:
             reporter.display_findings(self.findings)
-        reporter.save_report(self.target_url, self.findings)
\ No newline at end of file
+        reporter.save_report(self.target_url, self.findings)
+
+    def test_sql_injection(self, url, sqli_detector, blind_detector=None):
+        """Error-based tests, then blind tests of the parameters that showed no error"""
+        findings = sqli_detector.test_url_params(url)
+        self.findings.extend(findings)
+        if blind_detector is not None:
+            injectable = {finding['parameter'] for finding in findings}
+            self.findings.extend(blind_detector.test_url_params(url, skip_params=injectable))
+
+    def crawl_and_test(self, engine, start_html, sqli_detector, xss_detector, blind_detector=None):
+        """Crawl the site and test every new parameterised URL and form while crawling continues"""
+        crawler = Crawler(engine, self.target_url, self.max_depth, self.max_pages)
+        if not self.silent:
+            print(f"{Fore.BLUE}🕸️  Crawling (depth {self.max_depth}, up to {self.max_pages} pages)...{Style.RESET_ALL}")
+
+        pages = 0
+        for page in crawler.pages(start_html):
+            pages += 1
+            if not self.silent:
+                print(f"{Fore.BLUE}🔍 [{page['depth']}] {page['url']}{Style.RESET_ALL}")
+            if urlparse(page['url']).query:
+                self.test_sql_injection(page['url'], sqli_detector, blind_detector)
+                self.findings.extend(xss_detector.test_url_params(page['url']))
+            if page['forms']:
+                self.findings.extend(xss_detector.test_forms(page['url'], page['html'], page['forms']))
+
+        if not self.silent:
+            print(f"Crawled {pages} pages")
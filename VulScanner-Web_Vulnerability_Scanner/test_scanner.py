@@ -3,6 +3,13 @@ Test file to verify EH scanner is working properly
 """
 import sys
 import os
+import re
+import tempfile
+import threading
+import time
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+from urllib.parse import urlparse, parse_qs
 
 # Add scanner to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -68,6 +75,10 @@ def test_payload_loading():
         
         sqli_payloads = sqli.load_payloads()
         xss_payloads = xss.load_payloads()
+        # Each created its own engine; close() stops its worker threads
+        sqli.close()
+        xss.close()
+        assert sqli.engine.executor._shutdown and xss.engine.executor._shutdown
         
         print(f"  ✅ SQL Injection payloads loaded: {len(sqli_payloads)}")
         print(f"  ✅ XSS payloads loaded: {len(xss_payloads)}")
@@ -88,6 +99,16 @@ def test_scanner_initialization():
             silent=True
         )
         print(f"  ✅ Scanner initialized")
+        # The request budget does not follow from the per-detector delay
+        assert VulnerabilityScanner("http://example.com", silent=True).rate == 10
+        assert VulnerabilityScanner("http://example.com", delay=0.5, silent=True).rate == 2
+        assert VulnerabilityScanner("http://example.com", rate=0, silent=True).rate == 0
+        try:
+            VulnerabilityScanner("http://example.com", rate=-1, silent=True)
+            return False
+        except ValueError:
+            pass
+        print(f"  ✅ Rate: 10 req/s by default, negative rates rejected")
         print(f"  ✅ Target: {scanner.target_url}")
         print(f"  ✅ Timeout: {scanner.timeout}s")
         print(f"  ✅ Reports directory: {scanner.output_dir}")
@@ -115,6 +136,318 @@ def test_reports_directory():
         print(f"  ❌ Reports directory test failed: {e}")
         return False
 
+class _TargetHandler(BaseHTTPRequestHandler):
+    """Slow test target that leaks a MySQL error, as an HTTP 500, for a quote in `id`"""
+
+    def do_GET(self):
+        time.sleep(0.05)
+        params = parse_qs(urlparse(self.path).query)
+        status, body = 200, "<html><body>ok</body></html>"
+        if "'" in params.get('id', [''])[0]:
+            status, body = 500, "You have an error in your SQL syntax; check the manual for your MySQL server"
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, *args):
+        pass
+
+class _ThreadingServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    request_queue_size = 64
+
+def test_request_engine():
+    """Test concurrent dispatch, the rate limit and a detector using the engine"""
+    print("\n✓ Testing request engine...")
+    from scanner.request_engine import RequestEngine, TokenBucket
+    from scanner.sqli_detector import SQLInjectionDetector
+
+    server = _ThreadingServer(('127.0.0.1', 0), _TargetHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}/item"
+    try:
+        jobs = [(i, 'GET', base, {'params': {'id': i}}) for i in range(40)]
+        with RequestEngine(concurrency=20) as engine:
+            start = time.time()
+            results = list(engine.map(jobs))
+            elapsed = time.time() - start
+        assert [key for key, _ in results] == list(range(40))
+        assert all(resp.status_code == 200 for _, resp in results)
+        # 40 requests of 50 ms each, 20 at a time
+        assert elapsed < 1.0, elapsed
+        print(f"  ✅ 40 requests in {elapsed:.2f}s at concurrency 20")
+
+        bucket = TokenBucket(rate=20, burst=1)
+        start = time.time()
+        for _ in range(11):
+            bucket.acquire()
+        elapsed = time.time() - start
+        assert 0.45 < elapsed < 0.8, elapsed
+        print(f"  ✅ Token bucket held 11 requests at 20 req/s to {elapsed:.2f}s")
+
+        with RequestEngine(concurrency=10, rate=200) as engine:
+            detector = SQLInjectionDetector(engine.session, 0, 10, engine)
+            findings = detector.test_url_params(f"{base}?id=1&name=x")
+        assert findings and all('id=' in f['url'] for f in findings)
+        assert all(f['dbms'] == 'MySQL' for f in findings)
+        print(f"  ✅ SQL injection found through the engine: {len(findings)} payloads")
+        return True
+    finally:
+        server.shutdown()
+        server.server_close()
+
+SITE = {
+    '/': '<a href="/products?id=1">A</a> <a href="/products?id=2#top">B</a> <a href="/about">About</a>'
+         '<a href="/logo.png">Logo</a> <a href="http://other.example/">Elsewhere</a>'
+         '<form action="/search" method="get"><input name="q"></form>',
+    '/about': '<a href="/team">Team</a> <form action="/search"><input name="q"></form>',
+    '/team': '<a href="/careers">Careers</a>',
+    '/careers': 'too deep',
+}
+
+class _SiteHandler(_TargetHandler):
+    """Small site for the crawler; /products leaks a MySQL error like the target above"""
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/products':
+            return _TargetHandler.do_GET(self)
+        body = SITE.get(path, '<html><body>ok</body></html>')
+        self.send_response(200 if path in SITE or path == '/search' else 404)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+def test_crawler():
+    """Test crawl scope, depth and deduplication, and a crawling scan"""
+    print("\n✓ Testing crawler...")
+    from scanner.crawler import Crawler
+    from scanner.request_engine import RequestEngine
+
+    server = _ThreadingServer(('127.0.0.1', 0), _SiteHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    root = f"http://127.0.0.1:{server.server_port}/"
+    try:
+        with RequestEngine(concurrency=5) as engine:
+            pages = Crawler(engine, root, max_depth=2).crawl()
+        urls = sorted(urlparse(page['url']).path for page in pages)
+        # /products?id=2 has the same parameter set as id=1; /careers is 3 hops away
+        assert urls == ['/', '/about', '/products', '/team'], urls
+        forms = [form for page in pages for form in page['forms']]
+        assert len(forms) == 1 and forms[0]['action'].endswith('/search')
+        print(f"  ✅ Crawled {urls}, 1 unique form")
+
+        # A page that breaks the crawl must surface as an error, not as a short crawl
+        with RequestEngine(concurrency=5) as engine:
+            crawler = Crawler(engine, root, max_depth=2)
+            parse = crawler._page
+
+            def broken(url, depth, html):
+                if url.endswith('/about'):
+                    raise ValueError('unparseable page')
+                return parse(url, depth, html)
+
+            crawler._page = broken
+            try:
+                list(crawler.pages())
+                raise AssertionError('crawl error was swallowed')
+            except ValueError:
+                pass
+        print("  ✅ Crawl failure raised in the consumer")
+
+        with tempfile.TemporaryDirectory() as reports:
+            scanner = VulnerabilityScanner(root, rate=0, output_dir=reports, silent=True,
+                                           crawl=True, max_depth=1)
+            scanner.run()
+        sqli = [f for f in scanner.findings if f['type'] == 'SQL Injection']
+        assert sqli and all('/products?' in f['url'] for f in sqli)
+        print(f"  ✅ Crawling scan found SQL injection on a linked page: {len(sqli)} payloads")
+        return True
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_sql_signatures():
+    """Test DBMS identification by the compiled signature matcher"""
+    print("\n✓ Testing SQL error signatures...")
+    from scanner.sql_signatures import DEFAULT_MATCHER, literal_prefix
+
+    samples = {
+        "You have an error in your SQL syntax; check the manual that corresponds to your MariaDB server version": 'MariaDB',
+        "<b>Warning</b>: mysql_fetch_array() expects parameter 1 to be resource": 'MySQL',
+        "pg_query(): Query failed: ERROR:  syntax error at or near \"'\"": 'PostgreSQL',
+        "Unclosed quotation mark after the character string ''.": 'Microsoft SQL Server',
+        "Microsoft JET Database Engine error '80040e14'": 'Microsoft Access',
+        "ORA-01756: quoted string not properly terminated": 'Oracle',
+        "DB2 SQL error: SQLCODE=-104, SQLSTATE=42601": 'IBM DB2',
+        "Dynamic SQL Error SQL error code = -104 Token unknown": 'Firebird',
+        "sqlite3.OperationalError: unrecognized token: \"'\"": 'SQLite',
+        "org.h2.jdbc.JdbcSQLException: Syntax error in SQL statement [42000-200]": 'H2',
+    }
+    filler = "<p>Products and prices</p>\n" * 2000
+    for text, dbms in samples.items():
+        found = DEFAULT_MATCHER.identify(filler + text + filler)
+        assert found == dbms, (text, found)
+    print(f"  ✅ {len(samples)} DBMS identified in {DEFAULT_MATCHER.count} signatures")
+
+    assert DEFAULT_MATCHER.search(filler) is None
+    assert literal_prefix(r"\bORA-[0-9]{5}") == 'ORA-'
+    assert literal_prefix(r"Warning.*?\Wmysqli?_") == 'Warning'
+    assert literal_prefix(r"org\.h2\.jdbc") == 'org.h2.jdbc'
+    print("  ✅ Clean page passes, literal prefixes extracted")
+    return True
+
+class _BlindHandler(_TargetHandler):
+    """Injectable endpoints that never print an SQL error"""
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        params = parse_qs(parsed.query)
+        value = params.get('id', params.get('name', ['']))[0]
+        found = True
+        if parsed.path == '/product':
+            # Numeric context: WHERE id = <value>
+            condition = re.search(r" AND (\d+)=(\d+)$", value)
+            found = condition is None or condition.group(1) == condition.group(2)
+        elif parsed.path.startswith('/lookup'):
+            # String context: WHERE name = '<value>'
+            sleep = re.search(r"' AND SLEEP\((\d+)\)-- -$", value)
+            if sleep:
+                time.sleep(int(sleep.group(1)))
+        if found:
+            body = (f"<html><h1>Product {value}</h1><p>A sturdy oak desk with two drawers, "
+                    f"delivered flat packed. In stock, rendered at {time.time()}</p></html>")
+        else:
+            body = "<html><p>No such product</p></html>"
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+def test_blind_sqli():
+    """Test boolean-based and parallel time-based blind SQL injection"""
+    print("\n✓ Testing blind SQL injection...")
+    from scanner.blind_sqli import BlindSQLiDetector, simhash, hamming
+    from scanner.request_engine import RequestEngine
+
+    text = "a sturdy oak desk with two drawers delivered flat packed in stock " * 5
+    assert hamming(simhash(text), simhash(text + " today")) < hamming(simhash(text), simhash("no such product"))
+
+    server = _ThreadingServer(('127.0.0.1', 0), _BlindHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    root = f"http://127.0.0.1:{server.server_port}"
+    try:
+        with RequestEngine(concurrency=6) as engine:
+            detector = BlindSQLiDetector(engine, sleep=1)
+            boolean = detector.test_url_params(f"{root}/product?id=3")
+            assert [f['parameter'] for f in boolean] == ['id'], boolean
+            assert boolean[0]['type'] == 'Blind SQL Injection (boolean-based)'
+            assert detector.test_url_params(f"{root}/safe?id=3") == []
+            print(f"  ✅ Boolean-based: {boolean[0]['evidence']}")
+
+            start = time.time()
+            detector.test_url_params(f"{root}/lookup?name=bob")
+            detector.test_url_params(f"{root}/lookup2?name=alice")
+            timed = detector.collect()
+            elapsed = time.time() - start
+            detector.close()
+        assert sorted(urlparse(f['url']).path for f in timed) == ['/lookup', '/lookup2'], timed
+        assert all(f['dbms'] == 'MySQL' for f in timed)
+        # Two endpoints with a 1s sleep each, tested side by side
+        assert elapsed < 1.9, elapsed
+        assert len(detector.baselines.baselines) == 4
+        print(f"  ✅ Time-based on 2 endpoints in {elapsed:.2f}s: {timed[0]['evidence']}")
+        return True
+    finally:
+        server.shutdown()
+        server.server_close()
+
+class _ReflectHandler(_TargetHandler):
+    """Echoes `q` into a different context per path, escaped the way real templates do"""
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        value = parse_qs(parsed.query).get('q', [''])[0]
+        escaped = value.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
+        if parsed.path == '/search':
+            body = f"<html><h1>Results for {value}</h1></html>"
+        elif parsed.path == '/profile':
+            body = f'<html><input name="q" value="{escaped}"><p>{escaped}</p></html>'
+        elif parsed.path == '/go':
+            body = f'<html><a href="{escaped}">Continue</a></html>'
+        else:
+            js = value.replace('\\', '\\\\').replace("'", "\\'").replace('"', '\\"')
+            if parsed.path == '/recent':
+                # Fully escaped, and only ever inside a JS comment and a JSON data block
+                js = js.replace('<', '\\u003c').replace('>', '\\u003e')
+                body = (f"<html><script>// last search: {js}\nvar page = 1;</script>"
+                        f'<script type="application/json">{{"q": "{js}"}}</script></html>')
+            else:
+                body = f"<html><script>var term = '{js}';</script></html>"
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+def test_xss_reflection():
+    """Test context classification of reflections and context-specific XSS payloads"""
+    print("\n✓ Testing XSS reflection analysis...")
+    from scanner.reflection import PROBE, make_canary, find_reflections, executes, confirms, payload_calls
+    from scanner.request_engine import RequestEngine
+    from scanner.xss_detector import XSSDetector
+
+    canary = make_canary()
+    page = (f'<title>{canary}</title><p title="{canary}&quot;">{canary}{PROBE}</p>'
+            f'<a href=\'{canary}\'>x</a><script>var s = "{canary}";</script><!-- {canary} -->')
+    contexts = [(r['context'], r.get('quote')) for r in find_reflections(page, canary)]
+    assert contexts == [('rcdata', None), ('attribute', '"'), ('text', None), ('url', "'"),
+                        ('script', '"'), ('comment', None)], contexts
+    assert find_reflections(page, make_canary()) == []
+    comments = f'<script>// {canary}\n/* {canary} */ var s = 1;</script><script type="text/x-template">{canary}</script>'
+    assert [(r['context'], r.get('comment')) for r in find_reflections(comments, canary)] == [
+        ('script', '//'), ('script', '/*'), ('rcdata', None)]
+    assert not executes("<script>// last search: alert(/xss_test/)\nvar page = 1;</script>")
+    assert not executes("<script>/* alert(/xss_test/) */</script>")
+    assert not executes('<script type="application/json">alert(/xss_test/)</script>')
+    assert executes("<script>/* a */ alert(/xss_test/) // b</script>")
+    # Custom payloads are confirmed by their own code, reflected verbatim where it runs
+    img = "<img src=x onerror=prompt(document.domain)>"
+    assert payload_calls(img) == ('prompt(document.domain)',) and payload_calls('<b>hi</b>') == ()
+    assert confirms("<p><script>alert(1)</script></p>", "<script>alert(1)</script>")
+    assert confirms(f"<p>{img}</p>", img)
+    assert not confirms("<p>&lt;script&gt;alert(1)&lt;/script&gt;</p>", "<script>alert(1)</script>")
+    assert not confirms(f"<textarea>{img}</textarea>", img)
+    print(f"  ✅ Classified: {', '.join(context for context, _ in contexts)}")
+
+    server = _ThreadingServer(('127.0.0.1', 0), _ReflectHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    root = f"http://127.0.0.1:{server.server_port}"
+    try:
+        with RequestEngine(concurrency=4) as engine:
+            detector = XSSDetector(None, engine=engine)
+            findings = {}
+            for path in ('search', 'profile', 'go', 'js', 'recent'):
+                for finding in detector.test_url_params(f"{root}/{path}?q=shoes"):
+                    findings[urlparse(finding['url']).path] = finding
+        assert sorted(findings) == ['/go', '/js', '/search'], findings
+        assert findings['/search']['payload'] == "<svg onload=alert(/xss_test/)>"
+        assert findings['/go']['payload'] == "javascript:alert(/xss_test/)"
+        assert findings['/js']['payload'].startswith('</script>')
+        # One canary per endpoint plus only the payloads that fit, instead of every payload everywhere
+        assert engine.sent < 5 * len(detector.load_payloads()), engine.sent
+        for path, finding in sorted(findings.items()):
+            print(f"  ✅ {path}: {finding['context']} -> {finding['payload']}")
+        print(f"  ✅ {engine.sent} requests for 5 endpoints")
+        return True
+    finally:
+        server.shutdown()
+        server.server_close()
+
 def main():
     print("="*60)
     print("EH VULNERABILITY SCANNER - SYSTEM TEST")
@@ -127,6 +460,11 @@ def main():
         test_payload_loading,
         test_scanner_initialization,
         test_reports_directory,
+        test_request_engine,
+        test_crawler,
+        test_sql_signatures,
+        test_blind_sqli,
+        test_xss_reflection,
     ]
     
     passed = 0